@@ -4,10 +4,33 @@ Per-backend benchmark for ``extract_frames``, with a real cross-axis matrix.
 Sweeps:
 
 - **Resolution**     : 360p, 720p, 1080p
-- **Codec**          : H.264 (universal), HEVC/H.265 (most platforms)
+- **Codec**          : H.264 (universal), HEVC/H.265 (most platforms);
+  MPEG-4 Part 2 opt-in via ``--codecs`` (the lowres-capable decoder)
 - **Access pattern** : full sequential, windowed (1s at mid), sparse (12 evenly-spaced)
 - **Backend**        : vidgear, pyav, ffmpeg-pipe (subject to availability)
 - **Hwaccel**        : None (software), "auto" (VideoToolbox/CUDA/QSV when supported)
+- **Decoder threading** : PyAV full / windowed decode per ``thread_type``
+  (slice / frame / auto) × ``decode_threads`` (``--thread-types`` /
+  ``--decode-threads``), per resolution — the numbers behind the
+  ``VIDEO_HELPER_THREAD_TYPE`` / ``VIDEO_HELPER_DECODE_THREADS`` defaults
+- **Pipe ring buffer** : ffmpeg-pipe full decode with ``ring_buffer=4``
+  (frames ``readinto`` four reused buffers and yielded as views) next to
+  the default owned-frame cell; the CPU column is the Python-side cost of
+  moving frames off the pipe
+- **Decode quality** : PyAV / ffmpeg-pipe full decode with
+  ``quality="preview"`` next to the default cells, at source size and
+  scaled to a quarter of the source width (where lowres-capable decoders
+  reconstruct the smaller frame directly) — the per-codec speedup of the
+  preview decoder shortcuts
+- **Probe engine**   : ffprobe subprocess vs in-process PyAV (``video_metadata``
+  cache misses), reported once per clip ahead of the decode cells
+- **Very sparse, long clip** : 3 frames (start / middle / end) of a separate
+  5-minute 360p H.264 clip, PyAV and ffmpeg-pipe with the gap-aware seek
+  planner vs the same backend seeking once and decoding through (PyAV's
+  pre-planner behavior; one ffmpeg process with a ``select`` expression)
+- **Core scaling** : full sequential decode of a separate 1-minute 1080p
+  H.264 clip (2 s GOP) with ``parallel=1, 2, 4, …`` worker processes, up
+  to ``--max-cores``, for PyAV and ffmpeg-pipe
 
 For every cell we measure:
 
@@ -31,6 +54,7 @@ Usage:
 from __future__ import annotations
 
 import argparse
+import os
 import shutil
 import subprocess
 import sys
@@ -42,7 +66,7 @@ from pathlib import Path
 import os_helper as osh
 
 import video_helper as vh
-from video_helper.main import _have_pyav
+from video_helper.main import _have_pyav, _probe_uncached
 
 osh.verbosity(0)
 
@@ -63,11 +87,15 @@ RESOLUTIONS = {
 CODECS = {
     "h264": ("libx264", "H.264"),
     "hevc": ("libx265", "HEVC/H.265"),
+    "mpeg4": ("mpeg4", "MPEG-4 Part 2"),  # opt-in via --codecs: lowres decodes
 }
 
 CLIP_DURATION_S = 10.0
 CLIP_FPS = 30
 BENCH_RUNS = 3  # report best of N
+PROBE_RUNS = 20  # cold probes per engine (mean reported)
+LONG_CLIP_DURATION_S = 300.0  # "very sparse, long clip" pattern (--long-clip-seconds)
+PARALLEL_CLIP_DURATION_S = 60.0  # core-scaling pattern (--parallel-clip-seconds)
 
 
 @dataclass
@@ -127,8 +155,18 @@ class Cell:
 # ---------------------------------------------------------------------------
 
 
-def _generate_clip(out_path: Path, width: int, height: int, encoder: str) -> None:
-    """Render a 10-second 30fps testsrc2 clip with the given encoder."""
+def _generate_clip(
+    out_path: Path,
+    width: int,
+    height: int,
+    encoder: str,
+    duration: float = CLIP_DURATION_S,
+    gop: int | None = None,
+) -> None:
+    """Render a ``duration``-second (default 10) 30fps testsrc2 clip with the given encoder.
+
+    ``gop`` sets the keyframe interval in frames (encoder default otherwise).
+    """
     cmd = [
         "ffmpeg",
         "-y",
@@ -138,17 +176,16 @@ def _generate_clip(out_path: Path, width: int, height: int, encoder: str) -> Non
         "-f",
         "lavfi",
         "-i",
-        f"testsrc2=size={width}x{height}:rate={CLIP_FPS}:duration={CLIP_DURATION_S}",
+        f"testsrc2=size={width}x{height}:rate={CLIP_FPS}:duration={duration}",
         "-c:v",
         encoder,
-        "-preset",
-        "fast",
-        "-crf",
-        "23",
-        "-pix_fmt",
-        "yuv420p",
-        str(out_path),
     ]
+    # The native MPEG-4 encoder has no preset / CRF: a fixed quantizer instead.
+    cmd += ["-q:v", "4"] if encoder == "mpeg4" else ["-preset", "fast", "-crf", "23"]
+    cmd += ["-pix_fmt", "yuv420p"]
+    if gop is not None:
+        cmd += ["-g", str(gop)]
+    cmd.append(str(out_path))
     subprocess.run(cmd, check=True)
 
 
@@ -171,6 +208,32 @@ def _bench_one(make_iter: Callable[[], Iterable]) -> tuple[float, float, int]:
     return best_wall, sum(cpu_totals) / len(cpu_totals), count
 
 
+def _bench_probe(clip: str) -> list[tuple[str, float]]:
+    """Time cold (uncached) probes of ``clip`` with every installed engine.
+
+    Parameters
+    ----------
+    clip : str
+        Path to the generated test clip.
+
+    Returns
+    -------
+    list[tuple[str, float]]
+        ``(engine, mean milliseconds per probe)`` for ``"ffprobe"`` and, when
+        PyAV is installed, ``"pyav"``.
+    """
+    # Call the uncached probe directly: going through video_metadata would
+    # measure the LRU after the first call, not the engine.
+    engines = ["ffprobe"] + (["pyav"] if _have_pyav() else [])
+    results: list[tuple[str, float]] = []
+    for engine in engines:
+        with osh.wall_timer() as w:
+            for _ in range(PROBE_RUNS):
+                _probe_uncached(clip, None, engine)
+        results.append((engine, w["milliseconds"] / PROBE_RUNS))
+    return results
+
+
 # ---------------------------------------------------------------------------
 # Cell builder — for one (clip, pattern, backend, hwaccel) point.
 # ---------------------------------------------------------------------------
@@ -232,9 +295,6 @@ def _backends_for(pattern: str) -> list[str]:
         available.append("pyav")
     if shutil.which("ffmpeg") is not None:
         available.append("ffmpeg-pipe")
-    if pattern.startswith("sparse"):
-        # ffmpeg-pipe streams sequentially — it cannot do sparse index access.
-        return [b for b in available if b != "ffmpeg-pipe"]
     return available
 
 
@@ -259,6 +319,186 @@ def _hwaccels_for(backend: str) -> list[str | None]:
     return [None]
 
 
+def _bench_long_sparse(clip: str) -> list[Cell]:
+    """Measure the "very sparse, long clip" pattern.
+
+    Three frames — 1 s in, the middle, 1 s before the end — of a long clip:
+    the case where seeking once and decoding linearly to the last wanted
+    frame decodes the whole file, and per-gap re-seeking decodes a few GOPs.
+
+    Parameters
+    ----------
+    clip : str
+        Path to the long test clip.
+
+    Returns
+    -------
+    list[Cell]
+        Per available backend (``pyav``, ``ffmpeg-pipe``): one cell with
+        planned seeks and one ``…-seek-once`` cell with the planner disabled
+        via an infinite seek cost.
+    """
+    import video_helper.main as vh_main
+
+    info = vh.video_dimensions(clip)
+    fps = info["frame_rate"]
+    duration = info["duration"]
+    indices = [int(fps), int(duration * fps / 2), int((duration - 1.0) * fps)]
+    planned_cost = vh_main._SEEK_COST_FRAMES
+    cells: list[Cell] = []
+    for backend in [b for b in _backends_for("sparse") if b != "vidgear"]:
+        for suffix, seek_cost in (("", planned_cost), ("-seek-once", float("inf"))):
+            vh_main._SEEK_COST_FRAMES = seek_cost
+            try:
+                wall, cpu, frames = _bench_one(
+                    lambda b=backend: vh.extract_frames(clip, frame_indices=indices, backend=b)
+                )
+            finally:
+                vh_main._SEEK_COST_FRAMES = planned_cost
+            cells.append(
+                Cell("360p", "h264", "very-sparse", backend + suffix, None, wall, cpu, frames)
+            )
+    return cells
+
+
+def _bench_threading(
+    clip: str,
+    resolution: str,
+    codec: str,
+    thread_types: list[str],
+    decode_threads: list[int],
+) -> list[Cell]:
+    """Measure PyAV full and windowed decode per decoder threading setting.
+
+    Parameters
+    ----------
+    clip : str
+        Path to the block's test clip.
+    resolution, codec : str
+        Block keys, copied into the cells.
+    thread_types : list[str]
+        ``thread_type`` values to try (``"slice"`` / ``"frame"`` / ``"auto"``).
+    decode_threads : list[int]
+        ``decode_threads`` values to try (``0`` = one per core).
+
+    Returns
+    -------
+    list[Cell]
+        One ``pyav[<type> t=<n>]`` cell per (pattern, type, count), for the
+        ``full`` and ``windowed-1s`` patterns.
+    """
+    if not _have_pyav():
+        return []
+    mid = vh.video_dimensions(clip)["duration"] / 2.0
+    cells: list[Cell] = []
+    for pattern in ("full", "windowed-1s"):
+        for tt in thread_types:
+            for n in decode_threads:
+                kwargs = {"backend": "pyav", "thread_type": tt, "decode_threads": n}
+                if pattern == "windowed-1s":
+                    kwargs.update(start_instant=mid, end_instant=mid + 1.0)
+                wall, cpu, frames = _bench_one(lambda kw=kwargs: vh.extract_frames(clip, **kw))
+                cells.append(
+                    Cell(resolution, codec, pattern, f"pyav[{tt} t={n}]", None, wall, cpu, frames)
+                )
+    return cells
+
+
+def _bench_pipe_ring(clip: str, resolution: str, codec: str) -> list[Cell]:
+    """Measure ffmpeg-pipe full decode reading into a ring of reused buffers.
+
+    Parameters
+    ----------
+    clip : str
+        Path to the block's test clip.
+    resolution, codec : str
+        Block keys, copied into the cells.
+
+    Returns
+    -------
+    list[Cell]
+        One ``ffmpeg-pipe[ring=4]`` cell (pattern ``full``), or none without
+        ffmpeg. Compare with the block's plain ``ffmpeg-pipe`` full cell.
+    """
+    if shutil.which("ffmpeg") is None:
+        return []
+    wall, cpu, frames = _bench_one(
+        lambda: vh.extract_frames(clip, backend="ffmpeg-pipe", ring_buffer=4)
+    )
+    return [Cell(resolution, codec, "full", "ffmpeg-pipe[ring=4]", None, wall, cpu, frames)]
+
+
+def _bench_quality(clip: str, resolution: str, codec: str) -> list[Cell]:
+    """Measure ``quality="preview"`` full decode against the default.
+
+    Parameters
+    ----------
+    clip : str
+        Path to the block's test clip.
+    resolution, codec : str
+        Block keys, copied into the cells.
+
+    Returns
+    -------
+    list[Cell]
+        Per installed backend (PyAV, ffmpeg-pipe): a ``<backend>[preview]``
+        cell in the ``full`` pattern — compare with the block's plain cell —
+        and ``<backend>[default]`` / ``<backend>[preview]`` cells in the
+        ``full-1/4w`` pattern, output scaled to a quarter of the source
+        width (where lowres applies).
+    """
+    backends = [
+        b for b, ok in (("pyav", _have_pyav()), ("ffmpeg-pipe", shutil.which("ffmpeg"))) if ok
+    ]
+    quarter = {"output_width": RESOLUTIONS[resolution][0] // 4}
+    cells: list[Cell] = []
+    for backend in backends:
+        for pattern, qualities, extra in (
+            ("full", ("preview",), {}),
+            ("full-1/4w", ("default", "preview"), quarter),
+        ):
+            for quality in qualities:
+                kwargs = {"backend": backend, "quality": quality, **extra}
+                wall, cpu, frames = _bench_one(lambda kw=kwargs: vh.extract_frames(clip, **kw))
+                cells.append(
+                    Cell(
+                        resolution, codec, pattern, f"{backend}[{quality}]", None, wall, cpu, frames
+                    )
+                )
+    return cells
+
+
+def _bench_parallel(clip: str, max_cores: int) -> list[Cell]:
+    """Measure full sequential decode with 1, 2, 4, … worker processes.
+
+    Parameters
+    ----------
+    clip : str
+        Path to the core-scaling test clip.
+    max_cores : int
+        Largest ``parallel`` value to try.
+
+    Returns
+    -------
+    list[Cell]
+        Per available backend (``pyav``, ``ffmpeg-pipe``) and core count
+        ``n``: one ``<backend> xN`` cell (``x1`` is the in-process decode).
+    """
+    counts = [n for n in (1, 2, 4, 8, 16, 32, 64) if n < max_cores] + [max_cores]
+    cells: list[Cell] = []
+    for backend in [b for b in _backends_for("full") if b != "vidgear"]:
+        for n in counts:
+            wall, cpu, frames = _bench_one(
+                lambda b=backend, n=n: vh.extract_frames(
+                    clip, backend=b, parallel=n if n > 1 else None
+                )
+            )
+            cells.append(
+                Cell("1080p", "h264", "full-parallel", f"{backend} x{n}", None, wall, cpu, frames)
+            )
+    return cells
+
+
 # ---------------------------------------------------------------------------
 # Reporting.
 # ---------------------------------------------------------------------------
@@ -279,7 +519,7 @@ def _format_cell(c: Cell) -> str:
     """
     hw = c.hwaccel if c.hwaccel is not None else "-"
     return (
-        f"  {c.pattern:<12} {c.backend:<12} {hw:<6}"
+        f"  {c.pattern:<12} {c.backend:<22} {hw:<6}"
         f" wall={c.wall_ms:>7.1f}ms  cpu={c.cpu_ms:>7.1f}ms"
         f"  cpu/wall={c.cpu_wall_ratio:>4.2f}x  ({c.frames:>4d} frames, {c.fps:>7.1f} fps)"
     )
@@ -328,13 +568,17 @@ def main() -> None:
     parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
     # 4K is opt-in: HEVC encoding at 3840×2160 takes ~30-90 s per fixture.
     default_resolutions = [r for r in RESOLUTIONS if r != "4k"]
+    # MPEG-4 Part 2 is opt-in too: it only matters for the lowres preview cells.
+    default_codecs = [c for c in CODECS if c != "mpeg4"]
     parser.add_argument(
         "--resolutions",
         default=",".join(default_resolutions),
         help=f"comma-separated subset of {list(RESOLUTIONS)} (default skips 4k)",
     )
     parser.add_argument(
-        "--codecs", default=",".join(CODECS), help=f"comma-separated subset of {list(CODECS)}"
+        "--codecs",
+        default=",".join(default_codecs),
+        help=f"comma-separated subset of {list(CODECS)} (default skips mpeg4)",
     )
     parser.add_argument(
         "--torch-device",
@@ -342,7 +586,37 @@ def main() -> None:
         help="If set (cpu|mps|cuda|auto), also bench destination='torch' "
         "with batch_size=16 on the given device.",
     )
+    parser.add_argument(
+        "--long-clip-seconds",
+        type=float,
+        default=LONG_CLIP_DURATION_S,
+        help="Length of the 'very sparse, long clip' fixture (360p H.264); 0 skips it.",
+    )
+    parser.add_argument(
+        "--parallel-clip-seconds",
+        type=float,
+        default=PARALLEL_CLIP_DURATION_S,
+        help="Length of the core-scaling fixture (1080p H.264, 2 s GOP); 0 skips it.",
+    )
+    parser.add_argument(
+        "--max-cores",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Largest parallel= worker count in the core-scaling cells (default: all cores).",
+    )
+    parser.add_argument(
+        "--thread-types",
+        default="slice,frame,auto",
+        help="comma-separated PyAV thread_type values for the threading cells; empty skips them.",
+    )
+    parser.add_argument(
+        "--decode-threads",
+        default="0",
+        help="comma-separated decode_threads values for the threading cells (0 = one per core).",
+    )
     args = parser.parse_args()
+    thread_types = [t.strip() for t in args.thread_types.split(",") if t.strip()]
+    decode_threads = [int(n) for n in args.decode_threads.split(",") if n.strip()]
 
     resolutions = [r.strip() for r in args.resolutions.split(",") if r.strip()]
     codecs = [c.strip() for c in args.codecs.split(",") if c.strip()]
@@ -373,6 +647,10 @@ def main() -> None:
                 clip = tmp_path / f"{res}-{codec}.mp4"
                 print(f"[generating] {res} {label} → {clip.name} ...", flush=True)
                 _generate_clip(clip, w, h, encoder)
+                for engine, ms in _bench_probe(str(clip)):
+                    print(
+                        f"  probe        {engine:<12} {ms:>7.2f}ms/call ({PROBE_RUNS} cold calls)"
+                    )
 
                 cells: list[Cell] = []
                 for pattern, make_iter in _patterns_for(str(clip)):
@@ -437,8 +715,46 @@ def main() -> None:
                         except Exception as exc:
                             print(f"  full {label} hw={hw}: ERROR {type(exc).__name__}: {exc}")
 
+                cells += _bench_pipe_ring(str(clip), res, codec)
+                cells += _bench_threading(str(clip), res, codec, thread_types, decode_threads)
+                cells += _bench_quality(str(clip), res, codec)
                 _emit_block(res, codec, cells)
 
+        if args.long_clip_seconds > 0:
+            clip = tmp_path / "long-360p-h264.mp4"
+            print(
+                f"[generating] {args.long_clip_seconds:.0f}s 360p H.264 → {clip.name} ...",
+                flush=True,
+            )
+            _generate_clip(clip, *RESOLUTIONS["360p"], "libx264", duration=args.long_clip_seconds)
+            print(
+                f"=== very sparse, long clip ({args.long_clip_seconds:.0f}s 360p H.264, 3 frames) ==="
+            )
+            for c in _bench_long_sparse(str(clip)):
+                print(_format_cell(c))
+            print()
+
+        if args.parallel_clip_seconds > 0:
+            clip = tmp_path / "parallel-1080p-h264.mp4"
+            print(
+                f"[generating] {args.parallel_clip_seconds:.0f}s 1080p H.264 → {clip.name} ...",
+                flush=True,
+            )
+            _generate_clip(
+                clip,
+                *RESOLUTIONS["1080p"],
+                "libx264",
+                duration=args.parallel_clip_seconds,
+                gop=2 * CLIP_FPS,
+            )
+            print(
+                f"=== core scaling ({args.parallel_clip_seconds:.0f}s 1080p H.264, "
+                f"full decode, up to {args.max_cores} processes) ==="
+            )
+            for c in _bench_parallel(str(clip), args.max_cores):
+                print(_format_cell(c))
+            print()
+
 
 if __name__ == "__main__":
     main()
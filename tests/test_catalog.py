@@ -0,0 +1,126 @@
+"""
+Tests for the optional persistent metadata catalog (``video_helper.catalog``).
+
+What matters is the cross-process contract: with a catalog enabled, a fresh
+process (simulated by a cold in-process LRU and a new ``MetadataCatalog`` on
+the same directory) gets its probe from SQLite instead of probing again; a
+rewritten file invalidates every entry of that file; and the catalog is off
+unless explicitly enabled.
+"""
+
+from __future__ import annotations
+
+import os_helper as osh
+import pytest
+
+import video_helper.main as vh_main
+from video_helper import (
+    MetadataCatalog,
+    black_video,
+    clear_probe_cache,
+    get_catalog,
+    set_catalog_dir,
+    video_dimensions,
+    video_metadata,
+)
+from video_helper.main import _probe_uncached
+
+osh.verbosity(0)
+
+
+@pytest.fixture
+def probe_calls(monkeypatch, tmp_path) -> list[str]:
+    """Count real probes, with a catalog under ``tmp_path`` and a cold LRU."""
+    calls: list[str] = []
+
+    def _counting_probe(video_file, http_headers, engine=None):
+        calls.append(video_file)
+        return _probe_uncached(video_file, http_headers, engine)
+
+    monkeypatch.setattr(vh_main, "_probe_uncached", _counting_probe)
+    previous = get_catalog()
+    set_catalog_dir(str(tmp_path / "cache"))
+    clear_probe_cache()
+    yield calls
+    clear_probe_cache()
+    set_catalog_dir(previous.cache_dir if previous is not None else None)
+
+
+def test_warm_restart_is_probe_free_and_rewrites_invalidate(tmp_path, probe_calls) -> None:
+    """Probe once, drop the LRU and reopen the catalog (a new process): the
+    metadata comes back from SQLite. Rewriting the file invalidates it."""
+    clip = str(tmp_path / "clip.mp4")
+    black_video(1.0, 64, 64, clip, frame_rate=30)
+    # black_video validates its own output (already one probe): start cold.
+    clear_probe_cache()
+    get_catalog().clear()
+    probe_calls.clear()
+
+    meta = video_metadata(clip)
+    assert len(probe_calls) == 1
+
+    clear_probe_cache()
+    set_catalog_dir(str(tmp_path / "cache"))
+    assert video_metadata(clip) == meta
+    assert video_dimensions(clip)["width"] == 64
+    assert len(probe_calls) == 1
+
+    get_catalog().put(clip, "packet_index", b"derived")
+    black_video(1.0, 32, 32, clip, frame_rate=30)
+    clear_probe_cache()
+    assert video_dimensions(clip)["width"] == 32
+    # The derived index stamped with the old size/mtime went with it.
+    assert get_catalog().get(clip, "packet_index") is None
+
+
+def test_catalog_is_opt_in_and_survives_a_corrupt_file(tmp_path) -> None:
+    """No catalog unless enabled; an unreadable catalog file degrades to misses."""
+    previous = get_catalog()
+    try:
+        set_catalog_dir(None)
+        assert get_catalog() is None
+
+        (tmp_path / "catalog.sqlite3").write_bytes(b"this is not a database" * 100)
+        catalog = MetadataCatalog(str(tmp_path))
+        assert catalog.get_json(__file__, "probe") is None
+        catalog.put_json(__file__, "probe", {"width": 1})  # logged, not raised
+    finally:
+        set_catalog_dir(previous.cache_dir if previous is not None else None)
+
+
+def test_catalog_edge_cases(tmp_path, monkeypatch, probe_calls) -> None:
+    """The catalog works with the LRU disabled, drops a corrupt JSON entry
+    instead of raising, and an unusable VIDEO_HELPER_CACHE_DIR disables it
+    (with a warning) on first use rather than breaking the import."""
+    import video_helper.catalog as vh_catalog
+
+    clip = str(tmp_path / "clip.mp4")
+    black_video(1.0, 64, 64, clip, frame_rate=30)
+    get_catalog().clear()
+    probe_calls.clear()
+
+    monkeypatch.setattr(vh_main, "_PROBE_CACHE_SIZE", 0)
+    meta = video_metadata(clip)
+    assert video_metadata(clip) == meta
+    assert len(probe_calls) == 1
+
+    get_catalog().put(clip, "probe", b'{"width": 6')
+    assert get_catalog().get_json(clip, "probe") is None
+    assert get_catalog().get(clip, "probe") is None
+    assert video_metadata(clip) == meta
+    assert len(probe_calls) == 2
+
+    if vh_main._have_pyav():
+        # A corrupt binary entry is a miss too: rebuilt, and stored afresh.
+        get_catalog().put(clip, "packet_index", b"garbage")
+        index = vh_main.video_packet_index(clip)
+        assert index.frame_count == 30
+        assert get_catalog().get(clip, "packet_index") != b"garbage"
+
+    (tmp_path / "not_a_dir").write_bytes(b"")
+    monkeypatch.setenv("VIDEO_HELPER_CACHE_DIR", str(tmp_path / "not_a_dir" / "cache"))
+    set_catalog_dir(None)
+    vh_catalog._ENV_PENDING = True  # as in a fresh import
+    assert get_catalog() is None
+    assert not vh_catalog._ENV_PENDING
+    assert video_metadata(clip) == meta
@@ -49,6 +49,7 @@ EXPECTED_SUBCOMMANDS = {
     "srt2vtt",
     "extract-frames",
     "extract-flow",
+    "calibrate",
 }
 
 
@@ -99,9 +100,10 @@ def test_every_subcommand_help_exits_zero_on_both_clis(capsys) -> None:
 
 
 def test_extract_frames_pad_color_flags_parse_and_default_on_both_clis() -> None:
-    """``extract-frames``'s --width/--height/--pad-color are wired the same
-    way on both CLIs: listed in --help, parsed to the right type, and
-    default to 'black' when omitted."""
+    """``extract-frames``'s --width/--height/--pad-color/--color/--keyframes-only/
+    --quality are wired the same way on both CLIs: listed in --help, parsed to
+    the right type, and default to 'black' / 'bgr' / off / 'default' when
+    omitted."""
     from video_helper.cli_argparse import build_parser
     from video_helper.cli_argparse import main as argparse_main
     from video_helper.cli_click import cli, extract_frames_cmd
@@ -122,9 +124,16 @@ def test_extract_frames_pad_color_flags_parse_and_default_on_both_clis() -> None
             "240",
             "--pad-color",
             "#FF0000",
+            "--color",
+            "gray",
+            "--keyframes-only",
+            "--quality",
+            "preview",
         ]
     )
-    assert (ns.width, ns.height, ns.pad_color) == (320, 240, "#FF0000")
+    assert (ns.width, ns.height, ns.pad_color, ns.color) == (320, 240, "#FF0000", "gray")
+    assert ns.keyframes_only is True
+    assert ns.quality == "preview"
 
     ns_default = build_parser().parse_args(
         ["extract-frames", "--input", "in.mp4", "--output-dir", "out"]
@@ -132,17 +141,26 @@ def test_extract_frames_pad_color_flags_parse_and_default_on_both_clis() -> None
     assert ns_default.width is None
     assert ns_default.height is None
     assert ns_default.pad_color == "black"
+    assert ns_default.color == "bgr"
+    assert ns_default.keyframes_only is False
+    assert ns_default.quality == "default"
 
     result = CliRunner().invoke(cli, ["extract-frames", "--help"])
     assert result.exit_code == 0
     assert "--width" in result.output
     assert "--height" in result.output
     assert "--pad-color" in result.output
+    assert "--color" in result.output
+    assert "--keyframes-only" in result.output
+    assert "--quality" in result.output
 
     click_defaults = {p.name: p.default for p in extract_frames_cmd.params}
     assert click_defaults["width"] is None
     assert click_defaults["height"] is None
     assert click_defaults["pad_color"] == "black"
+    assert click_defaults["color"] == "bgr"
+    assert click_defaults["keyframes_only"] is False
+    assert click_defaults["quality"] == "default"
 
 
 def test_compress_flags_and_defaults_match_across_cli_surfaces() -> None:
@@ -305,3 +323,37 @@ def test_both_clis_print_clean_error_on_library_exception(tmp_path, monkeypatch,
     captured = capsys.readouterr()
     assert captured.err.startswith("Error: ")
     assert "Traceback (most recent call last)" not in captured.err
+
+
+def test_dimensions_inputs_emit_ndjson_on_both_clis(tmp_path, capsys) -> None:
+    """``dimensions --inputs`` prints one JSON record per input on both CLIs,
+    keeps going past a bad file, and exits nonzero when any item failed."""
+    import json
+
+    from video_helper import black_video
+    from video_helper.cli_argparse import main as argparse_main
+    from video_helper.cli_click import cli as click_cli
+
+    clip = str(tmp_path / "clip.mp4")
+    black_video(1.0, 64, 64, clip, frame_rate=30)
+    bogus = tmp_path / "fake.mp4"
+    bogus.write_bytes(b"not a video")
+
+    assert argparse_main(["dimensions", "--inputs", clip, clip, "--jobs", "2"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)["width"] for line in lines] == [64, 64]
+
+    assert argparse_main(["dimensions", "--inputs", clip, str(bogus)]) == 1
+    by_path = {r["path"]: r for r in map(json.loads, capsys.readouterr().out.splitlines())}
+    assert by_path[clip]["height"] == 64
+    assert "error" in by_path[str(bogus)]
+
+    result = CliRunner().invoke(
+        click_cli, ["dimensions", "--inputs", clip, "--inputs", str(bogus), "--jobs", "2"]
+    )
+    assert result.exit_code == 1
+    by_path = {r["path"]: r for r in map(json.loads, result.output.splitlines())}
+    assert by_path[clip]["width"] == 64
+    assert "error" in by_path[str(bogus)]
+
+    assert CliRunner().invoke(click_cli, ["dimensions"]).exit_code != 0
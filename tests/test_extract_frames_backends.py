@@ -11,6 +11,8 @@ installed on the current machine.
 
 from __future__ import annotations
 
+import subprocess
+
 import numpy as np
 import os_helper as osh
 import pytest
@@ -45,6 +47,29 @@ def clip(tmp_path_factory) -> str:
     return str(p)
 
 
+def _make_testsrc(
+    path,
+    seconds: float,
+    size: str = "96x64",
+    gop: int | None = None,
+    codec: str = "libx264",
+    extra: tuple[str, ...] = (),
+) -> str:
+    """Encode ``seconds`` of animated 30 fps testsrc2 to ``path`` and return it.
+
+    Unlike the black ``clip``, every frame differs, so a wrong frame index
+    shows up as a pixel mismatch. ``gop`` sets the keyframe interval;
+    ``extra`` goes to the encoder as is.
+    """
+    cmd = ["ffmpeg", "-v", "error", "-y", "-f", "lavfi"]
+    cmd += ["-i", f"testsrc2=size={size}:rate=30:duration={seconds}", "-c:v", codec]
+    if gop is not None:
+        cmd += ["-g", str(gop)]
+    cmd += [*extra, str(path)]
+    subprocess.run(cmd, check=True)
+    return str(path)
+
+
 def _check_bgr_uint8(frame, width=64, height=64) -> None:
     """Assert a frame is a BGR uint8 ndarray of the expected (H, W, 3) shape."""
     assert isinstance(frame, np.ndarray)
@@ -90,7 +115,7 @@ def test_internal_resolvers_pure_logic() -> None:
         assert sparse_pick == "pyav"
         assert windowed_pick == "pyav"  # keyframe seek beats vidgear's decode-from-t0
     else:
-        assert sparse_pick == "vidgear"
+        assert sparse_pick in {"ffmpeg-pipe", "vidgear"}
         assert windowed_pick in {"ffmpeg-pipe", "vidgear"}
 
     # _resolve_indices: sparse mode (from times, and out-of-range clipping).
@@ -191,6 +216,525 @@ def test_pyav_backend_sparse(clip) -> None:
         _check_bgr_uint8(f)
 
 
+def test_sparse_reads_agree_across_backends(clip, tmp_path, monkeypatch) -> None:
+    """ffmpeg-pipe and vidgear serve sparse reads too, returning exactly the
+    requested frames -- ffmpeg-pipe both as one process and split into one
+    ``-ss``-seeked process per cluster -- and the same pixels as PyAV."""
+    import video_helper.main as vh_main
+
+    moving = _make_testsrc(tmp_path / "moving.mp4", 2, size="64x64", gop=10)
+    wanted = [0, 7, 31, 52]
+    every = list(extract_frames(moving, backend="vidgear"))
+    expected = [every[i] for i in wanted]
+
+    def _same(frames) -> bool:
+        return len(frames) == len(expected) and all(
+            np.array_equal(a, b) for a, b in zip(frames, expected, strict=True)
+        )
+
+    assert _same(list(extract_frames(moving, frame_indices=wanted, backend="vidgear")))
+    assert _same(list(extract_frames(moving, frame_indices=wanted, backend="ffmpeg-pipe")))
+    # Cheap seeks + a short assumed GOP: several processes, one per cluster.
+    monkeypatch.setattr(vh_main, "_ASSUMED_GOP", 10)
+    monkeypatch.setattr(vh_main, "_SEEK_COST_FRAMES", 0.0)
+    monkeypatch.setattr(vh_main, "_PIPE_SPAWN_COST_FRAMES", 0.0)
+    assert len(vh_main._plan_sparse_seeks(wanted)) > 1
+    assert _same(list(extract_frames(moving, frame_indices=wanted, backend="ffmpeg-pipe")))
+    if _have_pyav():
+        assert _same(list(extract_frames(moving, frame_indices=wanted, backend="pyav")))
+
+
+def test_ffmpeg_pipe_sparse_reads_of_thousands_of_frames(tmp_path) -> None:
+    """Thousands of sparse indices stay within the argument-size limit: runs
+    of constant stride become one select term, and a cluster with too many
+    terms is split over several processes -- same frames either way."""
+    from video_helper.main import _select_runs, _select_term
+
+    assert _select_runs([0, 1, 2, 3, 9, 12, 20, 30, 40]) == [[0, 1, 2, 3], [9], [12], [20, 30, 40]]
+    assert _select_term([10, 11, 12], 10) == "between(n\\,0\\,2)"
+    assert _select_term([20, 30, 40], 10) == "between(n\\,10\\,30)*not(mod(n-10\\,10))"
+
+    moving = _make_testsrc(tmp_path / "moving.mp4", 400, size="32x24")
+    every = list(extract_frames(moving, backend="ffmpeg-pipe"))
+    dense = range(12000)
+    # Alternating gaps of 1 and 2: no run of constant stride, one term per frame.
+    ragged = sorted({i * 3 // 2 for i in range(8000)})
+    for wanted in (dense, ragged):
+        frames = list(extract_frames(moving, frame_indices=wanted, backend="ffmpeg-pipe"))
+        assert len(frames) == len(wanted)
+        assert all(np.array_equal(f, every[i]) for f, i in zip(frames, wanted, strict=True))
+
+
+def test_vidgear_windows_seek_and_match_a_read_from_frame_zero(tmp_path, monkeypatch) -> None:
+    """Windowed and sparse VidGear reads seek instead of decoding the prefix,
+    and still return exactly the frames of a read from frame 0 -- stabilized
+    windows included, thanks to the stabilizer warm-up lead."""
+    import video_helper.main as vh_main
+
+    moving = _make_testsrc(tmp_path / "moving.mp4", 4, gop=15)
+    landed: list[int] = []
+    open_at = vh_main._open_vidgear_at
+
+    def _spy(*args, **kwargs):
+        gear, first = open_at(*args, **kwargs)
+        landed.append(first)
+        return gear, first
+
+    monkeypatch.setattr(vh_main, "_open_vidgear_at", _spy)
+    for stabilize in (False, True):
+        every = list(extract_frames(moving, stabilize=stabilize, backend="vidgear"))
+        landed.clear()
+        window = list(
+            extract_frames(
+                moving,
+                start_index=70,
+                end_index=100,
+                frame_step=3,
+                stabilize=stabilize,
+                backend="vidgear",
+            )
+        )
+        assert landed == [landed[0]] and landed[0] > 0  # seeked: the prefix was not decoded
+        assert len(window) == len(every[70:101:3])
+        assert all(np.array_equal(a, b) for a, b in zip(window, every[70:101:3], strict=True))
+        if not stabilize:
+            sparse = list(extract_frames(moving, frame_indices=[90, 95, 110], backend="vidgear"))
+            assert landed[-1] > 0
+            expected = [every[i] for i in (90, 95, 110)]
+            assert all(np.array_equal(a, b) for a, b in zip(sparse, expected, strict=True))
+
+
+def test_strided_reads_pick_a_strategy_and_match_decode_and_drop(tmp_path, monkeypatch) -> None:
+    """``frame_step`` > 1 picks decode-and-drop, keyframe-only decode or
+    per-sample seeks by estimated cost -- and every strategy returns exactly
+    the frames of decode-and-drop."""
+    import video_helper.main as vh_main
+
+    # Cost model: long strides over short GOPs seek, short strides decode,
+    # strides landing on known keyframes decode keyframes only.
+    assert vh_main._plan_strided_read(0, 999, 100, None, gop=10)[0] == "seek"
+    assert vh_main._plan_strided_read(0, 999, 2, None, gop=10)[0] == "decode"
+    assert vh_main._plan_strided_read(0, 999, 100, None, gop=None)[0] == "decode"
+    keyframes = np.arange(0, 1000, 25)
+    assert vh_main._plan_strided_read(0, 999, 50, keyframes)[0] == "keyframes"
+    assert vh_main._plan_strided_read(0, 999, 50, keyframes, keyframe_decode=False)[0] == "seek"
+
+    moving = _make_testsrc(tmp_path / "moving.mp4", 4, gop=15)
+    if not _have_pyav():  # the keyframe distance is estimated by a PyAV demux
+        return
+    assert vh_main._estimate_gop(moving) == 15
+    plan = vh_main._plan_strided_read
+    picked: list[str] = []
+
+    def _spy(*args, **kwargs):
+        strategy, costs = plan(*args, **kwargs)
+        picked.append(strategy)
+        return strategy, costs
+
+    cases = [
+        ("ffmpeg-pipe", 90, False, "seek"),
+        ("pyav", 40, False, "seek"),
+        ("pyav", 45, True, "keyframes"),
+    ]
+    for backend, step, packet_index, expected in cases:
+        options = {"frame_step": step, "start_index": 0, "backend": backend}
+        if packet_index:
+            options["packet_index"] = True
+        monkeypatch.setattr(vh_main, "_plan_strided_read", lambda *a, **k: ("decode", {}))
+        reference = list(extract_frames(moving, **options))
+        monkeypatch.setattr(vh_main, "_plan_strided_read", _spy)
+        frames = list(extract_frames(moving, **options))
+        assert picked[-1] == expected
+        assert len(frames) == len(reference) > 1
+        assert all(np.array_equal(a, b) for a, b in zip(frames, reference, strict=True))
+
+
+def test_keyframes_only_yields_true_keyframes_with_their_times(tmp_path, monkeypatch) -> None:
+    """``keyframes_only=True`` yields exactly the keyframes of the range, as
+    ``(time, frame)`` pairs with true presentation times, on PyAV and
+    ffmpeg-pipe alike -- and batched as ``(times, batch)``. The pipe takes
+    the times from its own ffmpeg process, never from a second ffprobe pass."""
+    import video_helper.main as vh_main
+
+    moving = _make_testsrc(tmp_path / "moving.mp4", 3, gop=20, extra=("-sc_threshold", "0"))
+    every = list(extract_frames(moving, backend="ffmpeg-pipe"))
+
+    def _no_probe(*args, **kwargs):
+        raise AssertionError("unexpected ffprobe call")
+
+    monkeypatch.setattr(vh_main.ffmpeg, "probe", _no_probe)  # metadata is cached by now
+    backends = ["ffmpeg-pipe"] + (["pyav"] if _have_pyav() else [])
+    for backend in backends:
+        pairs = list(extract_frames(moving, keyframes_only=True, backend=backend))
+        assert [round(t * 30) for t, _ in pairs] == [0, 20, 40, 60, 80]
+        assert all(np.array_equal(f, every[round(t * 30)]) for t, f in pairs)
+        window = list(
+            extract_frames(
+                moving, start_index=21, end_index=60, keyframes_only=True, backend=backend
+            )
+        )
+        assert [round(t * 30) for t, _ in window] == [40, 60]
+
+    times, batch = next(extract_frames(moving, keyframes_only=True, batch_size=4))
+    assert batch.shape == (4, 64, 96, 3) and times.dtype == np.float64
+    assert np.allclose(times * 30, [0, 20, 40, 60])
+    with pytest.raises(ValueError, match="keyframes_only"):
+        next(extract_frames(moving, keyframes_only=True, frame_step=2))
+    with pytest.raises(ValueError, match="vidgear"):
+        next(extract_frames(moving, keyframes_only=True, backend="vidgear"))
+
+
+def test_preview_quality_keeps_frames_and_shapes_with_close_pixels(tmp_path) -> None:
+    """``quality="preview"`` yields the frames and shapes of the default decode,
+    with close (not necessarily identical) pixels; lowres is only asked for
+    when the output fits the reduced frame, and never with hwaccel."""
+    from video_helper.main import _preview_decoder_options
+
+    assert _preview_decoder_options(96, 64, 24, None, None)["lowres"] == "2"
+    assert _preview_decoder_options(96, 64, 40, 30, None)["lowres"] == "1"
+    assert "lowres" not in _preview_decoder_options(96, 64, None, None, None)
+    assert "lowres" not in _preview_decoder_options(96, 64, 24, None, "cuda")
+    assert _preview_decoder_options(90, 64, 12, None, None)["lowres"] == "1"  # 90 % 4 != 0
+
+    backends = ["ffmpeg-pipe"] + (["pyav"] if _have_pyav() else [])
+    for encoder in ("libx264", "mpeg4"):
+        path = _make_testsrc(tmp_path / f"{encoder}.mp4", 1, codec=encoder)
+        for backend in backends:
+            for size in ({}, {"output_width": 24}, {"output_width": 40, "output_height": 40}):
+                ref = list(extract_frames(path, backend=backend, **size))
+                fast = list(extract_frames(path, backend=backend, quality="preview", **size))
+                assert len(fast) == len(ref) == 30
+                assert all(f.shape == r.shape for f, r in zip(fast, ref, strict=True))
+                if not size:
+                    # At source size only the decoder shortcuts differ (the
+                    # fast scaler aliases far more on this synthetic pattern).
+                    diff = [
+                        np.abs(f.astype(int) - r).mean() for f, r in zip(fast, ref, strict=True)
+                    ]
+                    assert np.mean(diff) < 5
+    with pytest.raises(ValueError, match="quality"):
+        next(extract_frames(path, quality="draft"))
+
+
+def test_calibrated_profile_drives_auto_dispatch(tmp_path, monkeypatch) -> None:
+    """A calibration run writes one winner per (resolution, codec, pattern,
+    hwaccel) cell; ``backend="auto"`` follows the profile for a measured cell
+    and keeps the built-in rules for the rest, or without a profile."""
+    import json
+
+    from video_helper.calibration import (
+        _profile_winner,
+        calibrate_backends,
+        load_backend_profile,
+        profile_key,
+    )
+
+    path = str(tmp_path / "profile.json")
+    monkeypatch.setenv("VIDEO_HELPER_BACKEND_PROFILE", path)
+    assert load_backend_profile() is None
+    assert _profile_winner(64, "h264", "sparse", None) is None
+
+    profile = calibrate_backends(resolutions=[(96, 64)], duration=1.0, repeats=1, hwaccel=False)
+    assert set(profile["winners"]) == {f"sd|h264|{p}|none" for p in ("full", "window", "sparse")}
+    assert set(profile["winners"].values()) <= set(_BACKENDS)
+    assert load_backend_profile() == profile
+
+    profile["winners"][profile_key(64, "h264", "sparse", None)] = "ffmpeg-pipe"
+    with open(path, "w") as f:
+        json.dump(profile, f)
+    assert _profile_winner(64, "h264", "sparse", None) == "ffmpeg-pipe"
+    assert _profile_winner(2160, "h264", "sparse", None) is None  # cell never measured
+    pick = _choose_backend(
+        "auto", stabilize=False, sparse=True, full_sequential=False, calibrated="ffmpeg-pipe"
+    )
+    assert pick == "ffmpeg-pipe"
+    # Explicit backends and stabilize still win over the profile.
+    assert _choose_backend("pyav", False, True, False, calibrated="ffmpeg-pipe") == "pyav"
+    assert _choose_backend("auto", True, False, False, calibrated="pyav") == "vidgear"
+
+
+def test_calibration_times_decodes_even_with_the_frame_cache_on() -> None:
+    """Repeated timed runs never hit the decoded-frame cache (they would time
+    a memory copy); the caller's cache is restored untouched afterwards."""
+    from video_helper import get_frame_cache, set_frame_cache
+    from video_helper.calibration import calibrate_backends
+
+    cache = set_frame_cache(64 * 2**20)
+    try:
+        calibrate_backends(
+            resolutions=[(96, 64)], duration=1.0, repeats=3, hwaccel=False, save=False
+        )
+        assert get_frame_cache() is cache
+        stats = cache.stats()
+        assert (stats.hits, stats.misses) == (0, 0)
+    finally:
+        set_frame_cache(None)
+
+
+def test_gray_color_is_single_channel_on_every_backend_and_destination(clip) -> None:
+    """color="gray" yields (H, W) uint8 frames on every backend, matching the
+    luma of the BGR frames, and single-channel torch / PIL outputs."""
+    import cv2
+
+    backends = ["vidgear", "ffmpeg-pipe"] + (["pyav"] if _have_pyav() else [])
+    for backend in backends:
+        bgr = list(extract_frames(clip, frame_indices=[0, 30], backend=backend))
+        gray = list(extract_frames(clip, frame_indices=[0, 30], backend=backend, color="gray"))
+        assert len(gray) == 2, backend
+        for g, f in zip(gray, bgr, strict=True):
+            assert g.shape == (64, 64) and g.dtype == np.uint8, backend
+            luma = cv2.cvtColor(f, cv2.COLOR_BGR2GRAY).astype(np.int16)
+            assert np.abs(g.astype(np.int16) - luma).max() <= 2, backend
+
+    batch = next(iter(extract_frames(clip, end_index=3, batch_size=4, color="gray")))
+    assert batch.shape == (4, 64, 64)
+    if _have_pil():
+        pil = next(iter(extract_frames(clip, end_index=0, destination="pil", color="gray")))
+        assert pil.mode == "L" and pil.size == (64, 64)
+    if _have_torch():
+        t = next(iter(extract_frames(clip, end_index=3, destination="torch", color="gray")))
+        assert tuple(t.shape) == (1, 64, 64)
+    with pytest.raises(ValueError, match="color"):
+        list(extract_frames(clip, end_index=0, color="rgb"))
+
+
+def test_gray_levels_agree_across_backends_on_a_bt709_source(tmp_path) -> None:
+    """Gray is the BT.601 luma of the BGR frame on every backend -- not the
+    source's Y plane, which on a BT.709 source is tens of levels away from
+    VidGear's cv2.cvtColor -- with or without an in-decoder resize."""
+    hd = _make_testsrc(
+        tmp_path / "bt709.mp4",
+        1,
+        size="160x96",
+        extra=("-vf", "scale=out_color_matrix=bt709", "-colorspace", "bt709"),
+    )
+    for kw in ({}, {"output_width": 64, "output_height": 64, "pad_color": "red"}):
+        ref = list(extract_frames(hd, end_index=5, backend="vidgear", color="gray", **kw))
+        for backend in ["ffmpeg-pipe"] + (["pyav"] if _have_pyav() else []):
+            gray = list(extract_frames(hd, end_index=5, backend=backend, color="gray", **kw))
+            assert len(gray) == len(ref) == 6, (backend, kw)
+            for g, r in zip(gray, ref, strict=True):
+                # Resizes differ slightly between swscale and cv2 at edges.
+                diff = np.abs(g.astype(np.int16) - r)
+                assert (np.median(diff) if kw else diff.max()) <= 1, (backend, kw)
+
+
+def test_parallel_decode_matches_sequential_frame_for_frame(tmp_path, monkeypatch) -> None:
+    """parallel=N splits a range into keyframe-aligned segments decoded in
+    worker processes; the frames come back identical and in order, for
+    both backends, with a step and an in-decoder transform."""
+    from video_helper.main import _ffprobe_keyframe_indices, _plan_parallel_segments
+
+    # Segments end right before a keyframe and tile the stepped range exactly.
+    keyframes = np.array([0, 30, 60, 90])
+    assert _plan_parallel_segments(0, 99, 1, keyframes, segment_frames=20) == [
+        (0, 29),
+        (30, 59),
+        (60, 89),
+        (90, 99),
+    ]
+    for segs in (
+        _plan_parallel_segments(5, 97, 4, keyframes, segment_frames=3),
+        _plan_parallel_segments(5, 97, 4, None, segment_frames=3),
+    ):
+        assert [i for a, b in segs for i in range(a, b + 1, 4)] == list(range(5, 98, 4))
+
+    moving = _make_testsrc(tmp_path / "moving.mp4", 3, gop=15)
+    # Without a packet index (no PyAV) the cuts still land on keyframes.
+    assert _ffprobe_keyframe_indices(moving, 30.0).tolist() == list(range(0, 90, 15))
+    assert _ffprobe_keyframe_indices("https://example.com/a.mp4", 30.0) is None
+    # Listed once per file: later calls (and a fresh process, through the
+    # catalog) reuse the keyframe times.
+    import video_helper.main as vh_main
+    from video_helper import get_catalog, set_catalog_dir
+
+    probes: list[str] = []
+    real_probe = vh_main.ffmpeg.probe
+
+    def _counting_probe(path, **kwargs):
+        probes.append(path)
+        return real_probe(path, **kwargs)
+
+    monkeypatch.setattr(vh_main.ffmpeg, "probe", _counting_probe)
+    previous = get_catalog()
+    set_catalog_dir(str(tmp_path / "cache"))
+    try:
+        vh_main._KEYFRAME_TIMES_CACHE.clear()
+        first = _ffprobe_keyframe_indices(moving, 30.0)
+        assert np.array_equal(_ffprobe_keyframe_indices(moving, 30.0), first)
+        vh_main._KEYFRAME_TIMES_CACHE.clear()
+        assert np.array_equal(_ffprobe_keyframe_indices(moving, 30.0), first)
+        assert len(probes) == 1
+    finally:
+        set_catalog_dir(previous.cache_dir if previous is not None else None)
+    backends = ["ffmpeg-pipe"] + (["pyav"] if _have_pyav() else [])
+    for backend in backends:
+        for kw in (
+            {},
+            {"start_index": 7, "end_index": 70, "frame_step": 3, "output_width": 48},
+            {"packet_index": False},
+        ):
+            seq = list(extract_frames(moving, backend=backend, **kw))
+            par = list(extract_frames(moving, backend=backend, parallel=3, **kw))
+            assert len(par) == len(seq) > 0, (backend, kw)
+            assert all(np.array_equal(a, b) for a, b in zip(par, seq, strict=True)), (backend, kw)
+
+    with pytest.raises(ValueError, match="parallel"):
+        list(extract_frames(moving, parallel=0))
+    with pytest.raises(ValueError, match="parallel"):
+        list(extract_frames(moving, parallel=2, frame_indices=[1, 2]))
+    with pytest.raises(ValueError, match="vidgear"):
+        list(extract_frames(moving, parallel=2, backend="vidgear"))
+
+
+def _count_sink(path: str, frame_idx: int, frame: np.ndarray) -> None:
+    """extract_frames_many sink (top-level, so workers can unpickle it): one file per frame."""
+    np.save(f"{path}.{frame_idx}.npy", frame[:1, :1])
+
+
+def test_extract_frames_many_matches_serial_and_reports_failures(tmp_path) -> None:
+    """Files extracted in worker processes come back identical to serial
+    extract_frames, in input order by default; a bad file is reported per
+    the error policy, and a sink keeps the frames in the workers. Frames are
+    tagged with their index in the video, not their output position."""
+    from video_helper import extract_frames_many
+
+    paths = []
+    for seconds in (2, 1, 3):
+        paths.append(_make_testsrc(tmp_path / f"clip{seconds}.mp4", seconds, size="64x48"))
+    missing = str(tmp_path / "missing.mp4")
+    serial = [(p, 7 * k, f) for p in paths for k, f in enumerate(extract_frames(p, frame_step=7))]
+
+    failures: dict[str, str] = {}
+    many = list(extract_frames_many([*paths, missing], workers=2, failures=failures, frame_step=7))
+    assert [(p, k) for p, k, _ in many] == [(p, k) for p, k, _ in serial]
+    assert all(np.array_equal(a[2], b[2]) for a, b in zip(many, serial, strict=True))
+    assert list(failures) == [missing]
+
+    unordered = list(extract_frames_many(paths, workers=2, ordered=False, frame_step=7))
+    assert sorted((p, k) for p, k, _ in unordered) == sorted((p, k) for p, k, _ in serial)
+    with pytest.raises(AssertionError):
+        list(extract_frames_many([missing, *paths], on_error="raise"))
+
+    counts = dict(extract_frames_many(paths, workers=2, sink=_count_sink, frame_step=7))
+    assert counts == {p: sum(1 for q, _, _ in serial if q == p) for p in paths}
+    assert len(list(tmp_path.glob("*.npy"))) == len(serial)
+    assert (tmp_path / "clip3.mp4.84.npy").exists()
+
+    sampled = list(extract_frames_many(paths[:1], workers=1, frame_interval=1.0))
+    assert [k for _, k, _ in sampled] == [0, 30]
+
+    # Keyframes-only items are (time, frame) pairs, times carried across.
+    keys = list(extract_frames_many(paths, workers=2, keyframes_only=True))
+    expected = [
+        (p, round(item[0] * 30), item)
+        for p in paths
+        for item in extract_frames(p, keyframes_only=True)
+    ]
+    assert [(p, k, item[0]) for p, k, item in keys] == [(p, k, item[0]) for p, k, item in expected]
+    assert all(np.array_equal(a[2][1], b[2][1]) for a, b in zip(keys, expected, strict=True))
+
+    with pytest.raises(ValueError, match="destination"):
+        list(extract_frames_many(paths, destination="torch"))
+    with pytest.raises(ValueError, match="on_error"):
+        list(extract_frames_many(paths, on_error="retry"))
+
+
+def test_decoder_threading_keeps_frames_identical(tmp_path) -> None:
+    """thread_type / decode_threads change how libavcodec schedules the
+    decode, never its output; an early close of a frame-threaded PyAV read
+    drains the decoder instead of hanging."""
+    moving = _make_testsrc(tmp_path / "moving.mp4", 2)
+    backends = ["ffmpeg-pipe"] + (["pyav"] if _have_pyav() else [])
+    for backend in backends:
+        ref = list(extract_frames(moving, backend=backend, start_index=10, end_index=40))
+        for thread_type in ("slice", "frame", "auto"):
+            got = list(
+                extract_frames(
+                    moving,
+                    backend=backend,
+                    start_index=10,
+                    end_index=40,
+                    thread_type=thread_type,
+                    decode_threads=3,
+                )
+            )
+            assert len(got) == len(ref) > 0, (backend, thread_type)
+            assert all(np.array_equal(a, b) for a, b in zip(got, ref, strict=True))
+        it = extract_frames(moving, backend=backend, thread_type="frame", decode_threads=4)
+        next(it)
+        it.close()
+
+    with pytest.raises(ValueError, match="thread_type"):
+        list(extract_frames(moving, thread_type="tile"))
+    with pytest.raises(ValueError, match="decode_threads"):
+        list(extract_frames(moving, decode_threads=-1))
+
+
+def test_prefetch_matches_inline_decode_and_shuts_down(clip) -> None:
+    """prefetch=N yields the inline frames in order, stops its producer
+    thread on an early close, and re-raises a decode error in the consumer
+    after the frames decoded before it."""
+    import threading
+
+    from video_helper.main import _prefetch
+
+    backends = ["vidgear", "ffmpeg-pipe"] + (["pyav"] if _have_pyav() else [])
+    for backend in backends:
+        kw = {"backend": backend, "start_index": 3, "end_index": 20, "frame_step": 2}
+        ref = list(extract_frames(clip, **kw))
+        got = list(extract_frames(clip, prefetch=3, **kw))
+        assert len(got) == len(ref) > 0, backend
+        assert all(np.array_equal(a, b) for a, b in zip(got, ref, strict=True)), backend
+
+        it = extract_frames(clip, backend=backend, prefetch=2)
+        next(it)
+        it.close()
+        assert not any(t.name == "video-helper-prefetch" for t in threading.enumerate())
+
+    closed = []
+
+    def _failing():
+        try:
+            yield np.zeros(1)
+            yield np.ones(1)
+            raise RuntimeError("corrupt packet")
+        finally:
+            closed.append(True)
+
+    out = []
+    with pytest.raises(RuntimeError, match="corrupt packet"):
+        for frame in _prefetch(_failing(), 4):
+            out.append(frame)
+    assert len(out) == 2 and closed == [True]
+
+    with pytest.raises(ValueError, match="prefetch"):
+        list(extract_frames(clip, prefetch=-1))
+
+
+def test_ffmpeg_pipe_ring_buffer_reuses_buffers_within_contract(tmp_path) -> None:
+    """ring_buffer=N reads into N reused buffers: every frame matches the
+    owned-frame read while it is within its N-frame validity window, with
+    and without prefetch (whose in-flight frames enlarge the ring)."""
+    clip = _make_testsrc(tmp_path / "moving.mp4", 1)
+    kw = {"backend": "ffmpeg-pipe", "start_index": 0, "end_index": 24}
+    ref = list(extract_frames(clip, **kw))
+    assert len({f.__array_interface__["data"][0] for f in ref}) == len(ref)
+    for prefetch in (None, 2):
+        window: list[np.ndarray] = []
+        buffers = set()
+        for i, frame in enumerate(extract_frames(clip, ring_buffer=3, prefetch=prefetch, **kw)):
+            buffers.add(frame.__array_interface__["data"][0])
+            window = ([*window, frame])[-3:]
+            for k, held in enumerate(window):
+                assert np.array_equal(held, ref[i - len(window) + 1 + k])
+        assert i == len(ref) - 1
+        assert len(buffers) == (3 if prefetch is None else 3 + prefetch + 1)
+
+    with pytest.raises(ValueError, match="ring_buffer"):
+        list(extract_frames(clip, ring_buffer=0))
+
+
 @pytest.mark.skipif(not _have_pyav(), reason="PyAV not installed")
 def test_pyav_vs_vidgear_count_matches(clip) -> None:
     """Same range/step should yield the same number of frames across backends."""
@@ -208,6 +752,71 @@ def test_pyav_vs_vidgear_count_matches(clip) -> None:
     assert abs(len(vid) - len(pyav)) <= 1
 
 
+@pytest.mark.skipif(not _have_pyav(), reason="PyAV not installed")
+def test_video_reader_random_access_matches_extract_frames(tmp_path) -> None:
+    """VideoReader serves the PyAV backend's frames in any order, and decodes
+    forward from its last position instead of seeking back for nearby reads."""
+    from video_helper import VideoReader
+
+    path = _make_testsrc(tmp_path / "moving.mp4", 2, gop=15)
+    ref = list(extract_frames(path, backend="pyav", packet_index=True))
+
+    with VideoReader(path) as reader:
+        assert len(reader) == len(ref) == 60
+        assert reader.frame_shape == ref[0].shape
+        for i in (40, 3, 4, 5, 59, -1, 0, 41):
+            assert np.array_equal(reader[i], ref[i])
+        batch = reader.get_batch([50, 2, 50])
+        assert batch.shape == (3, *ref[0].shape)
+        assert np.array_equal(batch[0], ref[50]) and np.array_equal(batch[1], ref[2])
+        assert np.array_equal(batch[2], ref[50])
+        strided = reader[10:30:4]
+        assert all(np.array_equal(strided[k], ref[10 + 4 * k]) for k in range(len(strided)))
+        assert np.array_equal(reader.get_frame_at(1.0), ref[30])
+        window = list(reader.frames(start_instant=0.5, end_instant=1.0, frame_interval=0.1))
+        expected = list(
+            extract_frames(
+                path, start_instant=0.5, end_instant=1.0, frame_interval=0.1, backend="pyav"
+            )
+        )
+        assert len(window) == len(expected) > 0
+        assert all(np.array_equal(a, b) for a, b in zip(window, expected, strict=True))
+
+        seeks = reader.seeks
+        for i in range(20, 30):
+            reader[i]
+        assert reader.seeks <= seeks + 1  # one seek in, then forward decode only
+
+        with pytest.raises(IndexError):
+            reader[60]
+    assert reader.closed
+    with pytest.raises(ValueError, match="closed"):
+        reader[0]
+
+
+@pytest.mark.skipif(not _have_pyav(), reason="PyAV not installed")
+def test_extract_frame_ranges_matches_one_call_per_range(tmp_path) -> None:
+    """Unsorted, overlapping ranges read in one pass give each range exactly the
+    frames of its own extract_frames call, tagged with its position."""
+    from video_helper import extract_frame_ranges
+
+    path = _make_testsrc(tmp_path / "moving.mp4", 2)
+    ranges = [(1.5, 1.8), (0.2, 0.6), (0.5, 0.9)]
+    per_range: dict[int, list[np.ndarray]] = {}
+    for range_id, frame in extract_frame_ranges(path, ranges, frame_interval=0.1):
+        per_range.setdefault(range_id, []).append(frame)
+    for range_id, (t0, t1) in enumerate(ranges):
+        expected = list(
+            extract_frames(
+                path, start_instant=t0, end_instant=t1, frame_interval=0.1, backend="pyav"
+            )
+        )
+        assert len(per_range[range_id]) == len(expected) > 0
+        assert all(np.array_equal(a, b) for a, b in zip(per_range[range_id], expected, strict=True))
+    with pytest.raises(ValueError, match="ends before it starts"):
+        list(extract_frame_ranges(path, [(1.0, 0.5)]))
+
+
 def test_backward_compat_default_backend(clip) -> None:
     """Omitting backend/hwaccel (old call signature) keeps working and yields
     the same (H, W, 3) BGR uint8 contract as an explicit call."""
@@ -266,10 +875,163 @@ def test_numpy_destination_batched(clip) -> None:
     assert total_frames == len(unbatched)
 
 
+def test_batch_assembly_writes_final_layout_in_place() -> None:
+    """Batches are assembled in preallocated arrays: NHWC as-is, NCHW / CTHW
+    with the fused BGR→RGB channel swap; a short tail batch; staging
+    buffers cycle; frames from a reused buffer land intact."""
+    from video_helper.main import _assemble_batches
+
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (6, 8, 3), dtype=np.uint8) for _ in range(7)]
+    ref = np.stack(frames)
+    rgb = ref[..., ::-1].transpose(0, 3, 1, 2)
+
+    nhwc = list(_assemble_batches(iter(frames), 3, "nhwc"))
+    assert [b.shape[0] for b in nhwc] == [3, 3, 1]
+    assert np.array_equal(np.concatenate(nhwc), ref)
+    nchw = list(_assemble_batches(iter(frames), 3, "nchw"))
+    assert np.array_equal(np.concatenate(nchw), rgb)
+    cthw = list(_assemble_batches(iter(frames), 3, "cthw"))
+    assert all(b.flags.c_contiguous for b in cthw)
+    assert np.array_equal(np.concatenate(cthw, axis=1), rgb.transpose(1, 0, 2, 3))
+    gray = list(_assemble_batches((f[:, :, 0] for f in frames), 4, "nchw"))
+    assert gray[0].shape == (4, 1, 6, 8) and np.array_equal(gray[0][:, 0], ref[:4, :, :, 0])
+
+    staged = [b.ctypes.data for b in _assemble_batches(iter(frames * 2), 2, "nchw", staging=2)]
+    assert len(set(staged)) == 2
+
+    # A single reused source buffer (ring_buffer=1): each frame must be
+    # copied into the batch before the next one overwrites it.
+    def _one_buffer():
+        buf = np.empty_like(frames[0])
+        for f in frames:
+            buf[...] = f
+            yield buf
+
+    assert np.array_equal(np.concatenate(list(_assemble_batches(_one_buffer(), 4, "nhwc"))), ref)
+
+
+def test_transfer_window_bounds_copies_in_flight() -> None:
+    """The window keeps at most ``depth`` asynchronous copies pending, waits
+    for the oldest first, drains the rest on demand, and accounts bytes,
+    batches and stall time."""
+    from video_helper import TransferStats
+    from video_helper.main import _TransferWindow
+
+    waited: list[int] = []
+
+    class _Event:
+        def __init__(self, i: int) -> None:
+            self.i = i
+
+        def synchronize(self) -> None:
+            waited.append(self.i)
+
+    stats = TransferStats()
+    window = _TransferWindow(2, stats)
+    for i in range(5):
+        window.submit(100, _Event(i))
+        assert waited == list(range(max(0, i - 1)))
+    window.drain()
+    assert waited == [0, 1, 2, 3, 4]
+    window.submit(50, blocked_s=0.25)
+    assert (stats.batches, stats.bytes_transferred) == (6, 550)
+    assert stats.stall_seconds >= 0.25
+
+    # Staging arrays come from the given allocator and cycle.
+    from video_helper.main import _assemble_batches
+
+    made: list[tuple[int, ...]] = []
+
+    def _alloc(shape: tuple[int, ...]) -> np.ndarray:
+        made.append(shape)
+        return np.empty(shape, dtype=np.uint8)
+
+    frames = (np.full((2, 3, 3), i, dtype=np.uint8) for i in range(8))
+    out = [b[:, 0, 0, 0].tolist() for b in _assemble_batches(frames, 2, "nchw", 3, _alloc)]
+    assert out == [[0, 1], [2, 3], [4, 5], [6, 7]] and made == [(2, 3, 2, 3)] * 3
+
+
+@pytest.mark.skipif(not _have_torch(), reason="torch not installed")
+def test_pin_memory_is_a_no_op_on_cpu(clip) -> None:
+    """pin_memory on CPU yields the same batches and counts no transfer."""
+    from video_helper import TransferStats
+
+    stats = TransferStats()
+    kw = {"end_index": 9, "destination": "torch", "device": "cpu", "batch_size": 4}
+    ref = list(extract_frames(clip, **kw))
+    got = list(extract_frames(clip, pin_memory=True, transfer_stats=stats, **kw))
+    assert [tuple(b.shape) for b in got] == [tuple(b.shape) for b in ref]
+    assert all(bool((a == b).all()) for a, b in zip(got, ref, strict=True))
+    assert stats == TransferStats()
+
+
+def test_preprocess_spec_validation(clip) -> None:
+    """Preprocess normalizes scalar stats and rejects bad fields, and
+    extract_frames rejects it off the torch destination."""
+    from video_helper import Preprocess
+
+    assert Preprocess(mean=0.5, std=[0.5]).mean == (0.5,)
+    assert Preprocess(size=[224.0, 224]).size == (224, 224)
+    for bad in (
+        {"dtype": "int8"},
+        {"mean": (0.1, 0.2)},
+        {"std": (1.0, 0.0, 1.0)},
+        {"size": (0, 10)},
+        {"interpolation": "lanczos"},
+    ):
+        with pytest.raises(ValueError, match="preprocess"):
+            Preprocess(**bad)
+    with pytest.raises(ValueError, match="destination='torch'"):
+        list(extract_frames(clip, end_index=2, preprocess={"dtype": "float16"}))
+
+
+@pytest.mark.skipif(not _have_torch(), reason="torch not installed")
+def test_preprocess_matches_reference_on_every_layout(tmp_path) -> None:
+    """Fused normalize + resize equals the textbook per-step computation,
+    per frame, per NCHW batch (channels_last) and per CTHW clip."""
+    import torch
+    import torch.nn.functional as F
+
+    from video_helper import Preprocess
+
+    spec = Preprocess(mean=(0.4, 0.5, 0.6), std=(0.2, 0.25, 0.3), size=(32, 40))
+    mean = torch.tensor(spec.mean).view(1, 3, 1, 1)
+    std = torch.tensor(spec.std).view(1, 3, 1, 1)
+
+    def _ref(nchw_uint8):
+        x = F.interpolate(nchw_uint8.float(), size=(32, 40), mode="bilinear", antialias=True)
+        return (x / 255 - mean) / std
+
+    clip = _make_testsrc(tmp_path / "moving.mp4", 1)
+    kw = {"end_index": 7, "destination": "torch"}
+    raw = next(iter(extract_frames(clip, batch_size=4, **kw)))
+    batch = next(
+        iter(
+            extract_frames(
+                clip,
+                batch_size=4,
+                preprocess=Preprocess(**{**spec.__dict__, "channels_last": True}),
+                **kw,
+            )
+        )
+    )
+    assert batch.dtype == torch.float32 and batch.shape == (4, 3, 32, 40)
+    assert batch.is_contiguous(memory_format=torch.channels_last)
+    assert torch.allclose(batch, _ref(raw), atol=1e-5)
+
+    frame = next(iter(extract_frames(clip, preprocess=spec, **kw)))
+    assert torch.allclose(frame, _ref(raw[:1])[0], atol=1e-5)
+
+    clip_t = next(iter(extract_frames(clip, batch_size=4, layout="video", preprocess=spec, **kw)))
+    assert clip_t.shape == (3, 4, 32, 40)
+    assert torch.allclose(clip_t.permute(1, 0, 2, 3), _ref(raw), atol=1e-5)
+
+
 def test_extract_frames_rejects_invalid_options(clip) -> None:
     """Every input-validation error path raises the documented ValueError,
     naming the offending option -- covers destination/layout/batch_size
-    validation plus the ffmpeg-pipe backend's sparse-mode restriction."""
+    validation."""
     with pytest.raises(ValueError, match="destination"):
         list(extract_frames(clip, start_instant=0.0, end_instant=0.2, destination="bogus"))
     with pytest.raises(ValueError, match="layout"):
@@ -289,8 +1051,6 @@ def test_extract_frames_rejects_invalid_options(clip) -> None:
                 clip, start_instant=0.0, end_instant=0.2, destination="numpy", batch_size=0
             )
         )
-    with pytest.raises(ValueError, match="sparse"):
-        list(extract_frames(clip, frame_times=[0.5, 1.0], backend="ffmpeg-pipe", hwaccel=None))
 
 
 def test_destination_raises_clear_importerror_when_optional_dep_absent(clip) -> None:
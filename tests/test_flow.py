@@ -105,6 +105,13 @@ def test_grayscale_mode_yields_3_channel_arrays_with_correct_flow() -> None:
         vx = out[1][20:44, 24:40, 1]
         assert vx.mean() > 0.5, method  # moved right -> positive vx
 
+        # Already-gray (H, W) input -- extract_frames(color="gray") -- gives
+        # the same result without any color conversion.
+        gray_pair = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in (frame0, frame1)]
+        from_gray = list(iter_frame_optical_flow(iter(gray_pair), method=method, grayscale=True))
+        for a, b in zip(from_gray, out, strict=True):
+            np.testing.assert_allclose(a, b)
+
 
 def test_dependency_and_input_validation_error_paths(monkeypatch) -> None:
     """Every 'clean error, not a crash' path in this module: an unknown flow
@@ -0,0 +1,102 @@
+"""
+Tests for the optional decoded-frame cache (``video_helper.frame_cache``).
+
+What matters: the cache is bounded by bytes (LRU eviction, never over
+budget), its statistics add up, and with it enabled ``extract_frames`` and
+``VideoReader`` return exactly the frames they return without it — hits
+included, and a caller writing into a yielded frame never corrupts a later
+hit.
+"""
+
+from __future__ import annotations
+
+import subprocess
+
+import numpy as np
+import os_helper as osh
+import pytest
+
+from video_helper import (
+    FrameCache,
+    VideoReader,
+    extract_frames,
+    get_frame_cache,
+    set_frame_cache,
+)
+from video_helper.main import _have_pyav
+
+osh.verbosity(0)
+
+
+@pytest.fixture
+def frame_cache():
+    """Enable a fresh 64 MB frame cache for one test, then restore the previous one."""
+    previous = get_frame_cache()
+    cache = set_frame_cache(64 * 2**20)
+    yield cache
+    set_frame_cache(previous.max_bytes if previous is not None else None)
+
+
+def test_lru_evicts_by_bytes_and_counts() -> None:
+    cache = FrameCache(3 * 1000)
+    frames = [np.full(1000, i, dtype=np.uint8) for i in range(4)]
+    for i in range(3):
+        cache.put(("f", i), frames[i])
+    assert cache.get(("f", 0)) is frames[0]  # 0 is now the most recently used
+    cache.put(("f", 3), frames[3])  # over budget: evicts 1, the LRU entry
+    assert cache.get(("f", 1)) is None
+    cache.put(("big", 0), np.zeros(4000, dtype=np.uint8))  # larger than the budget: skipped
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions) == (1, 1, 1)
+    assert (stats.entries, stats.bytes_used, stats.max_bytes) == (3, 3000, 3000)
+    assert stats.hit_rate == 0.5
+    cache.clear()
+    assert len(cache) == 0 and cache.stats().bytes_used == 0
+    with pytest.raises(ValueError, match="max_bytes"):
+        FrameCache(0)
+
+
+@pytest.mark.skipif(not _have_pyav(), reason="PyAV not installed")
+def test_cached_reads_match_uncached_and_hit_on_overlap(tmp_path, frame_cache) -> None:
+    path = str(tmp_path / "moving.mp4")
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-v",
+            "error",
+            "-y",
+            "-f",
+            "lavfi",
+            "-i",
+            "testsrc2=size=96x64:rate=30:duration=2",
+            "-c:v",
+            "libx264",
+            path,
+        ],
+        check=True,
+    )
+    set_frame_cache(None)
+    ref = list(extract_frames(path, backend="pyav"))
+    set_frame_cache(frame_cache.max_bytes)
+    cache = get_frame_cache()
+
+    first = list(extract_frames(path, start_index=10, end_index=30, backend="pyav"))
+    assert cache.stats().misses == 21 and cache.stats().hits == 0
+    first[0][:] = 0  # the caller owns its frames: this must not reach the cache
+
+    second = list(extract_frames(path, start_index=20, end_index=40, backend="pyav"))
+    assert cache.stats().hits == 11
+    assert all(np.array_equal(f, ref[20 + k]) for k, f in enumerate(second))
+    sparse = list(extract_frames(path, frame_indices=[55, 10, 25], backend="pyav"))
+    assert all(np.array_equal(f, ref[i]) for f, i in zip(sparse, [10, 25, 55], strict=True))
+
+    # A reader on the same numbering (no packet index here) shares entries with
+    # extract_frames and skips the decoder on hits.
+    with VideoReader(path, packet_index=False) as reader:
+        batch = reader.get_batch([12, 10, 30])
+        assert reader.frames_decoded == 0
+        assert np.array_equal(batch[1], ref[10])
+    # Another output transform is another entry, never a false hit.
+    gray = next(extract_frames(path, start_index=10, end_index=10, color="gray", backend="pyav"))
+    assert gray.ndim == 2
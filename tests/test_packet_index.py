@@ -0,0 +1,190 @@
+"""
+Tests for the demux packet index (``video_packet_index``) and its use by the
+PyAV extraction path.
+
+Two properties matter: on a CFR clip the index changes nothing about which
+frames come out (it only seeks more precisely), and on a VFR clip it makes
+frame indices, times and the frame count exact where ``duration × fps``
+is only an estimate. The caching levels (sidecar, invalidation on rewrite)
+are checked by counting real demux passes.
+"""
+
+from __future__ import annotations
+
+import subprocess
+
+import numpy as np
+import os_helper as osh
+import pytest
+
+import video_helper.main as vh_main
+from video_helper import extract_frames, video_dimensions, video_packet_index
+from video_helper.main import _build_packet_index, _have_pyav
+
+osh.verbosity(0)
+
+pytestmark = pytest.mark.skipif(not _have_pyav(), reason="PyAV not installed")
+
+
+def _encode(path: str, vf: str | None = None) -> str:
+    """Encode 2 s of 96x64 testsrc2 at 30 fps, GOP 10 with B-frames."""
+    cmd = [
+        "ffmpeg",
+        "-v",
+        "error",
+        "-y",
+        "-f",
+        "lavfi",
+        "-i",
+        "testsrc2=size=96x64:rate=30:duration=2",
+    ]
+    if vf:
+        cmd += ["-vf", vf, "-fps_mode", "vfr"]
+    cmd += ["-c:v", "libx264", "-g", "10", "-bf", "2", path]
+    subprocess.run(cmd, check=True)
+    return path
+
+
+@pytest.fixture(scope="module")
+def cfr_clip(tmp_path_factory) -> str:
+    return _encode(str(tmp_path_factory.mktemp("pktidx") / "cfr.mp4"))
+
+
+@pytest.fixture(scope="module")
+def vfr_clip(tmp_path_factory) -> str:
+    """30 fps for the first second, then every third frame (10 fps): 40 frames."""
+    return _encode(
+        str(tmp_path_factory.mktemp("pktidx") / "vfr.mp4"),
+        vf="select='lt(n\\,30)+not(mod(n\\,3))'",
+    )
+
+
+def test_index_matches_the_stream_and_leaves_cfr_output_unchanged(cfr_clip) -> None:
+    """60 frames, one keyframe per GOP of 10, frame i at i/30 s; sparse and
+    windowed PyAV reads return the same frames with and without the index."""
+    index = video_packet_index(cfr_clip)
+    assert index.frame_count == 60
+    assert int(index.keyframe.sum()) == 6
+    np.testing.assert_allclose(index.frame_times, np.arange(60) / 30)
+    assert index.keyframe_pts_before(27) == index.frame_pts[20]
+
+    for kwargs in ({"frame_indices": [3, 17, 41, 59]}, {"start_index": 12, "end_index": 33}):
+        plain = list(extract_frames(cfr_clip, backend="pyav", packet_index=False, **kwargs))
+        indexed = list(extract_frames(cfr_clip, backend="pyav", packet_index=True, **kwargs))
+        assert len(plain) == len(indexed) > 0
+        assert all(np.array_equal(a, b) for a, b in zip(plain, indexed, strict=True))
+
+
+def test_index_makes_vfr_frame_numbering_exact(vfr_clip) -> None:
+    """``duration × fps`` over-counts a VFR clip; the index knows the real
+    count, and ``frame_indices`` / ``frame_times`` land on the right frames."""
+    d = video_dimensions(vfr_clip)
+    index = video_packet_index(vfr_clip)
+    assert index.frame_count == 40
+    assert int(d["duration"] * d["frame_rate"]) != 40
+
+    every = list(extract_frames(vfr_clip, backend="pyav", packet_index=True))
+    assert len(every) == 40
+    picked = list(
+        extract_frames(vfr_clip, backend="pyav", frame_indices=[5, 33, 39], packet_index=True)
+    )
+    assert all(np.array_equal(a, every[i]) for a, i in zip(picked, (5, 33, 39), strict=True))
+    # 1.4 s is frame 34 (30 frames in the first second, then 10 fps).
+    (at_t,) = extract_frames(vfr_clip, backend="pyav", frame_times=[1.4], packet_index=True)
+    assert np.array_equal(at_t, every[34])
+
+
+def test_a_cached_index_never_changes_default_numbering(tmp_path) -> None:
+    """Without ``packet_index=True`` frames stay on the ``duration × fps``
+    grid whether or not an index is cached, so a call returns the same frames
+    on every run; asking for the index with another backend is an error."""
+    vfr = _encode(str(tmp_path / "vfr.mp4"), vf="select='lt(n\\,30)+not(mod(n\\,3))'")
+    calls = [
+        {"backend": "pyav", "frame_times": [0.5, 1.4, 1.9]},
+        {"backend": "pyav", "start_index": 20, "end_index": 50},
+        {"backend": "ffmpeg-pipe", "frame_indices": [10, 35, 50]},
+    ]
+    before = [list(extract_frames(vfr, **kw)) for kw in calls]
+    video_packet_index(vfr)  # cached from here on
+    after = [list(extract_frames(vfr, **kw)) for kw in calls]
+    for a, b in zip(before, after, strict=True):
+        assert len(a) == len(b) > 0
+        assert all(np.array_equal(x, y) for x, y in zip(a, b, strict=True))
+    with pytest.raises(ValueError, match="packet_index"):
+        next(extract_frames(vfr, backend="ffmpeg-pipe", packet_index=True))
+
+
+def test_sidecar_is_reused_and_invalidated_on_rewrite(tmp_path, monkeypatch) -> None:
+    """With ``sidecar=True`` a fresh process reuses ``.packets.npz`` instead of
+    demuxing again; rewriting the video makes the sidecar stale."""
+    clip = _encode(str(tmp_path / "clip.mp4"))
+    builds: list[str] = []
+
+    def _counting_build(video_file, http_headers=None):
+        builds.append(video_file)
+        return _build_packet_index(video_file, http_headers)
+
+    monkeypatch.setattr(vh_main, "_build_packet_index", _counting_build)
+    monkeypatch.setattr(vh_main, "_PACKET_INDEX_CACHE", vh_main.OrderedDict())
+
+    assert video_packet_index(clip, build=False) is None
+    first = video_packet_index(clip, sidecar=True)
+    assert (tmp_path / "clip.mp4.packets.npz").is_file()
+
+    vh_main._PACKET_INDEX_CACHE.clear()  # a new process: only the sidecar survives
+    again = video_packet_index(clip, build=False)
+    assert np.array_equal(again.pts, first.pts) and again.time_base == first.time_base
+    assert len(builds) == 1
+
+    _encode(str(tmp_path / "clip.mp4"), vf="select='lt(n\\,15)'")
+    vh_main._PACKET_INDEX_CACHE.clear()
+    assert video_packet_index(clip, build=False) is None
+    assert video_packet_index(clip).frame_count == 15
+    assert len(builds) == 2
+
+
+def test_seek_planner_reseeks_only_across_expensive_gaps(cfr_clip) -> None:
+    """Gaps shorter than the lead-in from the target's keyframe are decoded
+    through; long gaps start a new seek cluster. Frames are unchanged."""
+    from video_helper.main import _plan_sparse_seeks
+
+    keyframes = np.arange(0, 10_000, 100)
+    assert _plan_sparse_seeks([5, 40, 950, 980, 5_000], keyframes, seek_cost=10) == [
+        [5, 40],
+        [950, 980],
+        [5_000],
+    ]
+    # Without an index, only gaps longer than the assumed GOP re-seek.
+    assert _plan_sparse_seeks([0, 200, 900], None, assumed_gop=250, seek_cost=10) == [
+        [0, 200],
+        [900],
+    ]
+    assert _plan_sparse_seeks([0, 900], keyframes, seek_cost=float("inf")) == [[0, 900]]
+
+    # GOP 10 clip: frames 2, 45, 58 are three clusters, same frames as before.
+    every = list(extract_frames(cfr_clip, backend="pyav", packet_index=True))
+    for use_index in (True, False):
+        picked = list(
+            extract_frames(
+                cfr_clip, backend="pyav", frame_indices=[2, 45, 58], packet_index=use_index
+            )
+        )
+        assert all(np.array_equal(a, every[i]) for a, i in zip(picked, (2, 45, 58), strict=True))
+
+
+def test_video_reader_numbers_frames_like_extract_frames_on_vfr(vfr_clip) -> None:
+    """A reader numbers frames as extract_frames does for the same
+    ``packet_index``: on the grid by default (the index then only plans
+    seeks), by presentation order with ``packet_index=True``."""
+    from video_helper import VideoReader
+
+    window = {"start_instant": 0.5, "end_instant": 1.5, "frame_interval": 0.1}
+    for packet_index in (None, True):
+        expected = list(
+            extract_frames(vfr_clip, backend="pyav", packet_index=packet_index, **window)
+        )
+        with VideoReader(vfr_clip, packet_index=packet_index) as reader:
+            got = list(reader.frames(**window))
+            assert (reader.packet_index is not None) == bool(packet_index)
+        assert len(got) == len(expected) > 0, packet_index
+        assert all(np.array_equal(a, b) for a, b in zip(got, expected, strict=True))
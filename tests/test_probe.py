@@ -0,0 +1,185 @@
+"""
+Tests for the shared probe layer behind ``is_valid_video_file`` /
+``video_dimensions`` / ``video_duration``.
+
+The cache contract is the point here: one ffprobe per (path, size, mtime)
+no matter how many public helpers ask, a rewritten file is re-probed, and
+the LRU stays bounded. The uncached probe is wrapped with a counter so the
+tests assert on real probes, not on cache internals; both engines (in-process
+PyAV, ``ffprobe`` subprocess) must agree on every field.
+"""
+
+from __future__ import annotations
+
+import subprocess
+
+import os_helper as osh
+import pytest
+
+import video_helper.main as vh_main
+from video_helper import (
+    black_video,
+    clear_probe_cache,
+    is_valid_video_file,
+    probe_many,
+    video_dimensions,
+    video_duration,
+    video_metadata,
+)
+from video_helper.main import _have_pyav, _probe_uncached
+
+osh.verbosity(0)
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory) -> str:
+    """A 1-second 64x64 H.264 clip at 30 fps, no audio."""
+    p = tmp_path_factory.mktemp("probe") / "clip.mp4"
+    black_video(1.0, 64, 64, str(p), frame_rate=30)
+    return str(p)
+
+
+@pytest.fixture
+def probe_calls(monkeypatch) -> list[str]:
+    """Count real (uncached) probes, starting from a cold cache."""
+    calls: list[str] = []
+
+    def _counting_probe(video_file, http_headers, engine=None):
+        calls.append(video_file)
+        return _probe_uncached(video_file, http_headers, engine)
+
+    monkeypatch.setattr(vh_main, "_probe_uncached", _counting_probe)
+    clear_probe_cache()
+    yield calls
+    clear_probe_cache()
+
+
+def test_public_helpers_share_one_probe(clip, probe_calls) -> None:
+    """validate + dimensions + duration + metadata on one file = one ffprobe,
+    and the metadata is a superset of the historical dimensions dict."""
+    assert is_valid_video_file(clip)
+    dims = video_dimensions(clip)
+    assert video_duration(clip) == pytest.approx(dims["duration"])
+    meta = video_metadata(clip)
+    assert len(probe_calls) == 1
+
+    assert set(dims) == {"width", "height", "duration", "frame_rate", "has_sound"}
+    assert {k: meta[k] for k in dims} == dims
+    assert (meta["width"], meta["height"]) == (64, 64)
+    assert meta["video_codec"] == "h264"
+    assert meta["pix_fmt"] == "yuv420p"
+    assert meta["nb_frames"] == 30
+    assert meta["has_sound"] is False
+    assert meta["audio_codec"] is None and meta["sample_rate"] is None
+
+    # Returned dicts are copies: mutating one never poisons the cache.
+    meta["width"] = -1
+    assert video_metadata(clip)["width"] == 64
+
+
+def test_rewritten_file_is_reprobed(tmp_path, probe_calls) -> None:
+    """Rewriting a file in place (new size/mtime) is a cache miss."""
+    path = str(tmp_path / "rewritten.mp4")
+    black_video(0.5, 64, 64, path)  # validates its output: first probe
+    assert video_dimensions(path)["width"] == 64
+    assert len(probe_calls) == 1
+    black_video(0.5, 96, 64, path)  # same path, new content: probed again
+    assert video_dimensions(path)["width"] == 96
+    assert len(probe_calls) == 2
+
+
+def test_lru_evicts_least_recently_used(tmp_path, probe_calls, monkeypatch) -> None:
+    """With room for two entries, probing a third file evicts the coldest."""
+    monkeypatch.setattr(vh_main, "_PROBE_CACHE_SIZE", 2)
+    paths = []
+    for i in range(3):
+        p = str(tmp_path / f"c{i}.mp4")
+        black_video(0.5, 64, 64, p)
+        paths.append(p)
+    probe_calls.clear()
+
+    video_dimensions(paths[0])
+    video_dimensions(paths[1])
+    video_dimensions(paths[0])  # hit — paths[1] is now the LRU entry
+    video_dimensions(paths[2])  # evicts paths[1]
+    video_dimensions(paths[0])  # still cached
+    video_dimensions(paths[1])  # re-probed
+    assert probe_calls == [paths[0], paths[1], paths[2], paths[1]]
+    assert len(vh_main._PROBE_CACHE) == 2
+
+
+def test_bad_numeric_env_values_fall_back_to_defaults() -> None:
+    """Tunables are read at import time: a non-numeric value is logged and
+    replaced by the default instead of breaking ``import video_helper``."""
+    import os
+    import sys
+
+    env = dict(os.environ)
+    env.update(VIDEO_HELPER_PROBE_CACHE_SIZE="lots", VIDEO_HELPER_FRAME_CACHE_MB="1GB")
+    code = (
+        "import video_helper.main as m, video_helper.frame_cache as f; "
+        "print(m._PROBE_CACHE_SIZE, f.get_frame_cache())"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+    )
+    assert out.stdout.split() == ["512", "None"]
+
+
+def test_invalid_files_are_not_cached(tmp_path, probe_calls) -> None:
+    """A non-video file fails validation every time (failures never cached)."""
+    bogus = tmp_path / "fake.mp4"
+    bogus.write_bytes(b"not a video")
+    assert not is_valid_video_file(str(bogus))
+    assert not is_valid_video_file(str(bogus))
+    assert len(probe_calls) == 2
+
+
+@pytest.mark.skipif(not _have_pyav(), reason="PyAV not installed")
+def test_pyav_and_ffprobe_engines_agree(clip, tmp_path) -> None:
+    """The in-process PyAV engine returns exactly the ffprobe engine's dict,
+    including audio parameters, and rejects non-video files the same way."""
+    sources = ["-f", "lavfi", "-i", "testsrc2=size=96x64:rate=25:duration=1"]
+    sources += ["-f", "lavfi", "-i", "sine=d=1"]
+    # Codecs whose usual decoder is not named after them (libdav1d for AV1,
+    # mp3float for MP3): both engines must still report the codec name.
+    codecs = {"h264": "aac", "av1": "mp3"}
+    encoders = {"h264": "libx264", "av1": "libaom-av1", "aac": "aac", "mp3": "libmp3lame"}
+    paths = [clip]
+    for vcodec, acodec in codecs.items():
+        path = str(tmp_path / f"{vcodec}_{acodec}.mkv")
+        cmd = ["ffmpeg", "-v", "error", "-y", *sources, "-c:v", encoders[vcodec]]
+        if vcodec == "av1":
+            cmd += ["-cpu-used", "8"]  # fastest libaom preset: the content is irrelevant
+        subprocess.run([*cmd, "-c:a", encoders[acodec], "-shortest", path], check=True)
+        paths.append(path)
+        meta = video_metadata(path, engine="pyav")
+        assert (meta["video_codec"], meta["audio_codec"]) == (vcodec, acodec)
+    for path in paths:
+        assert _probe_uncached(path, None, "pyav") == _probe_uncached(path, None, "ffprobe")
+
+    with pytest.raises(ValueError, match="probe engine"):
+        video_metadata(clip, engine="bogus")
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_probe_many_streams_records_and_reports_errors_per_item(clip, tmp_path, processes) -> None:
+    """A lazy generator of paths comes back as one record per path; a bad file
+    or missing path becomes an ``error`` record instead of aborting the sweep."""
+    bogus = tmp_path / "fake.mp4"
+    bogus.write_bytes(b"not a video")
+    paths = [clip, str(bogus), str(tmp_path / "missing.mp4"), clip]
+
+    records = list(probe_many(iter(paths), workers=2, processes=processes))
+
+    assert sorted(r["path"] for r in records) == sorted(paths)
+    ok = [r for r in records if "error" not in r]
+    assert len(ok) == 2
+    assert all(r == {"path": clip, **video_dimensions(clip)} for r in ok)
+    errors = {r["path"]: r["error"] for r in records if "error" in r}
+    assert set(errors) == {str(bogus), str(tmp_path / "missing.mp4")}
+
+    full = next(probe_many([clip], full=True))
+    assert full["video_codec"] == "h264"
+    with pytest.raises(ValueError, match="workers"):
+        next(probe_many([clip], workers=0))
@@ -19,6 +19,7 @@ import pytest
 from video_helper import extract_frames, is_valid_video_file
 from video_helper.main import (
     _apply_output_transform,
+    _have_pyav,
     _join_http_headers,
     _parse_pad_color,
 )
@@ -163,6 +164,53 @@ def test_extract_frames_output_width_height_pad_e2e() -> None:
     assert width_only[0].shape[1] == 640
 
 
+@pytest.fixture(scope="module")
+def moving_clip(tmp_path_factory) -> str:
+    """A 1-second 160x90 testsrc2 clip (non-square, so letterboxing pads)."""
+    import subprocess
+
+    p = str(tmp_path_factory.mktemp("moving") / "moving.mp4")
+    source = "testsrc2=size=160x90:rate=25:duration=1"
+    cmd = ["ffmpeg", "-v", "error", "-y", "-f", "lavfi", "-i", source]
+    subprocess.run([*cmd, "-c:v", "libx264", "-pix_fmt", "yuv420p", p], check=True)
+    return p
+
+
+@pytest.mark.parametrize(
+    "size",
+    [(320, 320), (200, None), (None, 90), (97, 61)],
+    ids=["letterbox", "width-only", "height-only", "odd-sizes"],
+)
+def test_in_decoder_resize_matches_cv2_path_across_backends(moving_clip, size) -> None:
+    """PyAV and ffmpeg-pipe scale+pad inside the decoder; their frames have
+    exactly the shape of the post-decode cv2 path (VidGear) and close pixels
+    (different resamplers, same geometry and padding)."""
+    width, height = size
+    backends = ["vidgear", "ffmpeg-pipe"] + (["pyav"] if _have_pyav() else [])
+    out = {
+        backend: list(
+            extract_frames(
+                moving_clip,
+                frame_indices=[0, 6, 12],
+                output_width=width,
+                output_height=height,
+                pad_color="#204060",
+                backend=backend,
+            )
+        )
+        for backend in backends
+    }
+    reference = out["vidgear"]
+    assert len(reference) == 3
+    for backend in backends[1:]:
+        assert len(out[backend]) == 3, backend
+        for got, ref in zip(out[backend], reference, strict=True):
+            assert got.shape == ref.shape, backend
+            assert got.dtype == np.uint8
+            diff = np.abs(got.astype(np.int16) - ref.astype(np.int16))
+            assert diff.mean() < 8, backend
+
+
 @pytest.mark.skipif(not _has_fixture(), reason="example_converted.mp4 missing")
 def test_extract_frames_rejects_invalid_output_options_e2e() -> None:
     """extract_frames rejects zero/negative output dimensions and a
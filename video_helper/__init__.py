@@ -50,26 +50,38 @@ __email__ = "warithmetics@deraison.ai"
 # Import the public surface from ``main``. Names re-exported here are
 # what downstream callers should rely on; anything not listed in
 # ``__all__`` is considered private.
+from .calibration import calibrate_backends, load_backend_profile
+from .catalog import MetadataCatalog, get_catalog, set_catalog_dir
 from .flow import extract_optical_flow, iter_frame_optical_flow, resize_flow
+from .frame_cache import FrameCache, FrameCacheStats, get_frame_cache, set_frame_cache
 from .main import (
+    PacketIndex,
+    Preprocess,
+    TransferStats,
     black_video,
     burn_subtitles,
+    clear_probe_cache,
     compress_video,
     concat_videos,
     dump_frames,
     extract_audio_track,
     extract_frames,
+    extract_frames_many,
     extract_unique_colors,
     extract_video_chunk,
     image_loop_to_video,
     is_valid_video_file,
     mux_audio_video,
     overlay_image,
+    probe_many,
     srt2vtt,
     video_converter,
     video_dimensions,
     video_duration,
+    video_metadata,
+    video_packet_index,
 )
+from .reader import VideoReader, extract_frame_ranges
 
 # Define the public API for the library
 __all__ = [
@@ -80,8 +92,27 @@ __all__ = [
     "srt2vtt",
     "is_valid_video_file",
     "video_dimensions",
+    "video_metadata",
+    "clear_probe_cache",
+    "probe_many",
+    "video_packet_index",
+    "PacketIndex",
+    "VideoReader",
+    "Preprocess",
+    "TransferStats",
+    "set_catalog_dir",
+    "get_catalog",
+    "MetadataCatalog",
+    "set_frame_cache",
+    "get_frame_cache",
+    "FrameCache",
+    "FrameCacheStats",
+    "calibrate_backends",
+    "load_backend_profile",
     "video_converter",
     "extract_frames",
+    "extract_frame_ranges",
+    "extract_frames_many",
     "dump_frames",
     "extract_video_chunk",
     "video_duration",
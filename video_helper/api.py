@@ -47,6 +47,7 @@ Warith Harchaoui, Ph.D. — https://linkedin.com/in/warith-harchaoui/
 from __future__ import annotations
 
 import io
+import json
 import shutil
 import tempfile
 import zipfile
@@ -698,6 +699,12 @@ def extract_frames_route(
     output_width: int | None = Form(None),
     output_height: int | None = Form(None),
     pad_color: str = Form("black"),
+    keyframes_only: bool = Form(
+        False, description="Only the keyframes; the ZIP then holds a times.json."
+    ),
+    quality: str = Form(
+        "default", description="'default' or 'preview' (faster decode, slightly degraded frames)."
+    ),
 ) -> StreamingResponse:
     """Extract frames as PNGs; response is a ZIP archive."""
     # cv2 import is deferred to request time: importing OpenCV at module load
@@ -717,7 +724,8 @@ def extract_frames_route(
         # Extraction can fail deep in a backend; classify the status code here
         # while cleanup is still handled by the context manager above.
         try:
-            for i, frame in enumerate(
+            times: list[float] = []
+            for i, item in enumerate(
                 extract_frames(
                     video_path=str(src),
                     frame_step=frame_step,
@@ -728,9 +736,17 @@ def extract_frames_route(
                     output_width=output_width,
                     output_height=output_height,
                     pad_color=pad_color,
+                    keyframes_only=keyframes_only,
+                    quality=quality,
                 )
             ):
-                cv2.imwrite(str(frames_dir / f"frame_{i:09d}.png"), frame)
+                # Keyframes-only yields (time, frame) pairs.
+                if keyframes_only:
+                    t, item = item
+                    times.append(t)
+                cv2.imwrite(str(frames_dir / f"frame_{i:09d}.png"), item)
+            if keyframes_only:
+                (frames_dir / "times.json").write_text(json.dumps(times))
         except Exception as exc:
             raise HTTPException(
                 status_code=_status_for(exc), detail=f"extract-frames failed: {exc}"
@@ -0,0 +1,446 @@
+"""
+video_helper.calibration
+========================
+
+Per-machine backend calibration: measure which decode backend wins on *this*
+machine, persist the winners, and let ``extract_frames(backend="auto")``
+follow them.
+
+Module summary
+--------------
+The built-in routing rules of :func:`video_helper.main._choose_backend`
+("vidgear for full sequential reads, PyAV for windows and sparse reads")
+come from one Apple Silicon run (see ``SPEED_ANALYSIS.md``). Other machines
+rank the backends differently: a Linux x86 server has no AVFoundation, a
+box with a GPU decoder wins with hwaccel, a build of OpenCV may be slow.
+
+:func:`calibrate_backends` micro-benchmarks every installed backend on
+short synthetic clips (or on sample files of your own) for each
+
+- **resolution bucket** — ``"sd"`` (≤ 480 lines), ``"hd"`` (≤ 720),
+  ``"fhd"`` (≤ 1080), ``"uhd"`` (above);
+- **codec** — as probed (``"h264"``, ``"hevc"``, …);
+- **access pattern** — ``"full"`` (whole file), ``"window"`` (a seeked
+  range in the middle), ``"sparse"`` (a handful of scattered frames);
+- **hwaccel** — ``"none"``, plus the platform's hardware decoder when one
+  is available;
+
+and writes the fastest backend of each cell to a JSON profile. When a
+profile exists, ``backend="auto"`` looks the call's cell up and uses its
+winner (if that backend is still installed); a call whose cell was never
+measured — or any call without a profile — keeps the built-in rules.
+
+The profile lives at ``VIDEO_HELPER_BACKEND_PROFILE`` when set (an empty
+value disables profiles), else ``~/.cache/video-helper/backend_profile.json``.
+It is re-read when the file changes. URL inputs never consult it: their
+timing is the network's, not the decoder's.
+
+Usage Example
+-------------
+>>> from video_helper.calibration import calibrate_backends
+>>> profile = calibrate_backends()            # ~1 min; writes the default profile
+>>> profile["winners"]["fhd|h264|full|none"]
+'pyav'
+
+Or from the shell: ``video-helper calibrate``.
+
+Author
+------
+Warith Harchaoui, Ph.D. — https://linkedin.com/in/warith-harchaoui/
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Sequence
+from datetime import datetime, timezone
+
+import os_helper as osh
+
+# Bumped whenever the profile layout or the meaning of a cell key changes;
+# a profile of another version is ignored (the built-in rules apply).
+_PROFILE_VERSION = 1
+
+_DEFAULT_PROFILE_PATH = os.path.join("~", ".cache", "video-helper", "backend_profile.json")
+
+# Upper bound (frame height, inclusive) of each resolution bucket.
+_RESOLUTION_BUCKETS: tuple[tuple[str, int], ...] = (("sd", 480), ("hd", 720), ("fhd", 1080))
+
+_ACCESS_PATTERNS: tuple[str, ...] = ("full", "window", "sparse")
+
+# Synthetic clips measured by default: one per resolution bucket below 4K.
+_DEFAULT_RESOLUTIONS: tuple[tuple[int, int], ...] = ((640, 360), (1280, 720), (1920, 1080))
+
+# ffmpeg encoder for each codec a synthetic clip can be made of.
+_ENCODERS: dict[str, str] = {"h264": "libx264", "hevc": "libx265", "vp9": "libvpx-vp9"}
+
+# Frames picked by the "sparse" pattern.
+_SPARSE_SAMPLES = 8
+
+# Loaded profile, keyed by path, with the mtime it was read at.
+_LOADED: dict[str, tuple[int, dict | None]] = {}
+_LOADED_LOCK = threading.Lock()
+
+
+def resolution_bucket(height: int) -> str:
+    """
+    Return the resolution bucket of a frame height.
+
+    Parameters
+    ----------
+    height : int
+        Frame height in pixels.
+
+    Returns
+    -------
+    str
+        ``"sd"``, ``"hd"``, ``"fhd"`` or ``"uhd"``.
+    """
+    for name, limit in _RESOLUTION_BUCKETS:
+        if height <= limit:
+            return name
+    return "uhd"
+
+
+def profile_key(height: int, codec: str | None, pattern: str, hwaccel: str | None) -> str:
+    """
+    Return the profile cell key of one call shape.
+
+    Parameters
+    ----------
+    height : int
+        Source frame height.
+    codec : str or None
+        Probed video codec name.
+    pattern : str
+        ``"full"``, ``"window"`` or ``"sparse"``.
+    hwaccel : str or None
+        Resolved hwaccel name, ``None`` for software decode.
+
+    Returns
+    -------
+    str
+        ``"<bucket>|<codec>|<pattern>|<hwaccel>"``, e.g. ``"fhd|h264|full|none"``.
+    """
+    return f"{resolution_bucket(height)}|{codec or 'unknown'}|{pattern}|{hwaccel or 'none'}"
+
+
+def default_profile_path() -> str | None:
+    """
+    Return where the backend profile is read from and written to.
+
+    Returns
+    -------
+    str or None
+        ``VIDEO_HELPER_BACKEND_PROFILE`` when set, else
+        ``~/.cache/video-helper/backend_profile.json``; ``None`` when the
+        variable is set but empty (profiles disabled).
+    """
+    path = os.environ.get("VIDEO_HELPER_BACKEND_PROFILE")
+    if path is None:
+        path = _DEFAULT_PROFILE_PATH
+    return os.path.expanduser(path) if path else None
+
+
+def load_backend_profile(path: str | None = None) -> dict | None:
+    """
+    Return the backend profile, or ``None`` when there is none.
+
+    Read once and kept in memory; re-read when the file's mtime changes.
+
+    Parameters
+    ----------
+    path : str, optional
+        Profile file (default :func:`default_profile_path`).
+
+    Returns
+    -------
+    dict or None
+        The profile (``{"version", "machine", "created", "winners",
+        "timings"}``), or ``None`` when the file is missing, unreadable, or
+        of another profile version.
+    """
+    path = path if path is not None else default_profile_path()
+    if path is None:
+        return None
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    with _LOADED_LOCK:
+        cached = _LOADED.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    try:
+        with open(path, encoding="utf-8") as f:
+            profile = json.load(f)
+    except (OSError, ValueError) as exc:
+        osh.warning(f"Backend profile unreadable ({path}): {exc} — using the built-in rules")
+        profile = None
+    if profile is not None and profile.get("version") != _PROFILE_VERSION:
+        profile = None
+    with _LOADED_LOCK:
+        _LOADED[path] = (mtime, profile)
+    return profile
+
+
+def _profile_winner(
+    height: int, codec: str | None, pattern: str, hwaccel: str | None
+) -> str | None:
+    """Return the calibrated backend for one call shape, if the profile has it.
+
+    Parameters
+    ----------
+    height : int
+        Source frame height.
+    codec : str or None
+        Probed video codec name.
+    pattern : str
+        ``"full"``, ``"window"`` or ``"sparse"``.
+    hwaccel : str or None
+        Resolved hwaccel name.
+
+    Returns
+    -------
+    str or None
+        The winning backend name, or ``None`` (no profile, or cell not
+        measured).
+    """
+    profile = load_backend_profile()
+    if profile is None:
+        return None
+    return profile.get("winners", {}).get(profile_key(height, codec, pattern, hwaccel))
+
+
+def _make_clip(path: str, width: int, height: int, codec: str, duration: float) -> bool:
+    """Encode a synthetic moving clip; False when ffmpeg lacks the encoder.
+
+    Parameters
+    ----------
+    path : str
+        Output file.
+    width, height : int
+        Frame size.
+    codec : str
+        Key of ``_ENCODERS``.
+    duration : float
+        Seconds.
+
+    Returns
+    -------
+    bool
+        Whether the clip was written.
+    """
+    encoder = _ENCODERS.get(codec)
+    if encoder is None:
+        osh.warning(f"calibrate: no encoder known for codec {codec!r}, skipped")
+        return False
+    cmd = [
+        "ffmpeg", "-v", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate=30:duration={duration}",
+        "-c:v", encoder, "-pix_fmt", "yuv420p", "-g", "60", path,
+    ]  # fmt: skip
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        osh.warning(f"calibrate: cannot encode {codec} ({result.stderr.strip()}), skipped")
+        return False
+    return True
+
+
+def _time_pattern(
+    extract: Callable[..., object],
+    video_path: str,
+    backend: str,
+    hwaccel: str | None,
+    pattern: str,
+    total_frames: int,
+    repeats: int,
+) -> float | None:
+    """Best-of-``repeats`` wall time of one (backend, pattern) read.
+
+    Parameters
+    ----------
+    extract : Callable
+        :func:`video_helper.extract_frames`.
+    video_path : str
+        Sample file.
+    backend : str
+        Backend under test.
+    hwaccel : str or None
+        Hwaccel under test.
+    pattern : str
+        ``"full"``, ``"window"`` or ``"sparse"``.
+    total_frames : int
+        Frames in the sample.
+    repeats : int
+        Timed runs; the fastest counts.
+
+    Returns
+    -------
+    float or None
+        Seconds, or ``None`` when the backend failed on this input.
+    """
+    kwargs: dict = {"backend": backend, "hwaccel": hwaccel}
+    if pattern == "window":
+        kwargs |= {"start_index": int(total_frames * 0.4), "end_index": int(total_frames * 0.6)}
+    elif pattern == "sparse":
+        step = max(1, total_frames // _SPARSE_SAMPLES)
+        kwargs["frame_indices"] = list(range(step // 2, total_frames, step))[:_SPARSE_SAMPLES]
+    best = None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        try:
+            for _frame in extract(video_path, **kwargs):
+                pass
+        except Exception as exc:  # noqa: BLE001 — one backend failing is a result, not an abort
+            osh.warning(f"calibrate: {backend} failed on {pattern} read of {video_path} ({exc})")
+            return None
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def calibrate_backends(
+    inputs: Sequence[str] | None = None,
+    *,
+    resolutions: Sequence[tuple[int, int]] = _DEFAULT_RESOLUTIONS,
+    codecs: Sequence[str] = ("h264",),
+    duration: float = 4.0,
+    repeats: int = 2,
+    hwaccel: bool = True,
+    profile_path: str | None = None,
+    save: bool = True,
+) -> dict:
+    """
+    Benchmark every installed backend and persist the winners as this machine's profile.
+
+    The decoded-frame cache (:func:`video_helper.set_frame_cache`) is off
+    while timing, so every run measures a decode; it is restored after.
+
+    Parameters
+    ----------
+    inputs : Sequence[str], optional
+        Sample files of your own. Their resolution bucket and codec are
+        probed; when given, no synthetic clip is generated.
+    resolutions : Sequence[tuple[int, int]], optional
+        ``(width, height)`` of the synthetic clips (default 360p, 720p,
+        1080p).
+    codecs : Sequence[str], optional
+        Codecs of the synthetic clips (default ``("h264",)``; ``"hevc"``
+        and ``"vp9"`` need the matching ffmpeg encoder).
+    duration : float, optional
+        Seconds per synthetic clip (default 4).
+    repeats : int, optional
+        Timed runs per measurement; the fastest counts (default 2).
+    hwaccel : bool, optional
+        Also measure with the platform's hardware decoder when one is
+        available (default True).
+    profile_path : str, optional
+        Where to write (default :func:`default_profile_path`).
+    save : bool, optional
+        Write the profile (default True); ``False`` only returns it.
+
+    Returns
+    -------
+    dict
+        The profile: ``{"version", "machine", "created", "winners":
+        {cell: backend}, "timings": {cell: {backend: seconds}}}``.
+
+    Raises
+    ------
+    ValueError
+        On ``repeats < 1`` or ``duration <= 0``, or when ``save`` is set
+        and profiles are disabled (``VIDEO_HELPER_BACKEND_PROFILE=""``)
+        without a ``profile_path``.
+    RuntimeError
+        When ffmpeg is missing and no ``inputs`` were given.
+    """
+    from . import frame_cache as _frame_cache
+    from . import main as _main
+
+    if repeats < 1:
+        raise ValueError(f"repeats must be >= 1, got {repeats}")
+    if duration <= 0:
+        raise ValueError(f"duration must be > 0, got {duration}")
+    path = profile_path if profile_path is not None else default_profile_path()
+    if save and path is None:
+        raise ValueError("backend profiles are disabled (VIDEO_HELPER_BACKEND_PROFILE is empty)")
+    if not inputs and shutil.which("ffmpeg") is None:
+        raise RuntimeError("calibrate needs ffmpeg on PATH to generate its sample clips")
+
+    backends = ["vidgear"]
+    if _main._have_pyav():
+        backends.append("pyav")
+    if shutil.which("ffmpeg") is not None:
+        backends.append("ffmpeg-pipe")
+    hwaccels: list[str | None] = [None]
+    hw = _main._resolve_hwaccel("auto") if hwaccel else None
+    if hw is not None:
+        hwaccels.append(hw)
+
+    timings: dict[str, dict[str, float]] = {}
+    # The fastest of ``repeats`` runs counts: with the decoded-frame cache on,
+    # every run after the first would time a memory copy, not a decode.
+    saved_cache = _frame_cache.get_frame_cache()
+    _frame_cache.set_frame_cache(None)
+    try:
+        with tempfile.TemporaryDirectory(prefix="video-helper-calibrate-") as tmp:
+            samples = list(inputs or [])
+            if not samples:
+                for codec in codecs:
+                    for width, height in resolutions:
+                        clip = os.path.join(tmp, f"{codec}_{width}x{height}.mp4")
+                        if _make_clip(clip, width, height, codec, duration):
+                            samples.append(clip)
+            for sample in samples:
+                meta = _main.video_metadata(sample)
+                total = int(meta["duration"] * meta["frame_rate"])
+                for hw_name in hwaccels:
+                    for pattern in _ACCESS_PATTERNS:
+                        key = profile_key(meta["height"], meta["video_codec"], pattern, hw_name)
+                        for backend in backends:
+                            elapsed = _time_pattern(
+                                _main.extract_frames,
+                                sample,
+                                backend,
+                                hw_name,
+                                pattern,
+                                total,
+                                repeats,
+                            )
+                            if elapsed is None:
+                                continue
+                            # Several inputs in one cell: keep each backend's best.
+                            cell = timings.setdefault(key, {})
+                            cell[backend] = min(elapsed, cell.get(backend, elapsed))
+                        osh.info(f"calibrate: {key} {timings.get(key, {})}")
+    finally:
+        _frame_cache._ACTIVE = saved_cache
+
+    profile = {
+        "version": _PROFILE_VERSION,
+        "machine": {
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+        },
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "winners": {key: min(cell, key=cell.get) for key, cell in timings.items() if cell},
+        "timings": timings,
+    }
+    if save:
+        osh.make_directory(os.path.dirname(os.path.abspath(path)))
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(profile, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+        osh.info(f"calibrate: {len(profile['winners'])} cells written to {path}")
+    return profile
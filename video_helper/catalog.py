@@ -0,0 +1,390 @@
+"""
+video_helper.catalog
+====================
+
+Optional persistent metadata catalog: probe results and derived per-file
+indexes kept in one SQLite file, so a warm re-run of a batch pipeline over
+the same archive is (nearly) probe-free across process restarts.
+
+Module summary
+--------------
+The in-process probe LRU in :mod:`video_helper.main` dies with the process.
+A nightly job that walks the same ten thousand files every night pays every
+probe again every night. When a catalog is active, every probe result is
+also written to ``<cache_dir>/catalog.sqlite3`` and looked up there on an
+LRU miss, before anything is actually probed.
+
+Entries are keyed by ``(abspath, kind)`` and stamped with the file's size
+and ``mtime_ns`` at the time they were computed. A lookup whose stamp no
+longer matches the file on disk is a miss, and every entry of that file
+(probe *and* derived indexes) is dropped at once — the same invalidation
+rule as the in-process LRU, never a stale hit. ``kind`` is free-form:
+``"probe"`` holds the :func:`video_helper.video_metadata` dict as JSON,
+other kinds hold opaque bytes owned by their producer (e.g. the packet
+index).
+
+The catalog is **off by default**. Turn it on for the whole process with
+the ``VIDEO_HELPER_CACHE_DIR`` environment variable, or programmatically
+with :func:`set_catalog_dir`. Catalog I/O failures (read-only disk, a lock
+held too long by another process, a corrupt file) are logged and treated
+as misses: the catalog can make probing faster, never make it fail.
+
+Usage Example
+-------------
+>>> import video_helper as vh
+>>> vh.set_catalog_dir("~/.cache/video-helper")
+>>> vh.video_dimensions("archive/ep01.mp4")   # probed, written to the catalog
+>>> # … next process, same cache dir …
+>>> vh.video_dimensions("archive/ep01.mp4")   # served from SQLite, no probe
+
+Author
+------
+Warith Harchaoui, Ph.D. — https://linkedin.com/in/warith-harchaoui/
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+
+import os_helper as osh
+
+# Bumped whenever the table layout or the meaning of a stored ``kind``
+# changes; a catalog written by another schema version is wiped on open
+# rather than misread. (2: probe codec names are codecs, not decoders.)
+_SCHEMA_VERSION = 2
+
+_CATALOG_FILENAME = "catalog.sqlite3"
+
+# Seconds a writer waits for another process's lock before giving up (the
+# failure is then logged and treated as a miss).
+_BUSY_TIMEOUT_S = 30.0
+
+
+def _file_stamp(video_file: str) -> tuple[str, int, int] | None:
+    """Return ``(abspath, size, mtime_ns)`` for a local file.
+
+    Parameters
+    ----------
+    video_file : str
+        Path to a local file.
+
+    Returns
+    -------
+    tuple[str, int, int] or None
+        The stamp, or ``None`` when the file cannot be stat'ed.
+    """
+    try:
+        st = os.stat(video_file)
+    except OSError:
+        return None
+    return (os.path.abspath(video_file), st.st_size, st.st_mtime_ns)
+
+
+class MetadataCatalog:
+    """
+    SQLite-backed store of per-file probe results and derived indexes.
+
+    Safe to share between threads (one connection behind a lock) and between
+    processes (SQLite WAL mode; each process — including forked pool workers —
+    opens its own connection on first use).
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory holding ``catalog.sqlite3``; created if missing. ``~`` is
+        expanded.
+
+    Attributes
+    ----------
+    cache_dir : str
+        Absolute path of the catalog directory.
+    path : str
+        Absolute path of the SQLite file.
+    """
+
+    def __init__(self, cache_dir: str) -> None:
+        cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        osh.make_directory(cache_dir)
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, _CATALOG_FILENAME)
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._pid: int | None = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this process's connection, opening (and migrating) it if needed.
+
+        Must be called with ``self._lock`` held.
+
+        Returns
+        -------
+        sqlite3.Connection
+            Open connection to :attr:`path`.
+        """
+        # A connection inherited through fork() must never be used by the
+        # child: reopen whenever the pid changed.
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+        conn = sqlite3.connect(self.path, timeout=_BUSY_TIMEOUT_S, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        (version,) = conn.execute("PRAGMA user_version").fetchone()
+        if version != _SCHEMA_VERSION:
+            conn.execute("DROP TABLE IF EXISTS entries")
+            conn.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " path TEXT NOT NULL, kind TEXT NOT NULL,"
+            " size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, value BLOB NOT NULL,"
+            " PRIMARY KEY (path, kind))"
+        )
+        conn.commit()
+        self._conn, self._pid = conn, os.getpid()
+        return conn
+
+    def get(self, video_file: str, kind: str) -> bytes | None:
+        """
+        Return the stored value of ``kind`` for ``video_file``, if still valid.
+
+        Parameters
+        ----------
+        video_file : str
+            Path to a local file.
+        kind : str
+            Entry kind (``"probe"``, ``"packet_index"``, …).
+
+        Returns
+        -------
+        bytes or None
+            The stored bytes, or ``None`` on a miss. An entry whose size /
+            mtime stamp no longer matches the file is a miss, and drops every
+            entry of that file.
+        """
+        stamp = _file_stamp(video_file)
+        if stamp is None:
+            return None
+        path, size, mtime_ns = stamp
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT size, mtime_ns, value FROM entries WHERE path = ? AND kind = ?",
+                    (path, kind),
+                ).fetchone()
+                if row is None:
+                    return None
+                if (row[0], row[1]) != (size, mtime_ns):
+                    # File rewritten since: every derived entry is stale too.
+                    conn.execute("DELETE FROM entries WHERE path = ?", (path,))
+                    conn.commit()
+                    return None
+                return bytes(row[2])
+        except sqlite3.Error as exc:
+            osh.warning(f"Metadata catalog read failed ({self.path}): {exc}")
+            return None
+
+    def put(self, video_file: str, kind: str, value: bytes) -> None:
+        """
+        Store ``value`` as the ``kind`` entry of ``video_file``.
+
+        The entry is stamped with the file's current size and mtime. Stale
+        entries of other kinds for the same file are dropped.
+
+        Parameters
+        ----------
+        video_file : str
+            Path to a local file.
+        kind : str
+            Entry kind.
+        value : bytes
+            Payload; its format is owned by the producer of ``kind``.
+        """
+        stamp = _file_stamp(video_file)
+        if stamp is None:
+            return
+        path, size, mtime_ns = stamp
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "DELETE FROM entries WHERE path = ? AND (size != ? OR mtime_ns != ?)",
+                    (path, size, mtime_ns),
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (path, kind, size, mtime_ns, value)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (path, kind, size, mtime_ns, sqlite3.Binary(value)),
+                )
+                conn.commit()
+        except sqlite3.Error as exc:
+            osh.warning(f"Metadata catalog write failed ({self.path}): {exc}")
+
+    def get_json(self, video_file: str, kind: str) -> dict | None:
+        """
+        JSON-decoding twin of :meth:`get`.
+
+        Parameters
+        ----------
+        video_file : str
+            Path to a local file.
+        kind : str
+            Entry kind.
+
+        Returns
+        -------
+        dict or None
+            The decoded entry, or ``None`` on a miss. An entry that does not
+            decode to a dict (truncated or corrupt) is a miss too, and is
+            dropped.
+        """
+        raw = self.get(video_file, kind)
+        if raw is None:
+            return None
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = None
+        if not isinstance(value, dict):
+            osh.warning(f"Metadata catalog: dropping corrupt {kind!r} entry of {video_file}")
+            self._drop(video_file, kind)
+            return None
+        return value
+
+    def put_json(self, video_file: str, kind: str, value: dict) -> None:
+        """
+        JSON-encoding twin of :meth:`put`.
+
+        Parameters
+        ----------
+        video_file : str
+            Path to a local file.
+        kind : str
+            Entry kind.
+        value : dict
+            JSON-serializable payload.
+        """
+        self.put(video_file, kind, json.dumps(value).encode())
+
+    def _drop(self, video_file: str, kind: str) -> None:
+        """Delete the ``kind`` entry of ``video_file``, if any.
+
+        Parameters
+        ----------
+        video_file : str
+            Path to a local file.
+        kind : str
+            Entry kind.
+        """
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "DELETE FROM entries WHERE path = ? AND kind = ?",
+                    (os.path.abspath(video_file), kind),
+                )
+                conn.commit()
+        except sqlite3.Error as exc:
+            osh.warning(f"Metadata catalog write failed ({self.path}): {exc}")
+
+    def invalidate(self, video_file: str) -> None:
+        """
+        Drop every entry of ``video_file``.
+
+        Parameters
+        ----------
+        video_file : str
+            Path to a local file (need not exist any more).
+        """
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute("DELETE FROM entries WHERE path = ?", (os.path.abspath(video_file),))
+                conn.commit()
+        except sqlite3.Error as exc:
+            osh.warning(f"Metadata catalog write failed ({self.path}): {exc}")
+
+    def clear(self) -> None:
+        """Drop every entry of every file."""
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute("DELETE FROM entries")
+                conn.commit()
+        except sqlite3.Error as exc:
+            osh.warning(f"Metadata catalog write failed ({self.path}): {exc}")
+
+    def close(self) -> None:
+        """Close this process's connection (reopened transparently on next use)."""
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn, self._pid = None, None
+
+
+# The process-wide active catalog, or None when disabled. Seeded from
+# VIDEO_HELPER_CACHE_DIR so batch jobs opt in without code changes — on
+# first use, not at import: an unusable directory must cost the catalog,
+# never ``import video_helper``.
+_ACTIVE: MetadataCatalog | None = None
+_ENV_PENDING = True
+_ACTIVE_LOCK = threading.Lock()
+
+
+def set_catalog_dir(cache_dir: str | None) -> MetadataCatalog | None:
+    """
+    Enable (or disable) the persistent metadata catalog for this process.
+
+    Parameters
+    ----------
+    cache_dir : str or None
+        Directory for ``catalog.sqlite3`` (created if missing), or ``None``
+        to disable the catalog. Overrides ``VIDEO_HELPER_CACHE_DIR``.
+
+    Returns
+    -------
+    MetadataCatalog or None
+        The now-active catalog.
+
+    Examples
+    --------
+    >>> set_catalog_dir("~/.cache/video-helper")
+    >>> set_catalog_dir(None)  # back to in-process caching only
+    """
+    global _ACTIVE, _ENV_PENDING
+    with _ACTIVE_LOCK:
+        if _ACTIVE is not None:
+            _ACTIVE.close()
+        _ACTIVE = MetadataCatalog(cache_dir) if cache_dir else None
+        _ENV_PENDING = False
+    return _ACTIVE
+
+
+def get_catalog() -> MetadataCatalog | None:
+    """
+    Return the active metadata catalog, or ``None`` when disabled.
+
+    Returns
+    -------
+    MetadataCatalog or None
+        The catalog set by :func:`set_catalog_dir` / ``VIDEO_HELPER_CACHE_DIR``.
+        A ``VIDEO_HELPER_CACHE_DIR`` that cannot be created is logged and
+        leaves the catalog disabled.
+    """
+    global _ACTIVE, _ENV_PENDING
+    if _ENV_PENDING:
+        with _ACTIVE_LOCK:
+            if _ENV_PENDING:
+                cache_dir = os.environ.get("VIDEO_HELPER_CACHE_DIR")
+                if cache_dir:
+                    try:
+                        _ACTIVE = MetadataCatalog(cache_dir)
+                    except (OSError, AssertionError) as exc:
+                        osh.warning(
+                            f"VIDEO_HELPER_CACHE_DIR={cache_dir!r} is unusable ({exc}); "
+                            "metadata catalog disabled"
+                        )
+                _ENV_PENDING = False
+    return _ACTIVE
@@ -11,6 +11,7 @@ Subcommands
 -----------
 - ``validate``      — probe a video file / URL for validity (boolean)
 - ``dimensions``    — dump width/height/duration/frame_rate/has_sound as JSON
+                      (``--inputs a b c --jobs N``: concurrent, one NDJSON line each)
 - ``duration``      — print the duration in seconds of a video
 - ``convert``       — re-encode / resize / drop audio
 - ``chunk``         — extract a ``[start, end]`` slice
@@ -24,6 +25,8 @@ Subcommands
 - ``srt2vtt``       — SRT → WebVTT with color-preserving CSS
 - ``extract-frames``— stream frames to disk (one PNG per sampled frame)
 - ``extract-flow``  — dense optical flow: HSV-visualization video or raw ``.npy``
+- ``calibrate``     — benchmark the decode backends on this machine and persist
+                      the winners for ``backend="auto"``
 
 Usage Example
 -------------
@@ -42,6 +45,7 @@ Usage Example
 >>> #   video-helper srt2vtt       --input subs.srt
 >>> #   video-helper extract-frames --input clip.mp4 --output-dir frames/ --frame-step 5
 >>> #   video-helper extract-flow  --input clip.mp4 --output clip-flow.mp4 --method dis
+>>> #   video-helper calibrate     --resolutions 640x360 1920x1080 --codecs h264 hevc
 
 Author
 ------
@@ -73,11 +77,13 @@ from . import (
     is_valid_video_file,
     mux_audio_video,
     overlay_image,
+    probe_many,
     srt2vtt,
     video_converter,
     video_dimensions,
     video_duration,
 )
+from .calibration import calibrate_backends, default_profile_path
 
 # ---------------------------------------------------------------------------
 # Subcommand handlers
@@ -130,6 +136,14 @@ def _handle_dimensions(ns: argparse.Namespace) -> int:
     # video_dimensions returns a dict — pass http_headers through when
     # the input is a URL (e.g. yt-dlp-resolved streams that need cookies).
     headers = _parse_headers(ns.header) if ns.header else None
+    if ns.inputs:
+        # Batch mode: NDJSON, one record per input in completion order,
+        # flushed per line so a downstream ``jq`` / planner streams along.
+        failed = False
+        for rec in probe_many(ns.inputs, workers=ns.jobs, http_headers=headers):
+            failed |= "error" in rec
+            print(json.dumps(rec), flush=True)
+        return 1 if failed else 0
     info = video_dimensions(ns.input, http_headers=headers)
     print(json.dumps(info, indent=2))
     return 0
@@ -478,14 +492,80 @@ def _handle_extract_frames(ns: argparse.Namespace) -> int:
         output_width=ns.width,
         output_height=ns.height,
         pad_color=ns.pad_color,
+        color=ns.color,
+        keyframes_only=ns.keyframes_only,
+        quality=ns.quality,
     )
-    for i, frame in enumerate(iterator):
+    times: list[float] = []
+    for i, item in enumerate(iterator):
+        # Keyframes-only yields (time, frame) pairs.
+        if ns.keyframes_only:
+            t, item = item
+            times.append(t)
         path = os.path.join(ns.output_dir, f"frame_{i:09d}.png")
-        cv2.imwrite(path, frame)
+        cv2.imwrite(path, item)
         written.append(path)
     # Emit the manifest as JSON so downstream tools can pick up the file
     # list without re-scanning the directory.
-    print(json.dumps({"frames": written, "count": len(written)}, indent=2))
+    manifest: dict = {"frames": written, "count": len(written)}
+    if ns.keyframes_only:
+        manifest["times"] = times
+    print(json.dumps(manifest, indent=2))
+    return 0
+
+
+def _parse_resolution(text: str) -> tuple[int, int]:
+    """
+    Parse a ``WIDTHxHEIGHT`` resolution.
+
+    Parameters
+    ----------
+    text : str
+        E.g. ``"1920x1080"``.
+
+    Returns
+    -------
+    tuple[int, int]
+        ``(width, height)``.
+
+    Raises
+    ------
+    argparse.ArgumentTypeError
+        When ``text`` is not ``WIDTHxHEIGHT``.
+    """
+    try:
+        width, height = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}") from None
+    return width, height
+
+
+def _handle_calibrate(ns: argparse.Namespace) -> int:
+    """
+    Benchmark the installed backends and write this machine's profile.
+
+    Parameters
+    ----------
+    ns : argparse.Namespace
+        Parsed arguments for this subcommand.
+
+    Returns
+    -------
+    int
+        Process exit code (``0`` on success).
+    """
+    # Winners only on stdout (the per-backend timings are in the file).
+    profile = calibrate_backends(
+        ns.inputs or None,
+        resolutions=ns.resolutions,
+        codecs=ns.codecs,
+        duration=ns.duration,
+        repeats=ns.repeats,
+        hwaccel=not ns.no_hwaccel,
+        profile_path=ns.profile,
+    )
+    path = ns.profile or default_profile_path()
+    print(json.dumps({"profile": path, "winners": profile["winners"]}, indent=2))
     return 0
 
 
@@ -577,7 +657,21 @@ def _add_dimensions(sub: argparse._SubParsersAction) -> None:
     p = sub.add_parser(
         "dimensions", help="Emit width/height/duration/frame_rate/has_sound as JSON."
     )
-    p.add_argument("--input", required=True, help="Path or HTTP(S) URL to a video.")
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument("--input", help="Path or HTTP(S) URL to a video.")
+    src.add_argument(
+        "--inputs",
+        nargs="+",
+        action="extend",
+        help="Several paths / URLs, probed concurrently; emits one NDJSON record per input "
+        '(in completion order, failures as {"path", "error"}).',
+    )
+    p.add_argument(
+        "--jobs",
+        type=int,
+        default=8,
+        help="Concurrent probes for --inputs (default: 8).",
+    )
     p.add_argument(
         "--header",
         action="append",
@@ -921,6 +1015,27 @@ def _add_extract_frames(sub: argparse._SubParsersAction) -> None:
         help="Padding color when --width/--height don't match the source aspect "
         "ratio: a common name (default 'black') or '#RRGGBB'.",
     )
+    p.add_argument(
+        "--color",
+        default="bgr",
+        choices=["bgr", "gray"],
+        help="Pixel format of the written frames (default bgr); gray writes "
+        "single-channel PNGs decoded straight to luma.",
+    )
+    p.add_argument(
+        "--keyframes-only",
+        action="store_true",
+        dest="keyframes_only",
+        help="Decode and write only the keyframes of the range (pyav / ffmpeg-pipe); "
+        "the manifest then lists each frame's presentation time.",
+    )
+    p.add_argument(
+        "--quality",
+        default="default",
+        choices=["default", "preview"],
+        help="Decode quality (default 'default'); preview trades slightly degraded "
+        "frames for a faster decode (pyav / ffmpeg-pipe).",
+    )
     p.set_defaults(func=_handle_extract_frames)
 
 
@@ -1025,6 +1140,61 @@ def _add_extract_flow(sub: argparse._SubParsersAction) -> None:
     p.set_defaults(func=_handle_extract_flow)
 
 
+def _add_calibrate(sub: argparse._SubParsersAction) -> None:
+    """
+    Register the ``calibrate`` subcommand on the parser.
+
+    Parameters
+    ----------
+    sub : argparse._SubParsersAction
+        The subparser collection to attach this command to.
+    """
+    p = sub.add_parser(
+        "calibrate",
+        help="Benchmark the decode backends on this machine; persist the winners for "
+        'backend="auto".',
+    )
+    p.add_argument(
+        "--inputs",
+        nargs="+",
+        action="extend",
+        default=[],
+        help="Sample files of your own to measure on (default: synthetic clips).",
+    )
+    p.add_argument(
+        "--resolutions",
+        nargs="+",
+        type=_parse_resolution,
+        default=[(640, 360), (1280, 720), (1920, 1080)],
+        help="Synthetic clip sizes as WIDTHxHEIGHT (default 640x360 1280x720 1920x1080).",
+    )
+    p.add_argument(
+        "--codecs",
+        nargs="+",
+        default=["h264"],
+        help="Synthetic clip codecs: h264, hevc, vp9 (default h264).",
+    )
+    p.add_argument(
+        "--duration", type=float, default=4.0, help="Seconds per synthetic clip (default 4)."
+    )
+    p.add_argument(
+        "--repeats", type=int, default=2, help="Timed runs per measurement, best kept (default 2)."
+    )
+    p.add_argument(
+        "--no-hwaccel",
+        action="store_true",
+        dest="no_hwaccel",
+        help="Skip the hardware-decoder measurements.",
+    )
+    p.add_argument(
+        "--profile",
+        default=None,
+        help="Profile file to write (default $VIDEO_HELPER_BACKEND_PROFILE or "
+        "~/.cache/video-helper/backend_profile.json).",
+    )
+    p.set_defaults(func=_handle_calibrate)
+
+
 def build_parser() -> argparse.ArgumentParser:
     """
     Assemble the top-level ``video-helper`` argument parser.
@@ -1040,7 +1210,7 @@ def build_parser() -> argparse.ArgumentParser:
             "Video Helper — utility CLI for validate / dimensions / duration / "
             "convert / chunk / black / image-loop / concat / overlay / "
             "extract-audio / mux-audio / burn-subs / srt2vtt / extract-frames / "
-            "extract-flow."
+            "extract-flow / calibrate."
         ),
     )
     # Every non-trivial CLI benefits from `--version` — cheap to add and
@@ -1076,6 +1246,7 @@ def build_parser() -> argparse.ArgumentParser:
     _add_srt2vtt(subparsers)
     _add_extract_frames(subparsers)
     _add_extract_flow(subparsers)
+    _add_calibrate(subparsers)
 
     return parser
 
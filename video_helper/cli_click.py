@@ -27,6 +27,7 @@ Usage Example
 >>> #   video-helper-click chunk         --input in.mp4 --start 10 --end 20 --output cut.mp4
 >>> #   video-helper-click extract-frames --input clip.mp4 --output-dir frames/ --frame-step 5
 >>> #   video-helper-click extract-flow --input clip.mp4 --output clip-flow.mp4 --method dis
+>>> #   video-helper-click calibrate --resolutions 640x360 --resolutions 1920x1080
 
 Author
 ------
@@ -62,11 +63,13 @@ from . import (
     is_valid_video_file,
     mux_audio_video,
     overlay_image,
+    probe_many,
     srt2vtt,
     video_converter,
     video_dimensions,
     video_duration,
 )
+from .calibration import calibrate_backends, default_profile_path
 
 # ---------------------------------------------------------------------------
 # Top-level group
@@ -123,15 +126,39 @@ def _parse_headers(pairs: tuple[str, ...]) -> dict | None:
 
 
 @cli.command()
-@click.option("--input", "input_", required=True, help="Path or HTTP(S) URL to a video.")
+@click.option("--input", "input_", default=None, help="Path or HTTP(S) URL to a video.")
+@click.option(
+    "--inputs",
+    multiple=True,
+    help="Several paths / URLs (repeat --inputs), probed concurrently; emits one NDJSON "
+    'record per input (in completion order, failures as {"path", "error"}).',
+)
+@click.option(
+    "--jobs", type=int, default=8, show_default=True, help="Concurrent probes for --inputs."
+)
 @click.option(
     "--header",
     multiple=True,
     help='HTTP header as "Name: value" (repeat --header). Forwarded to ffprobe for URL inputs.',
 )
-def dimensions(input_: str, header: tuple[str, ...]) -> None:
+def dimensions(
+    input_: str | None, inputs: tuple[str, ...], jobs: int, header: tuple[str, ...]
+) -> None:
     """Emit width/height/duration/frame_rate/has_sound as JSON."""
-    info = video_dimensions(input_, http_headers=_parse_headers(header))
+    # argparse enforces this with a mutually-exclusive group; click has no
+    # native equivalent, so check by hand with the same semantics.
+    if (input_ is None) == (not inputs):
+        raise click.UsageError("exactly one of --input / --inputs is required")
+    headers = _parse_headers(header)
+    if inputs:
+        failed = False
+        for rec in probe_many(inputs, workers=jobs, http_headers=headers):
+            failed |= "error" in rec
+            click.echo(json.dumps(rec))
+        if failed:
+            sys.exit(1)
+        return
+    info = video_dimensions(input_, http_headers=headers)
     click.echo(json.dumps(info, indent=2))
 
 
@@ -497,6 +524,30 @@ def srt2vtt_cmd(input_: str, output: str | None, css: str | None) -> None:
     help="Padding color when --width/--height don't match the source aspect "
     "ratio: a common name (default 'black') or '#RRGGBB'.",
 )
+@click.option(
+    "--color",
+    default="bgr",
+    type=click.Choice(["bgr", "gray"]),
+    show_default=True,
+    help="Pixel format of the written frames; gray writes single-channel PNGs "
+    "decoded straight to luma.",
+)
+@click.option(
+    "--keyframes-only",
+    "keyframes_only",
+    is_flag=True,
+    default=False,
+    help="Decode and write only the keyframes of the range (pyav / ffmpeg-pipe); "
+    "the manifest then lists each frame's presentation time.",
+)
+@click.option(
+    "--quality",
+    default="default",
+    type=click.Choice(["default", "preview"]),
+    show_default=True,
+    help="Decode quality; preview trades slightly degraded frames for a faster "
+    "decode (pyav / ffmpeg-pipe).",
+)
 def extract_frames_cmd(
     input_: str,
     output_dir: str,
@@ -508,13 +559,17 @@ def extract_frames_cmd(
     width: int | None,
     height: int | None,
     pad_color: str,
+    color: str,
+    keyframes_only: bool,
+    quality: str,
 ) -> None:
     """Stream frames to disk as one PNG per sampled frame."""
     import cv2  # noqa: WPS433 — deferred so `--help` stays cheap
 
     osh.make_directory(output_dir)
     written: list[str] = []
-    for i, frame in enumerate(
+    times: list[float] = []
+    for i, item in enumerate(
         extract_frames(
             video_path=input_,
             frame_step=frame_step,
@@ -525,12 +580,22 @@ def extract_frames_cmd(
             output_width=width,
             output_height=height,
             pad_color=pad_color,
+            color=color,
+            keyframes_only=keyframes_only,
+            quality=quality,
         )
     ):
+        # Keyframes-only yields (time, frame) pairs.
+        if keyframes_only:
+            t, item = item
+            times.append(t)
         path = os.path.join(output_dir, f"frame_{i:09d}.png")
-        cv2.imwrite(path, frame)
+        cv2.imwrite(path, item)
         written.append(path)
-    click.echo(json.dumps({"frames": written, "count": len(written)}, indent=2))
+    manifest: dict = {"frames": written, "count": len(written)}
+    if keyframes_only:
+        manifest["times"] = times
+    click.echo(json.dumps(manifest, indent=2))
 
 
 # ---------------------------------------------------------------------------
@@ -668,6 +733,76 @@ def extract_flow_cmd(
     click.echo(result)
 
 
+# ---------------------------------------------------------------------------
+# calibrate
+# ---------------------------------------------------------------------------
+
+
+def _resolution(_ctx: click.Context, _param: click.Parameter, values: tuple[str, ...]) -> list:
+    """Parse repeated ``WIDTHxHEIGHT`` values (click callback)."""
+    out = []
+    for text in values:
+        try:
+            width, height = (int(v) for v in text.lower().split("x"))
+        except ValueError:
+            raise click.BadParameter(f"expected WIDTHxHEIGHT, got {text!r}") from None
+        out.append((width, height))
+    return out
+
+
+@cli.command()
+@click.option(
+    "--inputs",
+    multiple=True,
+    help="Sample files of your own to measure on (repeat --inputs; default: synthetic clips).",
+)
+@click.option(
+    "--resolutions",
+    multiple=True,
+    callback=_resolution,
+    default=("640x360", "1280x720", "1920x1080"),
+    show_default=True,
+    help="Synthetic clip sizes as WIDTHxHEIGHT (repeat --resolutions).",
+)
+@click.option(
+    "--codecs",
+    multiple=True,
+    default=("h264",),
+    show_default=True,
+    help="Synthetic clip codecs: h264, hevc, vp9 (repeat --codecs).",
+)
+@click.option("--duration", "duration_", type=float, default=4.0, show_default=True)
+@click.option("--repeats", type=int, default=2, show_default=True)
+@click.option("--no-hwaccel", "no_hwaccel", is_flag=True, help="Skip hardware-decoder runs.")
+@click.option(
+    "--profile",
+    default=None,
+    help="Profile file to write (default $VIDEO_HELPER_BACKEND_PROFILE or "
+    "~/.cache/video-helper/backend_profile.json).",
+)
+def calibrate(
+    inputs: tuple[str, ...],
+    resolutions: list,
+    codecs: tuple[str, ...],
+    duration_: float,
+    repeats: int,
+    no_hwaccel: bool,
+    profile: str | None,
+) -> None:
+    """Benchmark the decode backends on this machine; persist the winners for backend="auto"."""
+    result = calibrate_backends(
+        list(inputs) or None,
+        resolutions=resolutions,
+        codecs=codecs,
+        duration=duration_,
+        repeats=repeats,
+        hwaccel=not no_hwaccel,
+        profile_path=profile,
+    )
+    path = profile or default_profile_path()
+    click.echo(json.dumps({"profile": path, "winners": result["winners"]}, indent=2))
+
+
 def main() -> None:
     """Console entry point (``video-helper-click``).
 
@@ -26,6 +26,8 @@ def mouth_roi(
     inter-corner distance (so the whole mouth plus a margin is captured), clamped
     to the frame, and resized to ``size``×``size``. Returns a ``(size, size)``
     uint8 grayscale array (zeros if the face falls entirely off-frame).
+    ``frame_bgr`` may already be a ``(H, W)`` gray frame (``extract_frames``
+    with ``color="gray"``), in which case no color conversion runs.
     """
     import cv2
 
@@ -45,7 +47,7 @@ def mouth_roi(
         return np.zeros((size, size), dtype=np.uint8)
 
     crop = frame_bgr[y0c:y1c, x0c:x1c]
-    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    gray = crop if crop.ndim == 2 else cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
     return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
 
 
@@ -298,7 +298,8 @@ def active_speaker_map(
     """
     import contextlib
 
-    from .. import extract_frames, video_duration
+    from .. import VideoReader, extract_frames, video_duration
+    from ..main import _have_pyav
 
     duration = 0.0
     with contextlib.suppress(Exception):
@@ -323,7 +324,10 @@ def active_speaker_map(
         osh.info("faces.sampling: no speaker/face co-occurrence windows — nothing to do")
         return []
 
-    with osh.temporary_folder(prefix="asd-digest") as tmp_dir:
+    with (
+        osh.temporary_folder(prefix="asd-digest") as tmp_dir,
+        contextlib.ExitStack() as open_readers,
+    ):
         # Build a compact digest once, anchored on raw diarization speaker-change
         # instants (turn boundaries) and shot-change instants, so the many small
         # per-window ASD reads below hit one small, uniformly-encoded file instead
@@ -367,6 +371,35 @@ def active_speaker_map(
         cursor: dict[int, int] = dict.fromkeys(speakers, 0)
         certain: dict[int, bool] = dict.fromkeys(speakers, False)
 
+        # One persistent reader per file (digest / original), opened on first use and
+        # closed by ``open_readers`` before the digest's folder is removed: the many
+        # small windows then share one container, probe and packet index instead of
+        # re-opening the file per window.
+        readers: dict[str, VideoReader | None] = {}
+
+        def _window_frames(read_path: str, r0: float, r1: float) -> list[np.ndarray]:
+            if read_path not in readers:
+                readers[read_path] = None
+                if _have_pyav():
+                    try:
+                        readers[read_path] = open_readers.enter_context(VideoReader(read_path))
+                    except Exception as exc:  # noqa: BLE001 — fall back to one-shot reads
+                        osh.warning(f"faces.sampling: persistent reader unavailable ({exc})")
+            reader = readers[read_path]
+            if reader is not None:
+                frames = reader.frames(
+                    start_instant=r0, end_instant=r1, frame_interval=1.0 / asd_fps
+                )
+            else:
+                frames = extract_frames(
+                    read_path,
+                    start_instant=r0,
+                    end_instant=r1,
+                    frame_interval=1.0 / asd_fps,
+                    destination="numpy",
+                )
+            return [_cap_frame(fr) for fr in frames]
+
         def _process_window(spk: int, w0: float, w1: float) -> None:
             nonlocal spent
             # Prefer the compact digest (one small file, no seek into the fragile
@@ -383,16 +416,7 @@ def active_speaker_map(
                 # aspect-preserving downscale bounds the whole window's compute and
                 # memory. Coordinates stay self-consistent (every stage sees the same
                 # reduced frames), and the emitted crops are these same frames.
-                frames = [
-                    _cap_frame(fr)
-                    for fr in extract_frames(
-                        read_path,
-                        start_instant=r0,
-                        end_instant=r1,
-                        frame_interval=1.0 / asd_fps,
-                        destination="numpy",
-                    )
-                ]
+                frames = _window_frames(read_path, r0, r1)
             except Exception as exc:  # noqa: BLE001
                 osh.warning(f"faces.sampling: decode window [{w0:.1f},{w1:.1f}] failed ({exc})")
                 return
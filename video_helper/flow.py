@@ -522,7 +522,10 @@ def iter_frame_optical_flow(
     Parameters
     ----------
     frames : Iterator[numpy.ndarray]
-        Source frames, each ``(H, W, 3)`` BGR uint8 (OpenCV convention).
+        Source frames, each ``(H, W, 3)`` BGR uint8 (OpenCV convention), or
+        ``(H, W)`` gray uint8 — e.g. ``extract_frames(color="gray")``, which
+        skips the per-frame color conversion. Gray frames fill all three
+        color channels of the default layout with the same intensity.
     method : {"dis", "farneback", "raft"}, default "dis"
         Optical-flow backend. ``"dis"`` and ``"farneback"`` use only
         ``opencv-python`` (already a core dependency, no extra install).
@@ -643,14 +646,17 @@ def iter_frame_optical_flow(
     prev_bgr_padded: np.ndarray | None = None
     for frame in frames:
         h, w = frame.shape[:2]
+        # ``extract_frames(color="gray")`` frames are already luma: no cvtColor.
+        is_gray = frame.ndim == 2
         out = np.empty((h, w, n_channels), dtype=np.float32)
         if grayscale:
-            out[..., 0] = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY).astype(np.float32)
+            out[..., 0] = frame if is_gray else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         else:
-            out[..., :3] = frame.astype(np.float32)
+            out[..., :3] = frame[..., np.newaxis] if is_gray else frame
 
         if method == "raft":
-            padded, orig_h, orig_w = _pad_to_multiple(frame, 8)
+            bgr = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR) if is_gray else frame
+            padded, orig_h, orig_w = _pad_to_multiple(bgr, 8)
             if prev_bgr_padded is None:
                 out[..., -2:] = 0.0
             else:
@@ -660,7 +666,7 @@ def iter_frame_optical_flow(
                 out[..., -1] = flow[..., 1]
             prev_bgr_padded = padded
         else:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            gray = frame if is_gray else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
             if prev_gray is None:
                 out[..., -2:] = 0.0
             else:
@@ -833,12 +839,16 @@ def extract_optical_flow(
         osh.info(f"Optical flow output already exists, skipping:\n\t{output_path}")
         return output_path
 
+    # Only the flow channels are kept: DIS / Farneback run on luma, so ask
+    # the decoder for gray frames directly. RAFT needs color.
+    luma_only = method != "raft"
     frames = extract_frames(
         input_video,
         start_instant=start_instant,
         end_instant=end_instant,
         frame_step=frame_step,
         frame_interval=frame_interval,
+        color="gray" if luma_only else "bgr",
     )
     flow_frames = iter_frame_optical_flow(
         frames,
@@ -847,6 +857,7 @@ def extract_optical_flow(
         raft_variant=raft_variant,
         device=device,
         clip_flow=clip_flow,
+        grayscale=luma_only,
     )
 
     if (output_width is None) != (output_height is None):
@@ -0,0 +1,336 @@
+"""
+video_helper.frame_cache
+========================
+
+Optional in-process cache of decoded frames, bounded by a byte budget, for
+callers that come back to the same frames of the same file.
+
+Module summary
+--------------
+Interactive tools (annotation UIs scrubbing back and forth) and iterative
+algorithms (the active-speaker rescue loop re-reading overlapping windows)
+decode the same frames again and again. When a frame cache is active, every
+frame decoded by the PyAV paths — :func:`video_helper.extract_frames` with
+``backend="pyav"`` (the default for windowed and sparse reads) and
+:class:`video_helper.VideoReader` — is kept, and a later request for it is
+served from memory without seeking or decoding.
+
+Entries are keyed by ``(file identity, output transform, frame index)``:
+
+- *file identity* is ``(abspath, size, mtime_ns)``, so a file rewritten in
+  place never serves stale frames (the same rule as the probe cache);
+- *output transform* is everything that changes the pixels or the frame
+  numbering: decoder, hardware acceleration, ``output_width`` /
+  ``output_height`` / pad color, ``color``, decode ``quality`` and whether
+  indices come from a packet index.
+
+Eviction is least-recently-used by **bytes**, not entries: a 4K BGR frame
+weighs ~25 MB and a 96x64 gray one 6 KB, and the budget is what bounds the
+process. :meth:`FrameCache.stats` reports hits, misses, evictions and bytes
+in use, which is what sizing the budget needs.
+
+The cache is **off by default**. Turn it on for the whole process with the
+``VIDEO_HELPER_FRAME_CACHE_MB`` environment variable, or programmatically
+with :func:`set_frame_cache`. URLs are never cached.
+
+Usage Example
+-------------
+>>> import video_helper as vh
+>>> cache = vh.set_frame_cache(512 * 2**20)          # 512 MB budget
+>>> a = list(vh.extract_frames("clip.mp4", start_instant=10, end_instant=12))
+>>> b = list(vh.extract_frames("clip.mp4", start_instant=11, end_instant=13))
+>>> cache.stats().hits                               # the shared second
+31
+
+Author
+------
+Warith Harchaoui, Ph.D. — https://linkedin.com/in/warith-harchaoui/
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable, Iterator, Sequence
+from dataclasses import dataclass
+
+import numpy as np
+import os_helper as osh
+
+
+@dataclass
+class FrameCacheStats:
+    """
+    Counters of a :class:`FrameCache`, as returned by :meth:`FrameCache.stats`.
+
+    Attributes
+    ----------
+    hits : int
+        Frame lookups served from the cache.
+    misses : int
+        Frame lookups that had to be decoded.
+    evictions : int
+        Frames dropped to stay within the byte budget.
+    entries : int
+        Frames currently held.
+    bytes_used : int
+        Bytes of frame data currently held.
+    max_bytes : int
+        The byte budget.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes_used: int = 0
+    max_bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache (``0.0`` before any lookup)."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class FrameCache:
+    """
+    Byte-bounded LRU of decoded frames.
+
+    Safe to share between threads (one lock around the index; frames are
+    copied outside it). Stored frames are private to the cache: callers
+    always receive copies, so mutating a yielded frame never corrupts a
+    later hit.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Byte budget (> 0). A frame larger than the whole budget is never
+        stored.
+
+    Raises
+    ------
+    ValueError
+        When ``max_bytes`` is not positive.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        if max_bytes <= 0:
+            raise ValueError(f"max_bytes must be > 0, got {max_bytes}")
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        # OrderedDict as an LRU: ``move_to_end`` on hit, ``popitem(last=False)``
+        # on eviction — the probe cache's recipe, weighted by nbytes.
+        self._frames: OrderedDict[Hashable, np.ndarray] = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        """Number of frames currently held."""
+        return len(self._frames)
+
+    def get(self, key: Hashable) -> np.ndarray | None:
+        """
+        Look up one frame, counting a hit or a miss.
+
+        Parameters
+        ----------
+        key : Hashable
+            ``(file identity, transform, frame index)``.
+
+        Returns
+        -------
+        numpy.ndarray or None
+            The stored frame (not a copy — do not mutate it), or ``None`` on
+            a miss.
+        """
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None:
+                self._misses += 1
+                return None
+            self._frames.move_to_end(key)
+            self._hits += 1
+            return frame
+
+    def put(self, key: Hashable, frame: np.ndarray) -> None:
+        """
+        Store one frame, evicting least-recently-used frames past the budget.
+
+        Parameters
+        ----------
+        key : Hashable
+            ``(file identity, transform, frame index)``.
+        frame : numpy.ndarray
+            The frame; the cache takes ownership (store a copy if the caller
+            keeps using it).
+        """
+        if frame.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._frames.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._frames[key] = frame
+            self._bytes += frame.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._frames.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self._evictions += 1
+
+    def stats(self) -> FrameCacheStats:
+        """
+        Return a snapshot of the counters.
+
+        Returns
+        -------
+        FrameCacheStats
+            Hits, misses, evictions, entries and bytes at call time.
+        """
+        with self._lock:
+            return FrameCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._frames),
+                bytes_used=self._bytes,
+                max_bytes=self.max_bytes,
+            )
+
+    def reset_stats(self) -> None:
+        """Zero the hit / miss / eviction counters (the frames are kept)."""
+        with self._lock:
+            self._hits = self._misses = self._evictions = 0
+
+    def clear(self) -> None:
+        """Drop every frame (the counters are kept)."""
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
+
+
+def _budget_from_env() -> FrameCache | None:
+    """Build the process-wide cache from ``VIDEO_HELPER_FRAME_CACHE_MB``.
+
+    Returns
+    -------
+    FrameCache or None
+        A cache of that many megabytes, or ``None`` when the variable is
+        unset, ``0`` or not a number (logged: read at import time, a typo
+        must not break ``import video_helper``).
+    """
+    raw = os.environ.get("VIDEO_HELPER_FRAME_CACHE_MB", "").strip()
+    try:
+        megabytes = float(raw or 0)
+    except ValueError:
+        osh.warning(f"Ignoring VIDEO_HELPER_FRAME_CACHE_MB={raw!r}: not a number; cache disabled")
+        return None
+    return FrameCache(int(megabytes * 2**20)) if megabytes > 0 else None
+
+
+# The process-wide active cache, or None when disabled.
+_ACTIVE: FrameCache | None = _budget_from_env()
+
+
+def set_frame_cache(max_bytes: int | None) -> FrameCache | None:
+    """
+    Enable (or disable) the decoded-frame cache for this process.
+
+    Parameters
+    ----------
+    max_bytes : int or None
+        Byte budget of a new, empty cache, or ``None`` / ``0`` to disable
+        caching. Overrides ``VIDEO_HELPER_FRAME_CACHE_MB``.
+
+    Returns
+    -------
+    FrameCache or None
+        The now-active cache.
+
+    Examples
+    --------
+    >>> set_frame_cache(256 * 2**20)
+    >>> set_frame_cache(None)  # back to decoding every request
+    """
+    global _ACTIVE
+    _ACTIVE = FrameCache(max_bytes) if max_bytes else None
+    return _ACTIVE
+
+
+def get_frame_cache() -> FrameCache | None:
+    """
+    Return the active decoded-frame cache, or ``None`` when disabled.
+
+    Returns
+    -------
+    FrameCache or None
+        The cache set by :func:`set_frame_cache` / ``VIDEO_HELPER_FRAME_CACHE_MB``.
+    """
+    return _ACTIVE
+
+
+def _cached_frames(
+    cache: FrameCache,
+    prefix: Hashable,
+    wanted: Sequence[int],
+    decode: Callable[[list[int]], Iterable[tuple[int, np.ndarray]]],
+) -> Iterator[tuple[int, np.ndarray]]:
+    """Serve sorted frame indices from the cache, decoding only the misses.
+
+    Parameters
+    ----------
+    cache : FrameCache
+        The cache to read and fill.
+    prefix : Hashable
+        ``(file identity, transform)``; the key of frame ``i`` is
+        ``(prefix, i)``.
+    wanted : Sequence[int]
+        Sorted, de-duplicated frame indices.
+    decode : Callable
+        ``decode(misses)`` yields ``(index, frame)`` for the missing indices
+        it could decode, in increasing index order; it is only called when
+        something is missing.
+
+    Yields
+    ------
+    tuple[int, numpy.ndarray]
+        ``(index, frame)`` in ``wanted`` order, frames owned by the caller.
+        Indices the decoder did not produce (past the end of the stream) are
+        skipped, as the decoders themselves do.
+    """
+    hits: dict[int, np.ndarray] = {}
+    misses: list[int] = []
+    for i in wanted:
+        frame = cache.get((prefix, i))
+        if frame is None:
+            misses.append(i)
+        else:
+            hits[i] = frame
+    if not misses:
+        for i in wanted:
+            yield i, hits.pop(i).copy()
+        return
+
+    decoded = iter(decode(misses))
+    pending: tuple[int, np.ndarray] | None = None
+    exhausted = False
+    try:
+        for i in wanted:
+            if i in hits:
+                yield i, hits.pop(i).copy()
+                continue
+            # Decode lazily: nothing is pulled before the first miss is due.
+            while not exhausted and (pending is None or pending[0] < i):
+                pending = next(decoded, None)
+                exhausted = pending is None
+            if pending is not None and pending[0] == i:
+                cache.put((prefix, i), pending[1])
+                yield i, pending[1].copy()
+                pending = None
+    finally:
+        close = getattr(decoded, "close", None)
+        if close is not None:
+            close()
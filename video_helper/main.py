@@ -32,12 +32,30 @@ Warith Harchaoui, Ph.D. — https://linkedin.com/in/warith-harchaoui/
 # evaluated by tooling, never executed.
 from __future__ import annotations
 
+import io
+import itertools
 import os
 import platform
+import queue
 import re
 import shutil
 import subprocess
-from collections.abc import Iterator, Sequence
+import threading
+import time
+import zipfile
+from collections import OrderedDict, deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass
+from fractions import Fraction
+from functools import cached_property
+from multiprocessing import resource_tracker, shared_memory
 from typing import TYPE_CHECKING
 
 import cv2
@@ -46,6 +64,10 @@ import numpy as np
 import os_helper as osh
 from vidgear.gears import VideoGear
 
+from .calibration import _profile_winner, load_backend_profile
+from .catalog import get_catalog
+from .frame_cache import _cached_frames, get_frame_cache
+
 # ``torch`` is an *optional* extra: import it only for type-checking so the
 # ``torch.device`` / ``torch.Tensor`` annotations resolve for tooling, while
 # runtime import stays lazy (inside the functions that need it).
@@ -58,6 +80,38 @@ if TYPE_CHECKING:  # pragma: no cover — types only, never executed at runtime
 # so the embedding application controls output from one place — no bare
 # ``print`` and no per-module stdlib logger (rule 6).
 
+
+def _env_number(name: str, default: int | float | None, cast: type = int) -> int | float | None:
+    """Read a numeric tunable from the environment, tolerating bad values.
+
+    The ``VIDEO_HELPER_*`` tunables are read at import time, so a typo in
+    one must not break ``import video_helper``: it is logged and the
+    default is used instead.
+
+    Parameters
+    ----------
+    name : str
+        Environment variable name.
+    default : int, float or None
+        Value when the variable is unset, empty or not a number.
+    cast : type, optional
+        ``int`` (default) or ``float``.
+
+    Returns
+    -------
+    int, float or None
+        The parsed value, or ``default``.
+    """
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return cast(raw)
+    except ValueError:
+        osh.warning(f"Ignoring {name}={raw!r}: not a valid {cast.__name__}; using {default}")
+        return default
+
+
 # File extensions we accept as "video". Kept as a plain list (not a set) so
 # error messages can show a stable, human-ordered list; membership tests are
 # case-normalized at the call site.
@@ -221,13 +275,565 @@ def srt2vtt(srt_file_path: str, vtt_file_path: str = None, css_file_path: str =
     osh.info(f"WebVTT saved: {vtt_file_path}")
 
 
+# ──────────────────────────────────────────────────────────────────────────
+#  Probe cache
+#
+#  ``is_valid_video_file``, ``video_dimensions`` and ``video_duration`` (and
+#  through them ``extract_frames``, ``video_converter``,
+#  ``extract_video_chunk``, ``compress_video``, ``build_asd_digest`` …) all
+#  need the same ffprobe metadata, often several times per call on the same
+#  file. On short clips the ffprobe fork/exec costs more than the decode
+#  itself, so every probe goes through one process-wide LRU keyed by
+#  ``(abspath, size, mtime_ns)``: a file rewritten in place (same path, new
+#  size or mtime) is a cache miss, never a stale hit. HTTP(S) URLs are never
+#  cached — the remote resource can change under the same URL and the probe
+#  depends on the caller's ``http_headers``.
+#
+#  An LRU miss then consults the optional persistent SQLite catalog
+#  (``video_helper.catalog``, enabled by ``VIDEO_HELPER_CACHE_DIR`` or
+#  ``set_catalog_dir``) before probing, and writes fresh results back to it.
+#
+#  Cache misses run on one of two engines: PyAV (in-process, no fork/exec,
+#  used by default when the [pyav] extra is installed) or the ``ffprobe``
+#  subprocess. Both produce the same flat dict (see ``video_metadata``).
+# ──────────────────────────────────────────────────────────────────────────
+
+# Maximum number of distinct files kept in the probe cache before the least
+# recently used entry is evicted. One entry is a small flat dict (~1 KB), so
+# the default bounds the cache well under a megabyte. Override with
+# VIDEO_HELPER_PROBE_CACHE_SIZE (0 disables caching).
+_PROBE_CACHE_SIZE: int = _env_number("VIDEO_HELPER_PROBE_CACHE_SIZE", 512)
+
+# OrderedDict as an LRU: ``move_to_end`` on hit, ``popitem(last=False)`` on
+# eviction. Guarded by a lock because callers probe from worker threads.
+_PROBE_CACHE: OrderedDict[tuple[str, int, int], dict] = OrderedDict()
+_PROBE_CACHE_LOCK = threading.Lock()
+
+# The five keys ``video_dimensions`` has always returned — ``video_metadata``
+# returns a superset, and ``video_dimensions`` projects back onto these.
+_DIMENSION_KEYS: tuple[str, ...] = ("width", "height", "duration", "frame_rate", "has_sound")
+
+
+def _is_url(video_file: str) -> bool:
+    """Return whether ``video_file`` is an HTTP / HTTPS URL.
+
+    Parameters
+    ----------
+    video_file : str
+        Local path or URL.
+
+    Returns
+    -------
+    bool
+        ``True`` for ``http://`` / ``https://`` inputs.
+    """
+    return video_file.startswith(("http://", "https://"))
+
+
+def _probe_cache_key(video_file: str) -> tuple[str, int, int] | None:
+    """Build the probe-cache key for a local file.
+
+    Parameters
+    ----------
+    video_file : str
+        Path to a local file.
+
+    Returns
+    -------
+    tuple[str, int, int] or None
+        ``(abspath, size, mtime_ns)``, or ``None`` when the file cannot be
+        stat'ed (the caller then probes uncached and surfaces the real error).
+    """
+    try:
+        st = os.stat(video_file)
+    except OSError:
+        return None
+    return (os.path.abspath(video_file), st.st_size, st.st_mtime_ns)
+
+
+def _parse_rate(rate: str | None) -> float:
+    """Parse an ffprobe rational (``"30000/1001"``) into a float.
+
+    Parameters
+    ----------
+    rate : str or None
+        Rational string as printed by ffprobe.
+
+    Returns
+    -------
+    float
+        The rate, or ``0.0`` for missing / ``"0/0"`` values.
+    """
+    if not rate:
+        return 0.0
+    num, _, den = rate.partition("/")
+    try:
+        return float(num) / float(den) if den else float(num)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _optional_int(value: object) -> int | None:
+    """Convert an ffprobe numeric field (often a string) to ``int`` or ``None``.
+
+    Parameters
+    ----------
+    value : object
+        Raw field value (``"287580"``, ``60``, ``"N/A"``, ``None`` …).
+
+    Returns
+    -------
+    int or None
+        The integer value, or ``None`` when absent or not numeric.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _metadata_from_ffprobe(probe: dict) -> dict:
+    """Flatten a raw ``ffmpeg.probe`` result into the ``video_metadata`` dict.
+
+    Parameters
+    ----------
+    probe : dict
+        JSON returned by ``ffprobe -show_format -show_streams``.
+
+    Returns
+    -------
+    dict
+        See :func:`video_metadata` for the keys.
+
+    Raises
+    ------
+    StopIteration
+        When the container has no video stream.
+    """
+    streams = probe.get("streams", [])
+    fmt = probe.get("format", {})
+    video = next(s for s in streams if s.get("codec_type") == "video")
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+
+    # Stream-level duration is missing on some containers (Matroska / WebM
+    # only carry it at the format level); fall back rather than fail.
+    duration = video.get("duration", fmt.get("duration"))
+    frame_rate = _parse_rate(video.get("r_frame_rate")) or _parse_rate(video.get("avg_frame_rate"))
+    return {
+        "width": int(video["width"]),
+        "height": int(video["height"]),
+        "duration": float(duration) if duration is not None else 0.0,
+        "frame_rate": frame_rate,
+        "has_sound": audio is not None,
+        "video_codec": video.get("codec_name"),
+        "pix_fmt": video.get("pix_fmt"),
+        "bit_rate": _optional_int(video.get("bit_rate", fmt.get("bit_rate"))),
+        "nb_frames": _optional_int(video.get("nb_frames")),
+        "format_name": fmt.get("format_name"),
+        "audio_codec": audio.get("codec_name") if audio else None,
+        "sample_rate": _optional_int(audio.get("sample_rate")) if audio else None,
+        "channels": _optional_int(audio.get("channels")) if audio else None,
+        "audio_bit_rate": _optional_int(audio.get("bit_rate")) if audio else None,
+    }
+
+
+def _probe_via_ffprobe(video_file: str, http_headers: dict | None) -> dict:
+    """Run ffprobe on ``video_file`` and flatten the result.
+
+    Parameters
+    ----------
+    video_file : str
+        Local path or URL.
+    http_headers : dict or None
+        HTTP headers forwarded via ffprobe's ``-headers`` (URLs only).
+
+    Returns
+    -------
+    dict
+        See :func:`video_metadata`.
+    """
+    # ffmpeg-python's ``probe`` turns extra kwargs into CLI flags; splice the
+    # user's headers in as one CRLF-separated ``-headers`` value before -i.
+    probe_kwargs: dict = {}
+    headers_str = _join_http_headers(http_headers) if _is_url(video_file) else None
+    if headers_str:
+        probe_kwargs["headers"] = headers_str
+    return _metadata_from_ffprobe(ffmpeg.probe(video_file, **probe_kwargs))
+
+
+def _probe_via_pyav(video_file: str, http_headers: dict | None) -> dict:
+    """Probe ``video_file`` in-process by opening the container with PyAV.
+
+    Same libavformat ``find_stream_info`` pass ffprobe runs, minus the
+    fork/exec and the JSON round-trip. Field-for-field equivalent to
+    :func:`_probe_via_ffprobe`: ``base_rate`` is ffprobe's ``r_frame_rate``,
+    stream durations are rescaled from the stream time base, and the format /
+    container values fill the same gaps ffprobe's JSON leaves.
+
+    Parameters
+    ----------
+    video_file : str
+        Local path or URL.
+    http_headers : dict or None
+        HTTP headers forwarded through the AVFormatContext options (URLs only).
+
+    Returns
+    -------
+    dict
+        See :func:`video_metadata`.
+
+    Raises
+    ------
+    StopIteration
+        When the container has no video stream (same as the ffprobe engine).
+    av.error.FFmpegError
+        When libavformat cannot open the file.
+    """
+    import av  # lazy — optional [pyav] extra
+
+    headers_str = _join_http_headers(http_headers) if _is_url(video_file) else None
+    container = (
+        av.open(video_file, options={"headers": headers_str})
+        if headers_str
+        else av.open(video_file)
+    )
+    try:
+        video = next(iter(container.streams.video))
+        audio = next(iter(container.streams.audio), None)
+        vctx = video.codec_context
+
+        # Stream duration first (ffprobe's per-stream value); the container
+        # duration (AV_TIME_BASE = 1 µs) covers Matroska / WebM, which only
+        # carry it at the format level.
+        if video.duration is not None and video.time_base is not None:
+            duration = float(video.duration * video.time_base)
+        elif container.duration is not None:
+            duration = container.duration / 1_000_000
+        else:
+            duration = 0.0
+        rate = video.base_rate or video.average_rate
+        actx = audio.codec_context if audio is not None else None
+        # ``canonical_name`` is the codec (what ffprobe reports: "av1",
+        # "mp3"); ``name`` would be the decoder PyAV picked ("libdav1d",
+        # "mp3float").
+        return {
+            "width": int(vctx.width),
+            "height": int(vctx.height),
+            "duration": duration,
+            "frame_rate": float(rate) if rate else 0.0,
+            "has_sound": audio is not None,
+            "video_codec": vctx.codec.canonical_name,
+            "pix_fmt": vctx.pix_fmt,
+            # 0 is libav's "unknown" — report None, like ffprobe's missing key.
+            "bit_rate": video.bit_rate or container.bit_rate or None,
+            "nb_frames": video.frames or None,
+            "format_name": container.format.name,
+            "audio_codec": actx.codec.canonical_name if actx is not None else None,
+            "sample_rate": actx.sample_rate if actx is not None else None,
+            "channels": actx.channels if actx is not None else None,
+            "audio_bit_rate": (audio.bit_rate or None) if audio is not None else None,
+        }
+    finally:
+        container.close()
+
+
+# Probe engines accepted by ``video_metadata`` / ``video_dimensions``.
+# "auto" picks PyAV when the [pyav] extra is installed (no subprocess) and
+# falls back to ffprobe otherwise. VIDEO_HELPER_PROBE_ENGINE sets the default.
+_PROBE_ENGINES: tuple[str, ...] = ("auto", "pyav", "ffprobe")
+_DEFAULT_PROBE_ENGINE: str = os.environ.get("VIDEO_HELPER_PROBE_ENGINE", "auto")
+
+
+def _resolve_probe_engine(engine: str | None) -> str:
+    """Resolve ``engine`` (or the process default) to ``"pyav"`` / ``"ffprobe"``.
+
+    Parameters
+    ----------
+    engine : str or None
+        ``"auto"``, ``"pyav"``, ``"ffprobe"``, or ``None`` for the default
+        (``VIDEO_HELPER_PROBE_ENGINE``, itself defaulting to ``"auto"``).
+
+    Returns
+    -------
+    str
+        The concrete engine to run.
+
+    Raises
+    ------
+    ValueError
+        On an unknown engine name.
+    ImportError
+        When ``"pyav"`` is requested explicitly but PyAV is not installed.
+    """
+    engine = engine or _DEFAULT_PROBE_ENGINE
+    if engine not in _PROBE_ENGINES:
+        raise ValueError(f"Unknown probe engine {engine!r}; expected one of {_PROBE_ENGINES}")
+    if engine == "auto":
+        return "pyav" if _have_pyav() else "ffprobe"
+    if engine == "pyav" and not _have_pyav():
+        raise ImportError(
+            "engine='pyav' requires PyAV. Install with: pip install 'video-helper[pyav]'"
+        )
+    return engine
+
+
+def _probe_uncached(video_file: str, http_headers: dict | None, engine: str | None = None) -> dict:
+    """Probe ``video_file`` with the resolved engine, bypassing the cache.
+
+    Parameters
+    ----------
+    video_file : str
+        Local path or URL.
+    http_headers : dict or None
+        HTTP headers (URLs only).
+    engine : str or None
+        See :func:`_resolve_probe_engine`.
+
+    Returns
+    -------
+    dict
+        See :func:`video_metadata`.
+    """
+    if _resolve_probe_engine(engine) == "pyav":
+        return _probe_via_pyav(video_file, http_headers)
+    return _probe_via_ffprobe(video_file, http_headers)
+
+
+def video_metadata(
+    video_file: str, http_headers: dict | None = None, engine: str | None = None
+) -> dict:
+    """
+    Return the full parsed probe result of a video file (or URL), cached.
+
+    Superset of :func:`video_dimensions`. Local files are probed at most once
+    per ``(path, size, mtime_ns)`` and served from an in-process LRU after
+    that — and, when the persistent catalog is enabled (see
+    :func:`video_helper.set_catalog_dir`), at most once across processes.
+    URLs are always probed fresh.
+
+    Parameters
+    ----------
+    video_file : str
+        Path to the input video file, OR an HTTP / HTTPS URL.
+    http_headers : dict[str, str], optional
+        HTTP headers forwarded to ffprobe for URL inputs (ignored for local
+        paths). See :func:`video_dimensions`.
+    engine : str, optional
+        ``"auto"`` (PyAV when installed, else ffprobe), ``"pyav"`` (open the
+        container in-process — no subprocess) or ``"ffprobe"``. Defaults to
+        ``VIDEO_HELPER_PROBE_ENGINE`` (``"auto"``). Both engines return the
+        same dict; cached entries are shared between them.
+
+    Returns
+    -------
+    dict
+        ``width``, ``height`` (int), ``duration``, ``frame_rate`` (float),
+        ``has_sound`` (bool) — exactly as :func:`video_dimensions` — plus
+        ``video_codec``, ``pix_fmt``, ``format_name`` (str or None),
+        ``bit_rate``, ``nb_frames`` (int or None), and the audio parameters
+        ``audio_codec``, ``sample_rate``, ``channels``, ``audio_bit_rate``
+        (all None when the file has no audio stream). A fresh copy is returned
+        on every call, so callers may mutate it freely.
+
+    Raises
+    ------
+    StopIteration
+        When the file has no video stream.
+    ffmpeg.Error or av.error.FFmpegError
+        When the chosen engine cannot read the file.
+
+    Examples
+    --------
+    >>> meta = video_metadata("clip.mp4")
+    >>> meta["video_codec"], meta["pix_fmt"], meta["nb_frames"]
+    ('h264', 'yuv420p', 300)
+    """
+    if _is_url(video_file):
+        return _probe_uncached(video_file, http_headers, engine)
+
+    osh.checkfile(video_file, msg=f"Video file not found: {video_file}")
+    # The key gates the catalog too, so it is computed whatever the LRU
+    # size: VIDEO_HELPER_PROBE_CACHE_SIZE=0 turns off the LRU only.
+    key = _probe_cache_key(video_file)
+    if key is None:
+        return _probe_uncached(video_file, None, engine)
+
+    if _PROBE_CACHE_SIZE > 0:
+        with _PROBE_CACHE_LOCK:
+            cached = _PROBE_CACHE.get(key)
+            if cached is not None:
+                _PROBE_CACHE.move_to_end(key)
+                return dict(cached)
+
+    # Probe outside the lock: a probe takes milliseconds to tens of
+    # milliseconds and other threads probing *different* files must not queue
+    # behind it. Two threads racing on the same file both probe once —
+    # harmless, same result. The persistent catalog (when enabled) sits
+    # between the LRU and the real probe, so a fresh process re-reads
+    # yesterday's results instead of re-probing.
+    catalog = get_catalog()
+    meta = catalog.get_json(video_file, "probe") if catalog is not None else None
+    if meta is None:
+        meta = _probe_uncached(video_file, None, engine)
+        if catalog is not None:
+            catalog.put_json(video_file, "probe", meta)
+    if _PROBE_CACHE_SIZE > 0:
+        with _PROBE_CACHE_LOCK:
+            _PROBE_CACHE[key] = meta
+            _PROBE_CACHE.move_to_end(key)
+            while len(_PROBE_CACHE) > _PROBE_CACHE_SIZE:
+                _PROBE_CACHE.popitem(last=False)
+    return dict(meta)
+
+
+def clear_probe_cache() -> None:
+    """
+    Drop every entry of the in-process probe cache.
+
+    Never needed for correctness (entries are keyed by size and mtime, so a
+    rewritten file is re-probed anyway); useful in long-lived processes that
+    want to release the memory, or in benchmarks measuring cold probes. The
+    persistent catalog, when enabled, is left untouched (see
+    :meth:`video_helper.MetadataCatalog.clear`).
+
+    Examples
+    --------
+    >>> clear_probe_cache()
+    """
+    with _PROBE_CACHE_LOCK:
+        _PROBE_CACHE.clear()
+
+
+def _probe_one(video_file: str, http_headers: dict | None, engine: str | None, full: bool) -> dict:
+    """Probe one file for :func:`probe_many`, turning any failure into a record.
+
+    Top-level (not a closure) so a process pool can pickle it.
+
+    Parameters
+    ----------
+    video_file : str
+        Local path or URL.
+    http_headers : dict or None
+        HTTP headers for URL inputs.
+    engine : str or None
+        Probe engine (see :func:`video_metadata`).
+    full : bool
+        Return every :func:`video_metadata` field instead of the five
+        :func:`video_dimensions` keys.
+
+    Returns
+    -------
+    dict
+        ``{"path": video_file, **info}`` on success, or
+        ``{"path": video_file, "error": "<ExceptionType>: <message>"}``.
+    """
+    try:
+        if full:
+            info = video_metadata(video_file, http_headers=http_headers, engine=engine)
+        else:
+            info = video_dimensions(video_file, http_headers=http_headers, engine=engine)
+    except StopIteration:
+        # ``next(...)`` over the streams found no video stream; StopIteration
+        # has no message, so spell it out.
+        return {"path": video_file, "error": "ValueError: no video stream"}
+    except Exception as exc:  # noqa: BLE001 — per-item error report, never raised
+        return {"path": video_file, "error": f"{type(exc).__name__}: {exc}"}
+    return {"path": video_file, **info}
+
+
+def probe_many(
+    paths: Iterable[str],
+    workers: int = 8,
+    *,
+    http_headers: dict | None = None,
+    engine: str | None = None,
+    full: bool = False,
+    processes: bool = False,
+) -> Iterator[dict]:
+    """
+    Probe many video files concurrently, yielding one record per file as it completes.
+
+    Built for planning batch jobs over whole media libraries: ``paths`` is
+    consumed lazily and at most ``4 × workers`` probes are in flight at any
+    time, so a generator over tens of thousands of files never materializes
+    all its futures up front. A file that cannot be probed yields an error
+    record instead of raising, so one bad file never aborts the sweep.
+
+    Parameters
+    ----------
+    paths : iterable of str
+        Local paths and/or HTTP(S) URLs. May be a lazy generator.
+    workers : int, optional
+        Pool size (default 8). ``1`` probes sequentially in a single worker.
+    http_headers : dict[str, str], optional
+        HTTP headers forwarded for URL inputs (same for every URL).
+    engine : str, optional
+        Probe engine, see :func:`video_metadata`.
+    full : bool, optional
+        Yield every :func:`video_metadata` field instead of the five
+        :func:`video_dimensions` keys (default False).
+    processes : bool, optional
+        Use a process pool instead of a thread pool (default False). Threads
+        are the right default — ffprobe runs in a subprocess and PyAV's
+        demuxer releases the GIL — and they share this process's probe
+        cache; processes only help when Python-side parsing dominates.
+
+    Yields
+    ------
+    dict
+        In completion order (not input order): ``{"path": str, "width": …,
+        "height": …, "duration": …, "frame_rate": …, "has_sound": …}`` on
+        success (plus the extra :func:`video_metadata` keys when
+        ``full=True``), or ``{"path": str, "error": str}`` on failure.
+
+    Raises
+    ------
+    ValueError
+        If ``workers < 1``.
+
+    Examples
+    --------
+    >>> for rec in probe_many(glob.glob("archive/**/*.mp4", recursive=True), workers=16):
+    ...     if "error" in rec:
+    ...         print("skip", rec["path"], rec["error"])
+    ...     else:
+    ...         plan(rec["path"], rec["duration"])
+    """
+    if workers < 1:
+        raise ValueError(f"workers must be >= 1, got {workers}")
+
+    pool_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    # Bounded submission window: enough queued work to keep every worker
+    # busy, without turning a 50k-file generator into 50k live futures.
+    max_in_flight = 4 * workers
+    path_iter = iter(paths)
+    with pool_cls(max_workers=workers) as pool:
+        in_flight: set[Future] = set()
+        exhausted = False
+        while True:
+            while not exhausted and len(in_flight) < max_in_flight:
+                try:
+                    path = next(path_iter)
+                except StopIteration:
+                    exhausted = True
+                    break
+                in_flight.add(pool.submit(_probe_one, path, http_headers, engine, full))
+            if not in_flight:
+                return
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield fut.result()
+
+
 def is_valid_video_file(video_file: str) -> bool:
     """
     Check that ``video_file`` exists, has a known video extension, and contains a video stream.
 
     Combines an extension check (against :data:`video_extensions`) with an
     ``ffprobe`` invocation so both a fake ``.mp4`` (no video stream) and a
-    real video renamed to ``.xyz`` are rejected.
+    real video renamed to ``.xyz`` are rejected. The probe goes through the
+    shared probe cache (see :func:`video_metadata`), so validating a file and
+    then reading its dimensions costs a single ffprobe.
 
     HTTP / HTTPS URLs short-circuit to ``True``: the only way to truly
     validate a remote URL is to spend bandwidth fetching part of the
@@ -250,7 +856,7 @@ def is_valid_video_file(video_file: str) -> bool:
     # HTTP / HTTPS URLs are trusted: ffprobe / ffmpeg-on-pipe surface a
     # clear error later if the URL is invalid, and there is no way to
     # cheaply verify a remote stream's contents without downloading.
-    if video_file.startswith(("http://", "https://")):
+    if _is_url(video_file):
         return True
 
     if not osh.file_exists(video_file):
@@ -259,8 +865,9 @@ def is_valid_video_file(video_file: str) -> bool:
 
     valid = False
     try:
-        probe = ffmpeg.probe(video_file)
-        next(s for s in probe["streams"] if s["codec_type"] == "video")
+        # Raises StopIteration when there is no video stream, ffmpeg.Error
+        # when ffprobe cannot read the file at all. Failures are not cached.
+        video_metadata(video_file)
         valid = True
     except Exception:
         valid = False
@@ -273,7 +880,9 @@ def is_valid_video_file(video_file: str) -> bool:
     return valid
 
 
-def video_dimensions(video_file: str, http_headers: dict | None = None) -> dict:
+def video_dimensions(
+    video_file: str, http_headers: dict | None = None, engine: str | None = None
+) -> dict:
     """
     Get the dimensions of a video file (or URL) using ``ffmpeg-python``.
 
@@ -291,6 +900,10 @@ def video_dimensions(video_file: str, http_headers: dict | None = None) -> dict:
         that needs specific headers — e.g. yt-dlp-resolved YouTube live,
         members-only, age-gated content. Ignored when ``video_file`` is
         a local path.
+    engine : str, optional
+        Probe engine: ``"auto"`` (default — in-process PyAV when the
+        ``[pyav]`` extra is installed, else ffprobe), ``"pyav"`` or
+        ``"ffprobe"``. See :func:`video_metadata`.
 
     Returns
     -------
@@ -306,39 +919,15 @@ def video_dimensions(video_file: str, http_headers: dict | None = None) -> dict:
 
     Notes
     -----
-    Uses :func:`ffmpeg.probe` (a thin wrapper over ``ffprobe``) for
-    metadata extraction. ``http_headers`` are passed through ffprobe's
-    ``-headers`` flag so URL-protected streams probe correctly.
+    A projection of :func:`video_metadata` (which also carries codec,
+    bitrate, frame count, pixel format and audio parameters), so local files
+    are served from the shared probe cache. With PyAV installed the probe
+    runs in-process instead of spawning ``ffprobe``. ``http_headers`` are
+    passed through ffprobe's ``-headers`` flag (or the equivalent PyAV
+    format option) so URL-protected streams probe correctly.
     """
-    is_url = video_file.startswith(("http://", "https://"))
-    if not is_url:
-        osh.checkfile(video_file, msg=f"Video file not found: {video_file}")
-
-    # For URL inputs, splice the user's http_headers into ffprobe's
-    # input options. ffmpeg-python's ``probe`` accepts arbitrary kwargs
-    # which it converts into CLI flags.
-    probe_kwargs: dict = {}
-    if is_url and http_headers:
-        # ffmpeg expects a single CRLF-separated string before -i.
-        probe_kwargs["headers"] = "\r\n".join(f"{k}: {v}" for k, v in http_headers.items()) + "\r\n"
-
-    probe = ffmpeg.probe(video_file, **probe_kwargs)
-    video_info = next(s for s in probe["streams"] if s["codec_type"] == "video")
-    width = int(video_info["width"])
-    height = int(video_info["height"])
-    duration = float(video_info["duration"])
-    frame_rate = video_info["r_frame_rate"]
-    frame_rate = frame_rate.split("/")
-    frame_rate = float(frame_rate[0]) / float(frame_rate[1])
-    has_sound = any(s["codec_type"] == "audio" for s in probe["streams"])
-    d = {
-        "width": width,
-        "height": height,
-        "duration": duration,
-        "frame_rate": frame_rate,
-        "has_sound": has_sound,
-    }
-    return d
+    meta = video_metadata(video_file, http_headers=http_headers, engine=engine)
+    return {k: meta[k] for k in _DIMENSION_KEYS}
 
 
 def video_converter(
@@ -518,8 +1107,9 @@ def video_converter(
 #  - ``vidgear``      → fastest path for **full sequential decode** on
 #                       macOS (OpenCV+AVFoundation + worker thread); the
 #                       only backend that supports ``stabilize=True``.
-#                       Decodes from t=0 with no real seek, so it pays a
-#                       large tax on windowed / sparse reads.
+#                       Seeks once to the window start (OpenCV
+#                       ``CAP_PROP_POS_MSEC``), then decodes through every
+#                       gap, so sparse reads still pay for what lies between.
 #  - ``pyav``         → fastest for **windowed sequential** and **sparse**
 #                       (frame_indices / frame_times) thanks to keyframe
 #                       seek. Default for everything that isn't a full
@@ -539,6 +1129,22 @@ def video_converter(
 
 _BACKENDS = ("auto", "vidgear", "pyav", "ffmpeg-pipe")
 
+# Decoder threading models: the user-facing name → PyAV ``thread_type`` and
+# the ffmpeg CLI ``-thread_type`` value. "auto" lets libavcodec use frame
+# and slice threading together.
+_THREAD_TYPES = {
+    "frame": ("FRAME", "frame"),
+    "slice": ("SLICE", "slice"),
+    "auto": ("AUTO", "frame+slice"),
+}
+
+# Process-wide defaults for extract_frames(decode_threads=None,
+# thread_type=None); unset keeps libavcodec's own defaults (slice
+# threading, one thread per core). Tune per machine from the threading
+# axis of scripts/benchmark_extract_frames.py.
+_DEFAULT_DECODE_THREADS: int | None = _env_number("VIDEO_HELPER_DECODE_THREADS", None)
+_DEFAULT_THREAD_TYPE: str | None = os.environ.get("VIDEO_HELPER_THREAD_TYPE") or None
+
 
 def _resolve_hwaccel(hwaccel: str | None) -> str | None:
     """Translate ``hwaccel="auto"`` into a concrete value supported by the
@@ -600,13 +1206,20 @@ def _choose_backend(
     stabilize: bool,
     sparse: bool,
     full_sequential: bool,
+    calibrated: str | None = None,
 ) -> str:
     """Resolve ``backend="auto"`` against installed packages and call shape.
 
+    ``calibrated`` is the winner of this call shape in the machine's backend
+    profile (see :mod:`video_helper.calibration`); when set and installed it
+    replaces the rules below, which are the fallback for machines (or call
+    shapes) never calibrated.
+
     Routing rules (when ``backend="auto"``):
 
     - ``stabilize=True``                  → vidgear (forced; only one that supports it)
-    - sparse access (indices / times)     → pyav if installed, else vidgear (range+filter fallback)
+    - sparse access (indices / times)     → pyav if installed, else ffmpeg-pipe if ffmpeg on PATH,
+                                            else vidgear (one seek + decode-and-filter fallback)
     - full sequential (start=0, end=total)→ vidgear (4× faster than PyAV on macOS — see SPEED_ANALYSIS.md)
     - windowed sequential                 → pyav if installed, else ffmpeg-pipe if ffmpeg on PATH, else vidgear
     """
@@ -621,11 +1234,25 @@ def _choose_backend(
     if backend != "auto":
         return backend
 
+    if calibrated is not None:
+        installed = {
+            "vidgear": True,
+            "pyav": _have_pyav(),
+            "ffmpeg-pipe": shutil.which("ffmpeg") is not None,
+        }
+        if installed.get(calibrated, False):
+            return calibrated
+
     if sparse:
         # Sparse access: PyAV's keyframe-seek + PTS filter is the fastest
-        # option we ship (see SPEED_ANALYSIS.md). VidGear's no-seek loop
-        # is a last-resort fallback when PyAV is missing.
-        return "pyav" if _have_pyav() else "vidgear"
+        # option we ship (see SPEED_ANALYSIS.md). ffmpeg-pipe's planned
+        # per-cluster -ss seeks are next; VidGear's no-seek loop is a
+        # last-resort fallback.
+        if _have_pyav():
+            return "pyav"
+        if shutil.which("ffmpeg") is not None:
+            return "ffmpeg-pipe"
+        return "vidgear"
 
     if full_sequential:
         # Full sequential reads: VidGear (OpenCV+AVFoundation + worker
@@ -633,7 +1260,8 @@ def _choose_backend(
         return "vidgear"
 
     # Windowed sequential: PyAV's keyframe seek wins. ffmpeg-pipe is a
-    # backup when PyAV is missing; VidGear last because it has no real seek.
+    # backup when PyAV is missing; VidGear last because it seeks
+    # only once and has no per-frame PTS.
     if _have_pyav():
         return "pyav"
     if shutil.which("ffmpeg") is not None:
@@ -652,9 +1280,15 @@ def _resolve_indices(
     frame_interval: float | None,
     frame_indices: Sequence[int] | None,
     frame_times: Sequence[float] | None,
+    packet_index: PacketIndex | None = None,
 ) -> tuple[list[int] | None, int, int, int, bool]:
     """Normalize the public range/sparse API into a single representation.
 
+    Without a ``packet_index`` the frame grid is ``duration × frame_rate``
+    (exact on CFR sources). With one, frame ``i`` is the ``i``-th frame in
+    presentation order and times map through the real timestamps — exact on
+    VFR sources too, and identical to the former on CFR ones.
+
     Returns
     -------
     indices : list[int] | None
@@ -666,18 +1300,29 @@ def _resolve_indices(
     sparse : bool
         True iff the caller specified ``frame_indices`` / ``frame_times``.
     """
-    total = int(duration * frame_rate)
+    total = packet_index.frame_count if packet_index is not None else int(duration * frame_rate)
 
     if frame_times is not None:
-        frame_indices = [int(round(t * frame_rate)) for t in frame_times]
+        if packet_index is not None:
+            frame_indices = [packet_index.nearest_index(t) for t in frame_times]
+        else:
+            frame_indices = [int(round(t * frame_rate)) for t in frame_times]
     if frame_indices is not None:
         indices = sorted({int(i) for i in frame_indices if 0 <= int(i) < total})
         return indices, 0, total - 1, 1, True
 
     if start_instant is not None:
-        start_index = int(start_instant * frame_rate)
+        start_index = (
+            packet_index.index_at_time(start_instant)
+            if packet_index is not None
+            else int(start_instant * frame_rate)
+        )
     if end_instant is not None:
-        end_index = int(end_instant * frame_rate)
+        end_index = (
+            packet_index.index_at_time(end_instant)
+            if packet_index is not None
+            else int(end_instant * frame_rate)
+        )
     if start_index is None:
         start_index = 0
     if end_index is None:
@@ -696,31 +1341,111 @@ def _resolve_indices(
     return None, start_index, end_index, frame_step, False
 
 
+# VidGear's default stabilizer ``SMOOTHING_RADIUS``: frames a stabilized read
+# decodes before the window so its output matches a read from frame 0.
+_STABILIZER_WARMUP_FRAMES = 25
+
+
+def _open_vidgear_at(
+    video_path: str, stabilize: bool, first_index: int, frame_rate: float | None
+) -> tuple[VideoGear, int]:
+    """Open a VidGear stream positioned at or just before ``first_index``.
+
+    The seek is a ``CAP_PROP_POS_MSEC`` set on the OpenCV capture, applied
+    by CamGear *before* its first synchronous read — the producer thread is
+    not running yet, so nothing stale is queued. That first frame's
+    timestamp then says where the decoder really landed (the PTS check):
+    short of the target is fine (the caller drops the difference), past it
+    means OpenCV could not seek this input accurately and the stream is
+    reopened from frame 0 — the old decode-everything behavior.
+
+    Parameters
+    ----------
+    video_path : str
+        Local path or URL.
+    stabilize : bool
+        Forwarded to ``VideoGear``. The stabilizer's output settles once its
+        smoothing window has seen :data:`_STABILIZER_WARMUP_FRAMES` frames, so
+        a stabilized read seeks that much earlier and then yields exactly
+        the frames a read from frame 0 would.
+    first_index : int
+        First frame the caller wants.
+    frame_rate : float or None
+        Probed frame rate, to turn ``first_index`` into milliseconds. No
+        seek without it.
+
+    Returns
+    -------
+    tuple[VideoGear, int]
+        The *un-started* stream and the index of the first frame its
+        ``read()`` will return.
+    """
+    target = first_index - (_STABILIZER_WARMUP_FRAMES if stabilize else 0)
+    if target <= 0 or not frame_rate or frame_rate <= 0:
+        return VideoGear(source=video_path, stabilize=stabilize), 0
+    gear = VideoGear(
+        source=video_path,
+        stabilize=stabilize,
+        CAP_PROP_POS_MSEC=target * 1000.0 / frame_rate,
+    )
+    capture = getattr(gear.stream, "stream", None)
+    if capture is None:  # not a CamGear (no OpenCV capture to check)
+        gear.stop()
+        return VideoGear(source=video_path, stabilize=stabilize), 0
+    # After CamGear's first read, POS_MSEC is the timestamp of that frame.
+    landed = int(round(capture.get(cv2.CAP_PROP_POS_MSEC) * frame_rate / 1000.0))
+    if 0 <= landed <= target:
+        osh.debug("vidgear: seeked to frame %d for frame %d", landed, first_index)
+        return gear, landed
+    osh.debug("vidgear: seek to frame %d landed on %d; decoding from frame 0", target, landed)
+    gear.stop()
+    return VideoGear(source=video_path, stabilize=stabilize), 0
+
+
 def _extract_via_vidgear(
     video_path: str,
     start_index: int,
     end_index: int,
     frame_step: int,
     stabilize: bool,
+    sparse_indices: Sequence[int] | None = None,
+    color: str = "bgr",
+    frame_rate: float | None = None,
 ) -> Iterator[np.ndarray]:
-    """Decode-everything-and-filter loop on top of VidGear / OpenCV.
-
-    Only path that supports software stabilization. Decodes from frame 0
-    even when ``start_index > 0`` (no real seek) — accept this cost when
-    stabilization is required or when faster backends aren't installed.
+    """Decode-and-filter loop on top of VidGear / OpenCV.
+
+    Only path that supports software stabilization. With ``frame_rate``
+    known, the stream is first seeked to ``start_index`` (or the first
+    sparse index) — see :func:`_open_vidgear_at` — so a window costs its own
+    length rather than its start offset; without it, or when OpenCV cannot
+    seek the input accurately, it decodes from frame 0.
+    ``sparse_indices`` keeps only those frames and stops after the last.
+    OpenCV always decodes to BGR, so ``color="gray"`` is a ``cv2.cvtColor``
+    on the kept frames only.
     """
-    stream = VideoGear(source=video_path, stabilize=stabilize).start()
-    current_index = 0
+    gray = color == "gray"
+    wanted = set(sparse_indices) if sparse_indices is not None else None
+    last_wanted = max(sparse_indices, default=-1) if sparse_indices is not None else -1
+    first_index = min(sparse_indices, default=0) if sparse_indices is not None else start_index
+    gear, current_index = _open_vidgear_at(video_path, stabilize, first_index, frame_rate)
+    stream = gear.start()
     try:
         while True:
             frame = stream.read()
             if frame is None:
                 break
+            if wanted is not None:
+                if current_index in wanted:
+                    yield cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if gray else frame
+                if current_index >= last_wanted:
+                    break
+                current_index += 1
+                continue
             if current_index < start_index:
                 current_index += 1
                 continue
             if current_index <= end_index and (current_index - start_index) % frame_step == 0:
-                yield frame
+                yield cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if gray else frame
             if current_index > end_index:
                 break
             current_index += 1
@@ -779,93 +1504,862 @@ def _parse_pad_color(pad_color: str) -> tuple[int, int, int]:
     )
 
 
-def _apply_output_transform(
-    frame: np.ndarray,
+def _output_geometry(
+    src_width: int,
+    src_height: int,
     output_width: int | None,
     output_height: int | None,
-    pad_color_bgr: tuple[int, int, int],
-) -> np.ndarray:
-    """Resize a BGR frame to (``output_width``, ``output_height``).
+) -> tuple[int, int, int, int, int, int]:
+    """Compute the scale-fit-and-pad geometry shared by every backend.
 
-    Behavior:
-    - Both dimensions set → scale-fit (preserve aspect ratio) then pad
-      with ``pad_color_bgr`` so the output is exactly the requested size.
-    - Only one dimension set → scale to that dimension preserving aspect
-      ratio (the other dimension is derived; no pad).
-    - Neither set → return frame unchanged.
+    One source of truth for the output shape, whether the resize then runs
+    in ``cv2`` (VidGear), in libswscale (PyAV ``reformat``) or in ffmpeg's
+    ``scale`` + ``pad`` filters (ffmpeg-pipe).
 
-    Uses ``cv2.INTER_AREA`` when downscaling (sharper for downsizing)
-    and ``cv2.INTER_LINEAR`` when upscaling (cheap, no ringing).
-    """
-    if output_width is None and output_height is None:
-        return frame
-
-    h, w = frame.shape[:2]
+    Parameters
+    ----------
+    src_width, src_height : int
+        Decoded frame size.
+    output_width, output_height : int or None
+        Requested output size (see :func:`_apply_output_transform`).
 
+    Returns
+    -------
+    tuple[int, int, int, int, int, int]
+        ``(scaled_w, scaled_h, pad_top, pad_bottom, pad_left, pad_right)``;
+        the pads are all zero unless both output dimensions are set.
+    """
+    w, h = src_width, src_height
     if output_width is not None and output_height is not None:
         scale = min(output_width / w, output_height / h)
         new_w = max(1, int(round(w * scale)))
         new_h = max(1, int(round(h * scale)))
-        interp = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
-        scaled = cv2.resize(frame, (new_w, new_h), interpolation=interp)
         pad_top = (output_height - new_h) // 2
-        pad_bottom = output_height - new_h - pad_top
         pad_left = (output_width - new_w) // 2
-        pad_right = output_width - new_w - pad_left
-        return cv2.copyMakeBorder(
-            scaled,
+        return (
+            new_w,
+            new_h,
             pad_top,
-            pad_bottom,
+            output_height - new_h - pad_top,
             pad_left,
-            pad_right,
-            cv2.BORDER_CONSTANT,
-            value=list(pad_color_bgr),
+            output_width - new_w - pad_left,
         )
-
     if output_width is not None:
-        scale = output_width / w
-        new_h = max(1, int(round(h * scale)))
-        interp = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
-        return cv2.resize(frame, (output_width, new_h), interpolation=interp)
+        return output_width, max(1, int(round(h * output_width / w))), 0, 0, 0, 0
+    if output_height is not None:
+        return max(1, int(round(w * output_height / h))), output_height, 0, 0, 0, 0
+    return w, h, 0, 0, 0, 0
 
-    # output_height is not None
-    scale = output_height / h
-    new_w = max(1, int(round(w * scale)))
-    interp = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
-    return cv2.resize(frame, (new_w, output_height), interpolation=interp)
 
+def _apply_output_transform(
+    frame: np.ndarray,
+    output_width: int | None,
+    output_height: int | None,
+    pad_color_bgr: tuple[int, int, int],
+) -> np.ndarray:
+    """Resize a BGR frame to (``output_width``, ``output_height``).
 
-def _extract_via_pyav(
-    video_path: str,
+    Behavior:
+    - Both dimensions set → scale-fit (preserve aspect ratio) then pad
+      with ``pad_color_bgr`` so the output is exactly the requested size.
+    - Only one dimension set → scale to that dimension preserving aspect
+      ratio (the other dimension is derived; no pad).
+    - Neither set → return frame unchanged.
+
+    Uses ``cv2.INTER_AREA`` when downscaling (sharper for downsizing)
+    and ``cv2.INTER_LINEAR`` when upscaling (cheap, no ringing).
+
+    This is the post-decode path (VidGear). PyAV and ffmpeg-pipe produce
+    the same geometry inside the decoder instead.
+    """
+    if output_width is None and output_height is None:
+        return frame
+
+    h, w = frame.shape[:2]
+    new_w, new_h, top, bottom, left, right = _output_geometry(w, h, output_width, output_height)
+    interp = cv2.INTER_AREA if new_w * new_h < w * h else cv2.INTER_LINEAR
+    scaled = cv2.resize(frame, (new_w, new_h), interpolation=interp)
+    return _pad_frame(scaled, top, bottom, left, right, pad_color_bgr)
+
+
+def _pad_frame(
+    frame: np.ndarray,
+    top: int,
+    bottom: int,
+    left: int,
+    right: int,
+    pad_color_bgr: tuple[int, int, int],
+) -> np.ndarray:
+    """Pad an already-scaled frame with a constant color (no-op without pads).
+
+    Parameters
+    ----------
+    frame : numpy.ndarray
+        ``(H, W, C)`` or single-channel ``(H, W)`` frame.
+    top, bottom, left, right : int
+        Border widths in pixels.
+    pad_color_bgr : tuple[int, int, int]
+        Border color (a single-channel frame uses the first component).
+
+    Returns
+    -------
+    numpy.ndarray
+        The padded frame, or ``frame`` itself when every pad is zero.
+    """
+    if not (top or bottom or left or right):
+        return frame
+    return cv2.copyMakeBorder(
+        frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=list(pad_color_bgr)
+    )
+
+
+_COLORS = ("bgr", "gray")
+
+_QUALITIES = ("default", "preview")
+
+# Decoder shortcuts of quality="preview": skip the in-loop deblocking filter
+# (H.264 / HEVC / VP9 / AV1) and the inverse DCT of non-reference frames.
+# Skipped deblocking drifts until the next keyframe; a skipped IDCT stays in
+# its own frame, since nothing predicts from a non-reference frame.
+_PREVIEW_DECODER_OPTIONS: dict[str, str] = {"skip_loop_filter": "all", "skip_idct": "noref"}
+
+# Largest lowres factor (decode at 1/2**k of the source size) libavcodec's
+# lowres-capable decoders accept.
+_PREVIEW_MAX_LOWRES = 3
+
+
+def _preview_decoder_options(
+    width: int,
+    height: int,
+    output_width: int | None,
+    output_height: int | None,
+    hwaccel: str | None,
+) -> dict[str, str]:
+    """Return the decoder options of ``quality="preview"`` for one source.
+
+    On top of :data:`_PREVIEW_DECODER_OPTIONS`, asks for ``lowres`` — the
+    decoder reconstructs a frame 2, 4 or 8 times smaller, skipping most of
+    the IDCT and motion compensation work — when the requested output is no
+    larger than the reduced frame: the in-decoder scale then still targets
+    the same absolute size, so the output shape never changes. Only the
+    MPEG-1/2, MPEG-4 Part 2 and MJPEG decoders implement it; the others
+    ignore the option.
+
+    Parameters
+    ----------
+    width, height : int
+        Source frame size.
+    output_width, output_height : int or None
+        Requested output size (see :func:`_output_geometry`).
+    hwaccel : str or None
+        Resolved hwaccel; lowres is left off with one (libavcodec would fall
+        back to software decoding).
+
+    Returns
+    -------
+    dict[str, str]
+        libavcodec decoder options, as PyAV's ``codec_context.options`` and
+        ffmpeg's input options take them.
+    """
+    options = dict(_PREVIEW_DECODER_OPTIONS)
+    if hwaccel or (output_width is None and output_height is None):
+        return options
+    new_w, new_h, *_ = _output_geometry(width, height, output_width, output_height)
+    for k in range(_PREVIEW_MAX_LOWRES, 0, -1):
+        # Exact divisors only: a rounded-up reduced frame would shift the
+        # aspect ratio, and the scale-fit geometry with it.
+        if width % (1 << k) or height % (1 << k):
+            continue
+        if new_w <= width >> k and new_h <= height >> k:
+            options["lowres"] = str(k)
+            break
+    return options
+
+
+def _gray_pad_color(pad_color_bgr: tuple[int, int, int]) -> tuple[int, int, int]:
+    """Map a BGR pad color to the equivalent gray level, as a BGR triple.
+
+    Uses the BT.601 luma weights of ``cv2.COLOR_BGR2GRAY``, the conversion
+    every backend's gray output goes through (libswscale's ``bgr24`` →
+    ``gray`` on the ffmpeg pipe uses the same weights), so padding a
+    single-channel frame gives the same level as converting a padded BGR
+    frame.
+
+    Parameters
+    ----------
+    pad_color_bgr : tuple[int, int, int]
+        Pad color as ``(B, G, R)``.
+
+    Returns
+    -------
+    tuple[int, int, int]
+        ``(Y, Y, Y)``; single-channel borders use the first component.
+    """
+    b, g, r = pad_color_bgr
+    y = int(round(0.114 * b + 0.587 * g + 0.299 * r))
+    return (y, y, y)
+
+
+# ──────────────────────────────────────────────────────────────────────────
+#  Packet index
+#
+#  A demux-only pass over the video stream (no decoding) records, for every
+#  packet, its pts / dts / keyframe flag / byte position / size. That is
+#  enough to (a) seek straight to the exact keyframe preceding any frame —
+#  instead of a coarse ``container.seek(t, backward=True)`` that may land a
+#  whole GOP early — and (b) number frames by their rank in presentation
+#  order, which is the *real* frame count and frame index on VFR sources
+#  where ``duration × frame_rate`` is only an estimate.
+#
+#  Building the index costs one demux of the file (fast — no decode — but
+#  proportional to file size), so it is cached at three levels: an
+#  in-process LRU, the persistent catalog (``kind="packet_index"``) when
+#  enabled, and an optional ``<video>.packets.npz`` sidecar next to the file.
+#  Every level is stamped with the file's size and mtime.
+# ──────────────────────────────────────────────────────────────────────────
+
+_PACKET_INDEX_SIDECAR_SUFFIX = ".packets.npz"
+
+# What PacketIndex.from_bytes raises on a corrupt, truncated or old-layout
+# blob; a stored index failing with one of them is a miss, never an error.
+_PACKET_INDEX_READ_ERRORS = (OSError, ValueError, KeyError, zipfile.BadZipFile)
+
+# A packet index is ~40 bytes per frame (~7 MB for two hours at 30 fps), so
+# the in-process LRU is much smaller than the probe cache. Override with
+# VIDEO_HELPER_PACKET_INDEX_CACHE_SIZE (0 disables).
+_PACKET_INDEX_CACHE_SIZE: int = _env_number("VIDEO_HELPER_PACKET_INDEX_CACHE_SIZE", 16)
+_PACKET_INDEX_CACHE: OrderedDict[tuple[str, int, int], PacketIndex] = OrderedDict()
+_PACKET_INDEX_CACHE_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class PacketIndex:
+    """
+    Per-packet demux index of a video stream.
+
+    Arrays are parallel and in demux (decode) order; one packet is one frame
+    for every video codec this library handles.
+
+    Attributes
+    ----------
+    pts, dts : numpy.ndarray
+        int64 presentation / decode timestamps, in ``time_base`` units.
+    keyframe : numpy.ndarray
+        bool, ``True`` for packets a decoder can start from.
+    pos : numpy.ndarray
+        int64 byte offset of the packet in the file (``-1`` when unknown).
+    size : numpy.ndarray
+        int64 packet size in bytes.
+    time_base : fractions.Fraction
+        Stream time base (seconds per timestamp unit).
+    """
+
+    pts: np.ndarray
+    dts: np.ndarray
+    keyframe: np.ndarray
+    pos: np.ndarray
+    size: np.ndarray
+    time_base: Fraction
+
+    @property
+    def frame_count(self) -> int:
+        """Exact number of frames in the stream (VFR-safe)."""
+        return int(self.pts.shape[0])
+
+    @cached_property
+    def frame_pts(self) -> np.ndarray:
+        """Frame timestamps in presentation order; ``frame_pts[i]`` is frame ``i``."""
+        return np.sort(self.pts)
+
+    @cached_property
+    def frame_times(self) -> np.ndarray:
+        """Frame presentation times in seconds (float64), presentation order."""
+        return self.frame_pts.astype(np.float64) * float(self.time_base)
+
+    @cached_property
+    def keyframe_pts(self) -> np.ndarray:
+        """Sorted timestamps of the keyframes."""
+        return np.sort(self.pts[self.keyframe])
+
+    @cached_property
+    def keyframe_indices(self) -> np.ndarray:
+        """Sorted frame indices (presentation order) of the keyframes."""
+        return np.searchsorted(self.frame_pts, self.keyframe_pts)
+
+    def index_of_pts(self, pts: int | None) -> int:
+        """
+        Return the frame index of a decoded frame's timestamp.
+
+        Parameters
+        ----------
+        pts : int or None
+            ``frame.pts`` of a decoded frame.
+
+        Returns
+        -------
+        int
+            Rank of ``pts`` in presentation order, or ``-1`` when ``pts`` is
+            ``None`` or not a packet timestamp of this stream.
+        """
+        if pts is None:
+            return -1
+        i = int(np.searchsorted(self.frame_pts, pts))
+        return i if i < self.frame_count and self.frame_pts[i] == pts else -1
+
+    def index_at_time(self, seconds: float) -> int:
+        """
+        Return the index of the frame on screen at ``seconds``.
+
+        Parameters
+        ----------
+        seconds : float
+            Presentation time.
+
+        Returns
+        -------
+        int
+            Last frame whose presentation time is ``<= seconds`` (``0``
+            before the first frame).
+        """
+        return max(0, int(np.searchsorted(self.frame_times, seconds, side="right")) - 1)
+
+    def nearest_index(self, seconds: float) -> int:
+        """
+        Return the index of the frame whose presentation time is closest to ``seconds``.
+
+        Parameters
+        ----------
+        seconds : float
+            Presentation time.
+
+        Returns
+        -------
+        int
+            Frame index in ``[0, frame_count)``.
+        """
+        times = self.frame_times
+        j = int(np.searchsorted(times, seconds))
+        if j == 0:
+            return 0
+        if j >= times.shape[0]:
+            return int(times.shape[0]) - 1
+        return j if times[j] - seconds < seconds - times[j - 1] else j - 1
+
+    def keyframe_pts_before(self, frame_index: int) -> int:
+        """
+        Return the timestamp of the last keyframe at or before a frame.
+
+        Parameters
+        ----------
+        frame_index : int
+            Target frame, in presentation order.
+
+        Returns
+        -------
+        int
+            Keyframe pts to seek to so that decoding forward reaches
+            ``frame_index`` with the least waste.
+        """
+        target = self.frame_pts[frame_index]
+        k = int(np.searchsorted(self.keyframe_pts, target, side="right")) - 1
+        return int(self.keyframe_pts[max(0, k)])
+
+    def to_bytes(self, stamp: tuple[int, int] = (-1, -1)) -> bytes:
+        """
+        Serialize to ``.npz`` bytes.
+
+        Parameters
+        ----------
+        stamp : tuple[int, int], optional
+            ``(size, mtime_ns)`` of the source file, stored so a sidecar can
+            be checked against the file it describes.
+
+        Returns
+        -------
+        bytes
+            Uncompressed ``.npz`` archive.
+        """
+        buf = io.BytesIO()
+        np.savez(
+            buf,
+            pts=self.pts,
+            dts=self.dts,
+            keyframe=self.keyframe,
+            pos=self.pos,
+            size=self.size,
+            time_base=np.array(
+                [self.time_base.numerator, self.time_base.denominator], dtype=np.int64
+            ),
+            stamp=np.array(stamp, dtype=np.int64),
+        )
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> tuple[PacketIndex, tuple[int, int]]:
+        """
+        Deserialize what :meth:`to_bytes` wrote.
+
+        Parameters
+        ----------
+        raw : bytes
+            ``.npz`` archive.
+
+        Returns
+        -------
+        tuple[PacketIndex, tuple[int, int]]
+            The index and the stored ``(size, mtime_ns)`` stamp.
+        """
+        with np.load(io.BytesIO(raw), allow_pickle=False) as z:
+            num, den = (int(v) for v in z["time_base"])
+            index = cls(
+                pts=z["pts"],
+                dts=z["dts"],
+                keyframe=z["keyframe"],
+                pos=z["pos"],
+                size=z["size"],
+                time_base=Fraction(num, den),
+            )
+            size, mtime_ns = (int(v) for v in z["stamp"])
+        return index, (size, mtime_ns)
+
+
+def _build_packet_index(video_file: str, http_headers: dict | None = None) -> PacketIndex:
+    """Demux (without decoding) the first video stream into a :class:`PacketIndex`.
+
+    Parameters
+    ----------
+    video_file : str
+        Local path or URL.
+    http_headers : dict or None
+        HTTP headers (URLs only).
+
+    Returns
+    -------
+    PacketIndex
+        The index.
+
+    Raises
+    ------
+    ValueError
+        When the stream carries no timestamps at all (raw elementary
+        streams): there is nothing to seek on.
+    """
+    import av  # lazy — optional [pyav] extra
+
+    headers_str = _join_http_headers(http_headers) if _is_url(video_file) else None
+    container = (
+        av.open(video_file, options={"headers": headers_str})
+        if headers_str
+        else av.open(video_file)
+    )
+    try:
+        stream = container.streams.video[0]
+        pts: list[int] = []
+        dts: list[int] = []
+        keyframe: list[bool] = []
+        pos: list[int] = []
+        size: list[int] = []
+        for packet in container.demux(stream):
+            # Zero-size packets are the demuxer's end-of-stream flush markers.
+            if packet.size == 0:
+                continue
+            p = packet.pts if packet.pts is not None else packet.dts
+            if p is None:
+                raise ValueError(
+                    f"Cannot build a packet index for {video_file}: the video stream "
+                    "carries no timestamps"
+                )
+            pts.append(p)
+            dts.append(packet.dts if packet.dts is not None else p)
+            keyframe.append(bool(packet.is_keyframe))
+            pos.append(packet.pos if packet.pos is not None else -1)
+            size.append(packet.size)
+        time_base = Fraction(stream.time_base.numerator, stream.time_base.denominator)
+    finally:
+        container.close()
+    return PacketIndex(
+        pts=np.asarray(pts, dtype=np.int64),
+        dts=np.asarray(dts, dtype=np.int64),
+        keyframe=np.asarray(keyframe, dtype=bool),
+        pos=np.asarray(pos, dtype=np.int64),
+        size=np.asarray(size, dtype=np.int64),
+        time_base=time_base,
+    )
+
+
+def _read_packet_index_sidecar(sidecar_path: str, stamp: tuple[int, int]) -> PacketIndex | None:
+    """Load a ``.packets.npz`` sidecar if it exists and matches the file.
+
+    Parameters
+    ----------
+    sidecar_path : str
+        Candidate sidecar path.
+    stamp : tuple[int, int]
+        Current ``(size, mtime_ns)`` of the video.
+
+    Returns
+    -------
+    PacketIndex or None
+        The index, or ``None`` when the sidecar is missing, unreadable, or
+        describes an older version of the video.
+    """
+    if not os.path.isfile(sidecar_path):
+        return None
+    try:
+        with open(sidecar_path, "rb") as f:
+            index, stored = PacketIndex.from_bytes(f.read())
+    except _PACKET_INDEX_READ_ERRORS as exc:
+        osh.warning(f"Ignoring unreadable packet-index sidecar {sidecar_path}: {exc}")
+        return None
+    return index if stored == stamp else None
+
+
+def video_packet_index(
+    video_file: str,
+    *,
+    build: bool = True,
+    sidecar: bool = False,
+    http_headers: dict | None = None,
+) -> PacketIndex | None:
+    """
+    Return the demux packet index of a video's first video stream, cached.
+
+    Looked up, in order, in the in-process LRU, the persistent catalog
+    (when enabled, see :func:`video_helper.set_catalog_dir`) and a
+    ``<video_file>.packets.npz`` sidecar; built with one demux pass (no
+    decoding) only when all three miss. Every level is invalidated by the
+    file's size and mtime.
+
+    Parameters
+    ----------
+    video_file : str
+        Path to the input video, or an HTTP(S) URL (never cached).
+    build : bool, optional
+        Build the index when no cached copy exists (default True). With
+        ``False`` the call is a cheap lookup that returns ``None`` on a miss.
+    sidecar : bool, optional
+        Also write ``<video_file>.packets.npz`` next to the video after a
+        build (default False), so later processes reuse it even without a
+        catalog.
+    http_headers : dict[str, str], optional
+        HTTP headers for URL inputs.
+
+    Returns
+    -------
+    PacketIndex or None
+        The index, or ``None`` on a miss with ``build=False``.
+
+    Examples
+    --------
+    >>> idx = video_packet_index("vfr_clip.mp4", sidecar=True)
+    >>> idx.frame_count, int(idx.keyframe.sum())
+    (1712, 58)
+    """
+    if _is_url(video_file):
+        return _build_packet_index(video_file, http_headers) if build else None
+
+    osh.checkfile(video_file, msg=f"Video file not found: {video_file}")
+    key = _probe_cache_key(video_file)
+    if key is None:
+        return _build_packet_index(video_file) if build else None
+
+    with _PACKET_INDEX_CACHE_LOCK:
+        index = _PACKET_INDEX_CACHE.get(key)
+        if index is not None:
+            _PACKET_INDEX_CACHE.move_to_end(key)
+            return index
+
+    catalog = get_catalog()
+    raw = catalog.get(video_file, "packet_index") if catalog is not None else None
+    index = None
+    if raw is not None:
+        try:
+            index, _ = PacketIndex.from_bytes(raw)
+        except _PACKET_INDEX_READ_ERRORS as exc:
+            osh.warning(f"Ignoring unreadable catalog packet index of {video_file}: {exc}")
+            catalog.invalidate(video_file)
+    if index is None:
+        sidecar_path = video_file + _PACKET_INDEX_SIDECAR_SUFFIX
+        index = _read_packet_index_sidecar(sidecar_path, key[1:])
+        if index is None:
+            if not build:
+                return None
+            index = _build_packet_index(video_file)
+            if sidecar:
+                with open(sidecar_path, "wb") as f:
+                    f.write(index.to_bytes(key[1:]))
+        if catalog is not None:
+            catalog.put(video_file, "packet_index", index.to_bytes(key[1:]))
+
+    if _PACKET_INDEX_CACHE_SIZE > 0:
+        with _PACKET_INDEX_CACHE_LOCK:
+            _PACKET_INDEX_CACHE[key] = index
+            while len(_PACKET_INDEX_CACHE) > _PACKET_INDEX_CACHE_SIZE:
+                _PACKET_INDEX_CACHE.popitem(last=False)
+    return index
+
+
+# ──────────────────────────────────────────────────────────────────────────
+#  Sparse seek planning
+#
+#  For sparse reads the PyAV backend can either keep decoding forward from
+#  the last wanted frame or seek again. Decoding forward over a gap of ``g``
+#  frames costs ``g`` decodes; re-seeking costs a fixed overhead (demuxer
+#  reposition, decoder flush, the expensive intra frame it restarts on —
+#  ``_SEEK_COST_FRAMES``, in frame-decode units) plus the decodes from the
+#  preceding keyframe up to the target. The planner walks the sorted wanted
+#  indices and splits them into clusters: each cluster starts with a seek
+#  and is then decoded linearly. Keyframe positions come from the packet
+#  index when one is available; otherwise every keyframe is assumed to be up
+#  to ``_ASSUMED_GOP`` frames back (x264's default keyint), so the planner
+#  only re-seeks across gaps where that is a sure win.
+# ──────────────────────────────────────────────────────────────────────────
+
+# Fixed cost of one seek, in units of "one inter-frame decode". Override with
+# VIDEO_HELPER_SEEK_COST_FRAMES; ``inf`` restores seek-once-then-decode.
+_SEEK_COST_FRAMES: float = _env_number("VIDEO_HELPER_SEEK_COST_FRAMES", 12.0, float)
+
+# Keyframe distance assumed when no packet index is available. Override with
+# VIDEO_HELPER_ASSUMED_GOP for archives encoded with a known, shorter GOP.
+_ASSUMED_GOP: int = _env_number("VIDEO_HELPER_ASSUMED_GOP", 250)
+
+
+def _plan_sparse_seeks(
+    wanted: Sequence[int],
+    keyframe_indices: np.ndarray | None = None,
+    assumed_gop: int | None = None,
+    seek_cost: float | None = None,
+) -> list[list[int]]:
+    """Split sorted sparse indices into seek clusters.
+
+    Parameters
+    ----------
+    wanted : Sequence[int]
+        Sorted, de-duplicated frame indices.
+    keyframe_indices : numpy.ndarray or None
+        Sorted keyframe frame indices (exact, from a packet index), or
+        ``None`` to assume one keyframe every ``assumed_gop`` frames at worst.
+    assumed_gop : int or None
+        Worst-case keyframe distance without an index (default
+        ``_ASSUMED_GOP``).
+    seek_cost : float or None
+        Seek overhead in frame-decode units (default ``_SEEK_COST_FRAMES``).
+
+    Returns
+    -------
+    list[list[int]]
+        Clusters in order; the caller seeks before each one and decodes
+        linearly within it.
+    """
+    gop = _ASSUMED_GOP if assumed_gop is None else assumed_gop
+    cost = _SEEK_COST_FRAMES if seek_cost is None else seek_cost
+    clusters: list[list[int]] = []
+    for j in wanted:
+        if not clusters:
+            clusters.append([j])
+            continue
+        gap = j - clusters[-1][-1]
+        if cost + _seek_lead_in(j, keyframe_indices, gop) < gap:
+            clusters.append([j])
+        else:
+            clusters[-1].append(j)
+    return clusters
+
+
+def _seek_lead_in(frame_index: int, keyframe_indices: np.ndarray | None, gop: int) -> int:
+    """Frames decoded after a seek before ``frame_index`` comes out.
+
+    Parameters
+    ----------
+    frame_index : int
+        Seek target.
+    keyframe_indices : numpy.ndarray or None
+        Sorted keyframe frame indices, or ``None`` to assume the worst case
+        of one keyframe every ``gop`` frames.
+    gop : int
+        Keyframe distance assumed without ``keyframe_indices``.
+
+    Returns
+    -------
+    int
+        Distance from the keyframe the seek lands on to ``frame_index``.
+    """
+    if keyframe_indices is not None and len(keyframe_indices):
+        k = int(np.searchsorted(keyframe_indices, frame_index, side="right")) - 1
+        return frame_index - int(keyframe_indices[max(0, k)])
+    return min(frame_index, gop)
+
+
+# ──────────────────────────────────────────────────────────────────────────
+#  Strided read planning
+#
+#  A strided range (``frame_step`` > 1, e.g. ``frame_interval=1.0`` at
+#  30 fps) can be served three ways, and which one is cheapest depends on
+#  the step and the keyframe layout:
+#
+#  - ``"decode"``    — seek once, decode every frame, keep one per step.
+#                      Costs the span of the range.
+#  - ``"keyframes"`` — decode keyframes only (``skip_frame="NONKEY"``) and
+#                      keep the wanted ones. Exact only when every wanted
+#                      frame *is* a keyframe, which needs the exact keyframe
+#                      positions of a packet index. Costs one decode per
+#                      keyframe in the span.
+#  - ``"seek"``      — turn the range into sparse indices and let the sparse
+#                      seek planner re-seek across gaps where that beats
+#                      decoding through them. Costs a seek plus its lead-in
+#                      per cluster, plus the decodes inside each cluster.
+#
+#  All costs are in inter-frame decode units, like ``_SEEK_COST_FRAMES``.
+#  Without a packet index the keyframe distance is estimated by demuxing
+#  (not decoding) the first packets of the file; the estimate is the largest
+#  distance seen, so the planner stays pessimistic about seeking.
+# ──────────────────────────────────────────────────────────────────────────
+
+# Packets demuxed at most to estimate the keyframe distance (about 33 s at
+# 60 fps); a file with no second keyframe by then keeps ``_ASSUMED_GOP``.
+_GOP_PROBE_PACKETS = 2000
+
+# Estimated keyframe distance per file, keyed like the probe cache.
+_GOP_CACHE: OrderedDict[tuple[str, int, int], int | None] = OrderedDict()
+_GOP_CACHE_LOCK = threading.Lock()
+
+
+def _estimate_gop(video_path: str) -> int | None:
+    """Estimate a local file's keyframe distance from its first packets.
+
+    Parameters
+    ----------
+    video_path : str
+        Local path (URLs are not probed: a demux there is network I/O).
+
+    Returns
+    -------
+    int or None
+        The largest distance, in frames, between consecutive keyframes among
+        the first :data:`_GOP_PROBE_PACKETS` packets, or ``None`` when PyAV
+        is missing, the input is a URL or fewer than two keyframes were seen.
+    """
+    if _is_url(video_path) or not _have_pyav():
+        return None
+    key = _probe_cache_key(video_path)
+    if key is not None:
+        with _GOP_CACHE_LOCK:
+            if key in _GOP_CACHE:
+                _GOP_CACHE.move_to_end(key)
+                return _GOP_CACHE[key]
+
+    import av  # lazy
+
+    keyframes: list[int] = []
+    try:
+        with av.open(video_path) as container:
+            stream = container.streams.video[0]
+            n = 0
+            for packet in container.demux(stream):
+                if packet.size == 0:  # the flush packet at end of stream
+                    continue
+                if packet.is_keyframe:
+                    keyframes.append(n)
+                n += 1
+                if n >= _GOP_PROBE_PACKETS:
+                    break
+    except av.error.FFmpegError:
+        return None
+    gop = int(np.diff(keyframes).max()) if len(keyframes) > 1 else None
+
+    if key is not None and _PROBE_CACHE_SIZE > 0:
+        with _GOP_CACHE_LOCK:
+            _GOP_CACHE[key] = gop
+            while len(_GOP_CACHE) > _PROBE_CACHE_SIZE:
+                _GOP_CACHE.popitem(last=False)
+    return gop
+
+
+def _plan_strided_read(
     start_index: int,
     end_index: int,
     frame_step: int,
-    sparse_indices: Sequence[int] | None,
-    frame_rate: float,
-    hwaccel: str | None,
-    http_headers: dict | None = None,
-) -> Iterator[np.ndarray]:
-    """PyAV-based decode with keyframe seek and optional hardware accel.
+    keyframe_indices: np.ndarray | None = None,
+    gop: int | None = None,
+    seek_cost: float | None = None,
+    keyframe_decode: bool = True,
+) -> tuple[str, dict[str, float]]:
+    """Pick the cheapest way to read ``range(start_index, end_index + 1, frame_step)``.
 
-    Notes
-    -----
-    PyAV's ``container.seek`` accepts an offset in ``AV_TIME_BASE`` units
-    (microseconds) when no ``stream`` is passed. We rely on that and
-    recover the exact frame index from ``frame.pts * stream.time_base``,
-    so a coarse keyframe seek is fine — we just drop everything before the
-    requested index.
+    Parameters
+    ----------
+    start_index, end_index : int
+        Inclusive bounds, ``end_index`` clamped to the stream.
+    frame_step : int
+        Stride (> 1 for the choice to matter).
+    keyframe_indices : numpy.ndarray or None
+        Exact keyframe positions (packet index). Required for
+        ``"keyframes"``.
+    gop : int or None
+        Keyframe distance to assume without ``keyframe_indices``; ``None``
+        means unknown (``_ASSUMED_GOP``).
+    seek_cost : float or None
+        Seek overhead in frame-decode units (default ``_SEEK_COST_FRAMES``).
+    keyframe_decode : bool, optional
+        Whether the backend can decode keyframes only.
 
-    Hardware acceleration is wired through ``av.codec.hwaccel.HWAccel``
-    (not the format-context ``options=`` kwarg, which is silently ignored
-    for hwaccel — that bug existed in v1.4.0-dev and inflated all
-    ``hwaccel="auto"`` cells in SPEED_ANALYSIS.md to be no-ops).
+    Returns
+    -------
+    tuple[str, dict[str, float]]
+        The strategy — ``"decode"``, ``"keyframes"`` or ``"seek"`` — and the
+        estimated cost of each one considered (for the debug log).
+    """
+    cost = _SEEK_COST_FRAMES if seek_cost is None else seek_cost
+    assumed_gop = _ASSUMED_GOP if gop is None else gop
+    wanted = np.arange(start_index, end_index + 1, frame_step)
+    costs: dict[str, float] = {"decode": float(end_index - start_index + 1)}
+    if len(wanted) < 2:
+        return "decode", costs
+
+    if keyframe_decode and keyframe_indices is not None and len(keyframe_indices):
+        lo = int(np.searchsorted(keyframe_indices, start_index, side="left"))
+        hi = int(np.searchsorted(keyframe_indices, end_index, side="right"))
+        in_span = keyframe_indices[lo:hi]
+        if np.isin(wanted, in_span).all():
+            costs["keyframes"] = float(len(in_span))
+
+    # Every strategy pays the same first seek to ``start_index``; only the
+    # re-seeks of clusters after the first one are extra.
+    clusters = _plan_sparse_seeks(wanted.tolist(), keyframe_indices, assumed_gop, cost)
+    if len(clusters) > 1:
+        costs["seek"] = float(
+            sum(c[-1] - c[0] + 1 for c in clusters)
+            + sum(cost + _seek_lead_in(c[0], keyframe_indices, assumed_gop) for c in clusters[1:])
+        )
+    return min(costs, key=costs.__getitem__), costs
+
+
+def _open_pyav_container(
+    video_path: str, hwaccel: str | None, http_headers: dict | None
+) -> av.container.InputContainer:
+    """Open ``video_path`` with PyAV, with hwaccel and HTTP headers wired in.
+
+    Parameters
+    ----------
+    video_path : str
+        Input path or URL.
+    hwaccel : str or None
+        Resolved hwaccel device type; falls back to software decode (with a
+        warning) when the device cannot be opened.
+    http_headers : dict or None
+        HTTP headers for URL inputs.
+
+    Returns
+    -------
+    av.container.InputContainer
+        The open container; the caller closes it.
     """
     import av  # lazy
 
     # HTTP headers (User-Agent / Referer / Cookie / Authorization) are
     # fed to libavformat via the AVFormatContext options dict — that's
     # the right place for them (unlike hwaccel, which the same kwarg
-    # silently ignores; see _extract_via_pyav notes above).
+    # silently ignores; see _extract_via_pyav notes).
     open_options: dict | None = None
     headers_str = _join_http_headers(http_headers)
     if headers_str:
@@ -896,45 +2390,262 @@ def _extract_via_pyav(
         container = (
             av.open(video_path, options=open_options) if open_options else av.open(video_path)
         )
-    try:
-        stream = container.streams.video[0]
-        # Deliberately NOT stream.thread_type = "AUTO": this function seeks then breaks the
-        # decode loop early once it has the wanted frame(s) (both the sparse-indices and the
-        # sequential-range path below), and closing a multithreaded libavcodec context that
-        # was never fully drained is a known PyAV/FFmpeg deadlock — container.close() can hang
-        # forever joining decoder threads still holding in-flight frames. Sampling call sites
-        # (smart face sampling, seek-heavy by design) gain little from frame-threading anyway
-        # since most of the video is skipped via seek, not decoded.
-
-        def _seek_to_seconds(seconds: float) -> None:
-            """Seek the container to the keyframe at-or-before ``seconds``.
+    return container
 
-            Parameters
-            ----------
-            seconds : float
-                Target position in seconds (clamped to >= 0).
-            """
-            # AV_TIME_BASE is 1 µs; convert seconds → microseconds. ``backward``
-            # lands on the nearest preceding keyframe so decoding stays valid.
-            offset_us = max(0, int(seconds * 1_000_000))
-            container.seek(offset_us, any_frame=False, backward=True)
 
-        def _index_of(frame: av.VideoFrame) -> int:
-            """Map a decoded frame's PTS to its integer frame index.
+def _configure_pyav_threads(
+    stream: av.video.stream.VideoStream, decode_threads: int | None, thread_type: str | None
+) -> bool:
+    """Apply decoder threading to a PyAV video stream before it decodes.
 
-            Parameters
-            ----------
-            frame : av.VideoFrame
-                Decoded PyAV frame.
+    Parameters
+    ----------
+    stream : av.video.stream.VideoStream
+        Stream whose codec context is configured.
+    decode_threads : int or None
+        ``thread_count`` (``None`` keeps libavcodec's default).
+    thread_type : str or None
+        Key of ``_THREAD_TYPES`` (``None`` keeps libavcodec's default).
 
-            Returns
-            -------
+    Returns
+    -------
+    bool
+        Whether frame threading is on (the decoder must then be drained
+        with :func:`_drain_pyav_decoder` before the container is closed).
+    """
+    import av  # lazy
+
+    if thread_type is not None:
+        stream.thread_type = _THREAD_TYPES[thread_type][0]
+    if decode_threads is not None:
+        stream.thread_count = decode_threads
+    return bool(stream.thread_type & av.codec.context.ThreadType.FRAME)
+
+
+def _drain_pyav_decoder(stream: av.video.stream.VideoStream) -> None:
+    """Send EOF to a frame-threaded decoder and collect its in-flight frames.
+
+    Closing a frame-threaded libavcodec context that still holds frames can
+    deadlock joining its threads; draining first leaves none in flight.
+
+    Parameters
+    ----------
+    stream : av.video.stream.VideoStream
+        Stream whose decoder is drained.
+    """
+    import av  # lazy
+
+    try:
+        for _ in stream.codec_context.decode(None):
+            pass
+    except av.error.FFmpegError:
+        pass
+
+
+def _pyav_frame_to_array(
+    frame: av.VideoFrame,
+    pix_fmt: str,
+    output_width: int | None,
+    output_height: int | None,
+    pad_color_bgr: tuple[int, int, int],
+    fast_scale: bool = False,
+) -> np.ndarray:
+    """Convert a decoded PyAV frame to BGR / gray, scale-fit-and-padded if requested.
+
+    Parameters
+    ----------
+    frame : av.VideoFrame
+        Decoded PyAV frame.
+    pix_fmt : str
+        ``"bgr24"`` or ``"gray"``.
+    output_width, output_height : int or None
+        Scale-fit-and-pad target, applied by libswscale during the
+        conversion (the full-size frame is never materialized).
+    pad_color_bgr : tuple[int, int, int]
+        Pad color.
+    fast_scale : bool, optional
+        Scale with libswscale's ``FAST_BILINEAR`` (``quality="preview"``)
+        instead of area / bilinear.
+
+    Returns
+    -------
+    numpy.ndarray
+        ``(H, W, 3)`` BGR or ``(H, W)`` gray uint8 frame at the output size.
+    """
+    if output_width is None and output_height is None:
+        bgr = frame.to_ndarray(format="bgr24")
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY) if pix_fmt == "gray" else bgr
+    new_w, new_h, top, bottom, left, right = _output_geometry(
+        frame.width, frame.height, output_width, output_height
+    )
+    # Same filter choice as the cv2 path: area for downscale, bilinear up.
+    interp = "AREA" if new_w * new_h < frame.width * frame.height else "BILINEAR"
+    if fast_scale:
+        interp = "FAST_BILINEAR"
+    scaled = frame.to_ndarray(format="bgr24", width=new_w, height=new_h, interpolation=interp)
+    if pix_fmt == "gray":
+        # Gray is BT.601 luma of the BGR frame, as on every backend (see
+        # _gray_pad_color): swscale's own gray output is the source's Y
+        # plane, whose weights follow the source matrix (BT.709 for HD).
+        scaled = cv2.cvtColor(scaled, cv2.COLOR_BGR2GRAY)
+    return _pad_frame(scaled, top, bottom, left, right, pad_color_bgr)
+
+
+def _extract_via_pyav(
+    video_path: str,
+    start_index: int,
+    end_index: int,
+    frame_step: int,
+    sparse_indices: Sequence[int] | None,
+    frame_rate: float,
+    hwaccel: str | None,
+    http_headers: dict | None = None,
+    packet_index: PacketIndex | None = None,
+    output_width: int | None = None,
+    output_height: int | None = None,
+    pad_color_bgr: tuple[int, int, int] = (0, 0, 0),
+    color: str = "bgr",
+    decode_threads: int | None = None,
+    thread_type: str | None = None,
+    with_indices: bool = False,
+    assumed_gop: int | None = None,
+    keyframes_only: bool = False,
+    with_times: bool = False,
+    quality: str = "default",
+) -> Iterator[np.ndarray] | Iterator[tuple[int, np.ndarray]] | Iterator[tuple[float, np.ndarray]]:
+    """PyAV-based decode with keyframe seek and optional hardware accel.
+
+    Notes
+    -----
+    PyAV's ``container.seek`` accepts an offset in ``AV_TIME_BASE`` units
+    (microseconds) when no ``stream`` is passed. We rely on that and
+    recover the exact frame index from ``frame.pts * stream.time_base``,
+    so a coarse keyframe seek is fine — we just drop everything before the
+    requested index.
+
+    With a ``packet_index`` both halves become exact: the seek targets the
+    pts of the keyframe immediately preceding the wanted frame (in stream
+    time base, so it cannot land a GOP early), and a frame's index is the
+    rank of its pts in presentation order (correct on VFR sources).
+
+    ``output_width`` / ``output_height`` are applied by libswscale during
+    the YUV→BGR conversion (``to_ndarray(width=, height=)``), so the
+    full-resolution BGR frame is never materialized; only the pad (if any)
+    is a numpy copy, at output size. ``color="gray"`` converts that BGR
+    frame with ``cv2.cvtColor``, exactly as VidGear does.
+
+    ``decode_threads`` / ``thread_type`` set the codec context's
+    ``thread_count`` / ``thread_type`` before the decoder opens; ``None``
+    keeps libavcodec's defaults (slice threading, automatic thread count).
+
+    ``with_indices=True`` yields ``(frame_index, frame)`` pairs instead of
+    bare frames (what the decoded-frame cache stores frames under);
+    ``with_times=True`` yields ``(frame.time, frame)``, the decoder's own
+    presentation time in seconds.
+
+    ``assumed_gop`` is the keyframe distance the sparse seek planner assumes
+    without a packet index (see :func:`_estimate_gop`). ``keyframes_only``
+    sets the decoder's ``skip_frame="NONKEY"``: only keyframes are decoded,
+    which is exact when every wanted frame is one (the ``"keyframes"``
+    strategy of :func:`_plan_strided_read`).
+
+    ``quality="preview"`` opens the decoder with the shortcuts of
+    :func:`_preview_decoder_options` and scales with ``FAST_BILINEAR``.
+
+    Hardware acceleration is wired through ``av.codec.hwaccel.HWAccel``
+    (not the format-context ``options=`` kwarg, which is silently ignored
+    for hwaccel — that bug existed in v1.4.0-dev and inflated all
+    ``hwaccel="auto"`` cells in SPEED_ANALYSIS.md to be no-ops).
+    """
+    container = _open_pyav_container(video_path, hwaccel, http_headers)
+    frame_threaded = False
+    try:
+        stream = container.streams.video[0]
+        # Frame threading stays opt-in (thread_type="frame"/"auto"): this function seeks
+        # then breaks the decode loop early once it has the wanted frame(s), and closing a
+        # frame-threaded libavcodec context that was never fully drained is a known
+        # PyAV/FFmpeg deadlock — container.close() can hang joining decoder threads still
+        # holding in-flight frames. When it is on, the `finally` below drains the decoder
+        # before closing. Sampling call sites (smart face sampling, seek-heavy by design)
+        # gain little from it anyway since most of the video is skipped via seek.
+        frame_threaded = _configure_pyav_threads(stream, decode_threads, thread_type)
+        if keyframes_only:
+            stream.codec_context.skip_frame = "NONKEY"
+        preview = quality == "preview"
+        if preview:
+            # Options only reach the decoder when it opens, on the first decode.
+            stream.codec_context.options = _preview_decoder_options(
+                stream.codec_context.width,
+                stream.codec_context.height,
+                output_width,
+                output_height,
+                hwaccel,
+            )
+        pix_fmt = "gray" if color == "gray" else "bgr24"
+
+        def _to_array(frame: av.VideoFrame) -> np.ndarray:
+            """Convert a decoded frame per this call's color / resize / quality options."""
+            return _pyav_frame_to_array(
+                frame, pix_fmt, output_width, output_height, pad_color_bgr, fast_scale=preview
+            )
+
+        def _emit(index: int, frame: av.VideoFrame) -> object:
+            """Package one kept frame as this call's yield item."""
+            if with_indices:
+                return index, _to_array(frame)
+            if with_times:
+                return frame.time, _to_array(frame)
+            return _to_array(frame)
+
+        def _seek_to_seconds(seconds: float) -> None:
+            """Seek the container to the keyframe at-or-before ``seconds``.
+
+            Parameters
+            ----------
+            seconds : float
+                Target position in seconds (clamped to >= 0).
+            """
+            # AV_TIME_BASE is 1 µs; convert seconds → microseconds. ``backward``
+            # lands on the nearest preceding keyframe so decoding stays valid.
+            offset_us = max(0, int(seconds * 1_000_000))
+            container.seek(offset_us, any_frame=False, backward=True)
+
+        def _seek_to_frame(frame_index: int) -> None:
+            """Seek so that decoding forward reaches ``frame_index`` first-hand.
+
+            Parameters
+            ----------
+            frame_index : int
+                Target frame index.
+            """
+            if packet_index is not None:
+                container.seek(
+                    packet_index.keyframe_pts_before(frame_index),
+                    stream=stream,
+                    any_frame=False,
+                    backward=True,
+                )
+            else:
+                _seek_to_seconds(frame_index / frame_rate)
+
+        def _index_of(frame: av.VideoFrame) -> int:
+            """Map a decoded frame's PTS to its integer frame index.
+
+            Parameters
+            ----------
+            frame : av.VideoFrame
+                Decoded PyAV frame.
+
+            Returns
+            -------
             int
                 Zero-based frame index, or ``-1`` when the frame carries no PTS
                 (rare, but possible on some malformed streams).
             """
             # No presentation timestamp → we cannot place the frame; signal -1
             # so the caller skips it rather than mis-indexing the stream.
+            if packet_index is not None:
+                return packet_index.index_of_pts(frame.pts)
             if frame.pts is None:
                 return -1
             # PTS is in stream time-base units; scale to seconds then to a
@@ -943,85 +2654,1061 @@ def _extract_via_pyav(
 
         if sparse_indices is not None and len(sparse_indices) > 0:
             wanted = sorted(set(sparse_indices))
-            wanted_set = set(wanted)
-            _seek_to_seconds(wanted[0] / frame_rate)
-            for frame in container.decode(stream):
-                index = _index_of(frame)
-                if index in wanted_set:
-                    yield frame.to_ndarray(format="bgr24")
-                    wanted_set.discard(index)
-                    if not wanted_set:
+            clusters = _plan_sparse_seeks(
+                wanted,
+                packet_index.keyframe_indices if packet_index is not None else None,
+                assumed_gop,
+            )
+            osh.debug("pyav sparse: %d frames in %d seek cluster(s)", len(wanted), len(clusters))
+            for cluster in clusters:
+                # One seek per cluster, then linear decode to its last frame:
+                # the planner already decided that re-seeking inside a cluster
+                # would cost more than decoding through the gap.
+                _seek_to_frame(cluster[0])
+                wanted_set = set(cluster)
+                for frame in container.decode(stream):
+                    index = _index_of(frame)
+                    if index in wanted_set:
+                        yield _emit(index, frame)
+                        wanted_set.discard(index)
+                    if not wanted_set or index > cluster[-1]:
                         break
             return
 
-        # Sequential range: seek to a keyframe at-or-before start_index,
-        # then PTS-filter to the exact bounds.
-        if start_index > 0:
-            _seek_to_seconds(start_index / frame_rate)
-        for frame in container.decode(stream):
-            index = _index_of(frame)
-            if index < start_index:
-                continue
-            if index > end_index:
-                break
-            if (index - start_index) % frame_step == 0:
-                yield frame.to_ndarray(format="bgr24")
+        # Sequential range: seek to a keyframe at-or-before start_index,
+        # then PTS-filter to the exact bounds.
+        if start_index > 0:
+            _seek_to_frame(start_index)
+        for frame in container.decode(stream):
+            index = _index_of(frame)
+            if index < start_index:
+                continue
+            if index > end_index:
+                break
+            if (index - start_index) % frame_step == 0:
+                yield _emit(index, frame)
+    finally:
+        if frame_threaded:
+            _drain_pyav_decoder(stream)
+        container.close()
+
+
+# Extra cost of one more ffmpeg subprocess (fork/exec, container open,
+# stream probing) on top of a seek, in frame-decode units. Makes the sparse
+# ffmpeg-pipe planner merge clusters much more eagerly than PyAV's
+# in-process seeks. Override with VIDEO_HELPER_PIPE_SPAWN_COST_FRAMES.
+_PIPE_SPAWN_COST_FRAMES: float = _env_number("VIDEO_HELPER_PIPE_SPAWN_COST_FRAMES", 60.0, float)
+
+
+def _extract_via_ffmpeg_pipe(
+    video_path: str,
+    start_index: int,
+    end_index: int,
+    frame_step: int,
+    frame_rate: float,
+    width: int,
+    height: int,
+    hwaccel: str | None,
+    http_headers: dict | None = None,
+    sparse_indices: Sequence[int] | None = None,
+    output_width: int | None = None,
+    output_height: int | None = None,
+    pad_color_bgr: tuple[int, int, int] = (0, 0, 0),
+    color: str = "bgr",
+    decode_threads: int | None = None,
+    thread_type: str | None = None,
+    ring_buffer: int | None = None,
+    assumed_gop: int | None = None,
+    keyframes_only: bool = False,
+    quality: str = "default",
+) -> Iterator[np.ndarray] | Iterator[tuple[float, np.ndarray]]:
+    """ffmpeg subprocess with -ss/-to true seek and raw bgr24 over a pipe.
+
+    Useful when PyAV is unavailable but ffmpeg is. Hwaccel is honored when
+    supported by the local build. HTTP headers (``http_headers``) are
+    passed via ``-headers`` and placed before ``-i`` so they reach the
+    input demuxer.
+
+    Sparse reads (``sparse_indices``) go through the same gap planner as
+    the PyAV backend (:func:`_plan_sparse_seeks`), with the subprocess
+    spawn added to the seek cost: each cluster of nearby indices is one
+    ffmpeg process that seeks (``-ss`` before ``-i``: keyframe seek plus
+    exact decode-and-discard) to the cluster's first frame and keeps the
+    wanted frames with a ``select`` expression, stopping after the last
+    one (``-frames:v``). A very sparse request over a long file is a few
+    short processes; a dense one collapses into a single process.
+
+    ``output_width`` / ``output_height`` run as ``scale`` + ``pad`` filters
+    inside ffmpeg (same geometry as :func:`_apply_output_transform`), so
+    only output-sized frames cross the pipe. ``color="gray"`` switches the
+    pipe to ``-pix_fmt gray``: a third of the bytes per frame. The frames
+    go through ``bgr24`` first, so the levels match ``cv2.cvtColor``.
+
+    ``decode_threads`` / ``thread_type`` become the decoder's ``-threads`` /
+    ``-thread_type`` input options.
+
+    Frames are read from the pipe with ``readinto`` straight into their
+    final array. With ``ring_buffer=N`` those arrays come from a ring of N
+    preallocated buffers, shared by every process of the request: nothing
+    is allocated per frame, and each yielded frame is only valid until N
+    more frames have been yielded.
+
+    ``assumed_gop`` is the keyframe distance the sparse planner assumes (see
+    :func:`_estimate_gop`); ``None`` keeps ``_ASSUMED_GOP``.
+
+    ``keyframes_only=True`` decodes keyframes only (``-skip_frame nokey``)
+    and yields ``(time, frame)`` pairs. The raw pipe carries no timestamps,
+    so the same ffmpeg process reports them through a ``showinfo`` filter
+    on stderr, one line per frame it writes.
+
+    ``quality="preview"`` adds the decoder shortcuts of
+    :func:`_preview_decoder_options` to the input options and scales with
+    ``fast_bilinear``.
+    """
+    pix_fmt = "gray" if color == "gray" else "bgr24"
+    decoder_args: list[str] = []
+    if decode_threads is not None:
+        decoder_args += ["-threads", str(decode_threads)]
+    if thread_type is not None:
+        decoder_args += ["-thread_type", _THREAD_TYPES[thread_type][1]]
+    if quality == "preview":
+        options = _preview_decoder_options(width, height, output_width, output_height, hwaccel)
+        for name, value in options.items():
+            decoder_args += [f"-{name}", value]
+    scale_pad = None
+    # Borders added in numpy after the pipe (gray only, see below).
+    numpy_pad = (0, 0, 0, 0)
+    if output_width is not None or output_height is not None:
+        new_w, new_h, top, bottom, left, right = _output_geometry(
+            width, height, output_width, output_height
+        )
+        flags = "area" if new_w * new_h < width * height else "bilinear"
+        if quality == "preview":
+            flags = "fast_bilinear"
+        scale_pad = f"scale={new_w}:{new_h}:flags={flags}"
+        width, height = new_w, new_h
+        if pix_fmt == "gray":
+            # ffmpeg's pad fills gray frames with a limited-range luma level;
+            # padding the output-sized frame in numpy keeps the exact level.
+            numpy_pad = (top, bottom, left, right)
+        elif top or bottom or left or right:
+            width, height = new_w + left + right, new_h + top + bottom
+            b, g, r = pad_color_bgr
+            scale_pad += f",pad={width}:{height}:{left}:{top}:color=0x{r:02x}{g:02x}{b:02x}"
+    if pix_fmt == "gray":
+        # Through BGR, so the gray levels are BT.601 luma like the other
+        # backends' cv2.cvtColor, not the source's (matrix-dependent) Y plane.
+        scale_pad = f"{scale_pad},format=bgr24" if scale_pad else "format=bgr24"
+    ring = (
+        _frame_ring(ring_buffer, (height, width) if pix_fmt == "gray" else (height, width, 3))
+        if ring_buffer
+        else None
+    )
+    if keyframes_only:
+        pairs = _ffmpeg_pipe_frames(
+            video_path,
+            # Half a frame early, as for sparse reads: ffmpeg's exact seek then
+            # keeps every keyframe from start_index on; the loop below stops
+            # it at the first keyframe past end_index.
+            start_s=max(0.0, (start_index - 0.5) / frame_rate),
+            end_s=None,
+            select=None,
+            scale_pad=scale_pad,
+            max_frames=None,
+            width=width,
+            height=height,
+            hwaccel=hwaccel,
+            http_headers=http_headers,
+            pix_fmt=pix_fmt,
+            decoder_args=decoder_args,
+            ring=ring,
+            keyframes_only=True,
+        )
+        for t, frame in pairs:
+            index = round(t * frame_rate)
+            if index > end_index:
+                break
+            if index >= start_index:
+                yield t, _pad_frame(frame, *numpy_pad, pad_color_bgr)
+        return
+    for frame in _ffmpeg_pipe_segments(
+        video_path,
+        start_index,
+        end_index,
+        frame_step,
+        frame_rate,
+        width,
+        height,
+        hwaccel,
+        http_headers,
+        sparse_indices,
+        scale_pad,
+        pix_fmt,
+        decoder_args,
+        ring=ring,
+        assumed_gop=assumed_gop,
+    ):
+        yield _pad_frame(frame, *numpy_pad, pad_color_bgr)
+
+
+def _ffmpeg_pipe_segments(
+    video_path: str,
+    start_index: int,
+    end_index: int,
+    frame_step: int,
+    frame_rate: float,
+    width: int,
+    height: int,
+    hwaccel: str | None,
+    http_headers: dict | None,
+    sparse_indices: Sequence[int] | None,
+    scale_pad: str | None,
+    pix_fmt: str,
+    decoder_args: Sequence[str] = (),
+    ring: Iterator[np.ndarray] | None = None,
+    assumed_gop: int | None = None,
+) -> Iterator[np.ndarray]:
+    """Plan the ffmpeg processes of one request and chain their frames.
+
+    Parameters
+    ----------
+    video_path : str
+        Input path or URL.
+    start_index, end_index, frame_step : int
+        Sequential window (ignored when ``sparse_indices`` is given).
+    frame_rate : float
+        Source frame rate, to turn indices into seek times.
+    width, height : int
+        Size of the frames ffmpeg writes to the pipe.
+    hwaccel : str or None
+        ``-hwaccel`` value.
+    http_headers : dict or None
+        HTTP headers for URL inputs.
+    sparse_indices : Sequence[int] or None
+        Wanted frame indices; one process per planned cluster.
+    scale_pad : str or None
+        ``scale`` (+ ``pad``) filters.
+    pix_fmt : str
+        Raw output format (``"bgr24"`` or ``"gray"``).
+    decoder_args : Sequence[str], optional
+        Decoder input options (``-threads`` / ``-thread_type``).
+    ring : Iterator[numpy.ndarray] or None, optional
+        Output buffers shared by every process (see :func:`_frame_ring`).
+    assumed_gop : int or None, optional
+        Keyframe distance for the sparse planner (default ``_ASSUMED_GOP``).
+
+    Yields
+    ------
+    numpy.ndarray
+        Raw frames in request order.
+    """
+    if sparse_indices is not None:
+        wanted = sorted(set(sparse_indices))
+        clusters = _plan_sparse_seeks(
+            wanted, assumed_gop=assumed_gop, seek_cost=_SEEK_COST_FRAMES + _PIPE_SPAWN_COST_FRAMES
+        )
+        # A select expression with a term per frame would outgrow the OS limit
+        # on one argument (128 KB on Linux) and cost a test per term per frame:
+        # runs of constant stride become one term each, and a cluster with
+        # more terms than _PIPE_MAX_SELECT_TERMS is split into several processes.
+        processes: list[list[list[int]]] = []
+        for cluster in clusters:
+            runs = _select_runs(cluster)
+            for k in range(0, len(runs), _PIPE_MAX_SELECT_TERMS):
+                processes.append(runs[k : k + _PIPE_MAX_SELECT_TERMS])
+        osh.debug("ffmpeg-pipe sparse: %d frames in %d process(es)", len(wanted), len(processes))
+        for runs in processes:
+            first = runs[0][0]
+            terms = "+".join(_select_term(run, first) for run in runs)
+            frame_count = sum(len(run) for run in runs)
+            # Seek half a frame early so float rounding can never drop the
+            # first wanted frame; ffmpeg's exact seek then starts n=0 on it.
+            yield from _ffmpeg_pipe_frames(
+                video_path,
+                start_s=max(0.0, (first - 0.5) / frame_rate),
+                end_s=None,
+                select=f"select={terms}",
+                scale_pad=scale_pad,
+                max_frames=frame_count,
+                width=width,
+                height=height,
+                hwaccel=hwaccel,
+                http_headers=http_headers,
+                pix_fmt=pix_fmt,
+                decoder_args=decoder_args,
+                ring=ring,
+            )
+        return
+
+    yield from _ffmpeg_pipe_frames(
+        video_path,
+        start_s=start_index / frame_rate,
+        end_s=(end_index + 1) / frame_rate,
+        # Sample every Nth frame after the seek.
+        select=f"select=not(mod(n\\,{frame_step}))" if frame_step > 1 else None,
+        scale_pad=scale_pad,
+        max_frames=None,
+        width=width,
+        height=height,
+        hwaccel=hwaccel,
+        http_headers=http_headers,
+        pix_fmt=pix_fmt,
+        decoder_args=decoder_args,
+        ring=ring,
+    )
+
+
+# Most select-expression terms one ffmpeg-pipe process gets; a sparse cluster
+# needing more is split into several processes. Override with
+# VIDEO_HELPER_PIPE_MAX_SELECT_TERMS.
+_PIPE_MAX_SELECT_TERMS: int = _env_number("VIDEO_HELPER_PIPE_MAX_SELECT_TERMS", 256)
+
+
+def _select_runs(indices: Sequence[int]) -> list[list[int]]:
+    """Group sorted frame indices into runs of constant stride.
+
+    Parameters
+    ----------
+    indices : Sequence[int]
+        Sorted, de-duplicated frame indices.
+
+    Returns
+    -------
+    list[list[int]]
+        Consecutive runs covering ``indices`` in order; a run of one or two
+        indices has no stride worth a range term.
+    """
+    runs: list[list[int]] = []
+    i = 0
+    while i < len(indices):
+        j = i + 1
+        if j < len(indices):
+            stride = indices[j] - indices[i]
+            while j + 1 < len(indices) and indices[j + 1] - indices[j] == stride:
+                j += 1
+            if j - i + 1 >= 3:
+                runs.append(list(indices[i : j + 1]))
+                i = j + 1
+                continue
+        runs.append([indices[i]])
+        i += 1
+    return runs
+
+
+def _select_term(run: Sequence[int], first: int) -> str:
+    """Format one run of :func:`_select_runs` as an ffmpeg ``select`` term.
+
+    Parameters
+    ----------
+    run : Sequence[int]
+        Frame indices of constant stride.
+    first : int
+        Index of the process's first frame (its ``n=0`` after the seek).
+
+    Returns
+    -------
+    str
+        ``eq(n,k)`` for a single frame, ``between(n,a,b)`` for a contiguous
+        run, ``between(n,a,b)*not(mod(n-a,s))`` for a strided one — commas
+        escaped for the filter graph.
+    """
+    a, b = run[0] - first, run[-1] - first
+    if len(run) == 1:
+        return f"eq(n\\,{a})"
+    stride = run[1] - run[0]
+    term = f"between(n\\,{a}\\,{b})"
+    return term if stride == 1 else f"{term}*not(mod(n-{a}\\,{stride}))"
+
+
+def _frame_ring(size: int, shape: tuple[int, ...]) -> Iterator[np.ndarray]:
+    """Return an endless cycle over ``size`` preallocated uint8 frame buffers.
+
+    Parameters
+    ----------
+    size : int
+        Number of buffers.
+    shape : tuple[int, ...]
+        Frame shape.
+
+    Returns
+    -------
+    Iterator[numpy.ndarray]
+        ``next()`` hands out the buffers round-robin; a buffer comes back
+        after ``size`` calls.
+    """
+    return itertools.cycle([np.empty(shape, dtype=np.uint8) for _ in range(size)])
+
+
+def _readinto_exact(stream: io.BufferedReader, buf: np.ndarray) -> bool:
+    """Fill ``buf`` from ``stream``; False on EOF before it is full.
+
+    Parameters
+    ----------
+    stream : io.BufferedReader
+        Pipe to read from.
+    buf : numpy.ndarray
+        C-contiguous destination buffer.
+
+    Returns
+    -------
+    bool
+        True when every byte of ``buf`` was read.
+    """
+    view = memoryview(buf).cast("B")
+    filled = 0
+    while filled < len(view):
+        n = stream.readinto(view[filled:])
+        if not n:
+            return False
+        filled += n
+    return True
+
+
+def _ffmpeg_pipe_frames(
+    video_path: str,
+    start_s: float,
+    end_s: float | None,
+    select: str | None,
+    scale_pad: str | None,
+    max_frames: int | None,
+    width: int,
+    height: int,
+    hwaccel: str | None,
+    http_headers: dict | None,
+    pix_fmt: str = "bgr24",
+    decoder_args: Sequence[str] = (),
+    ring: Iterator[np.ndarray] | None = None,
+    keyframes_only: bool = False,
+) -> Iterator[np.ndarray]:
+    """Run one ffmpeg decode subprocess and yield its raw frames.
+
+    Parameters
+    ----------
+    video_path : str
+        Input path or URL.
+    start_s : float
+        Input seek (``-ss`` before ``-i``), in seconds.
+    end_s : float or None
+        Input stop (``-to``), or ``None`` to let ``max_frames`` / EOF stop it.
+    select : str or None
+        Frame-selection filter; combined with ``-vsync vfr`` so dropped
+        frames are not duplicated back in.
+    scale_pad : str or None
+        ``scale`` (+ ``pad``) filters run after the selection.
+    max_frames : int or None
+        ``-frames:v`` cap — ffmpeg exits as soon as it has produced them.
+    width, height : int
+        Output frame size, to split the pipe into frames.
+    hwaccel : str or None
+        ``-hwaccel`` value.
+    http_headers : dict or None
+        HTTP headers for URL inputs.
+    pix_fmt : str, optional
+        Raw output format: ``"bgr24"`` (default) or ``"gray"``.
+    decoder_args : Sequence[str], optional
+        Extra input options placed before ``-i`` (decoder threading).
+    ring : Iterator[numpy.ndarray] or None, optional
+        Buffers to read the frames into (reused, see :func:`_frame_ring`);
+        ``None`` reads each frame into a fresh array.
+    keyframes_only : bool, optional
+        Decode keyframes only (``-skip_frame nokey``), with passthrough
+        timestamps so the raw muxer does not duplicate frames into the gaps.
+        Each frame then comes with its source presentation time, read from
+        a ``showinfo`` filter on stderr.
+
+    Yields
+    ------
+    numpy.ndarray or tuple[float, numpy.ndarray]
+        ``(height, width, 3)`` BGR or ``(height, width)`` gray uint8 frames;
+        ``(time, frame)`` pairs with ``keyframes_only``.
+    """
+    # showinfo logs at info level; everything else stays quiet (-nostats).
+    loglevel = "info" if keyframes_only else "error"
+    cmd = ["ffmpeg", "-hide_banner", "-nostats", "-loglevel", loglevel, "-nostdin"]
+    if hwaccel:
+        cmd += ["-hwaccel", hwaccel]
+    headers_str = _join_http_headers(http_headers)
+    if headers_str:
+        cmd += ["-headers", headers_str]
+    cmd += ["-ss", f"{start_s:.6f}"]
+    if end_s is not None:
+        cmd += ["-to", f"{end_s:.6f}"]
+    cmd += list(decoder_args)
+    if keyframes_only:
+        # -copyts keeps source timestamps, so showinfo reports the stream's
+        # own presentation times rather than times since the seek point.
+        cmd += ["-skip_frame", "nokey", "-copyts"]
+    cmd += ["-i", video_path]
+    filters = [f for f in ("showinfo" if keyframes_only else None, select, scale_pad) if f]
+    if filters:
+        cmd += ["-vf", ",".join(filters)]
+    if select:
+        cmd += ["-vsync", "vfr"]
+    elif keyframes_only:
+        cmd += ["-vsync", "passthrough"]
+    if max_frames is not None:
+        cmd += ["-frames:v", str(max_frames)]
+    cmd += ["-f", "rawvideo", "-pix_fmt", pix_fmt, "-"]
+
+    shape = (height, width) if pix_fmt == "gray" else (height, width, 3)
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    times: queue.Queue[float | None] | None = None
+    log: list[str] = []
+    if keyframes_only:
+        times = queue.Queue()
+        # stderr must be drained while stdout is read (a full stderr pipe
+        # would stall ffmpeg); showinfo logs each frame before it is written.
+        drain = threading.Thread(
+            target=_drain_showinfo, args=(proc.stderr, times, log), daemon=True
+        )
+        drain.start()
+    eof = False
+    try:
+        while True:
+            # readinto the final array: no intermediate bytes object and no
+            # extra full-frame copy.
+            buf = next(ring) if ring is not None else np.empty(shape, dtype=np.uint8)
+            if not _readinto_exact(proc.stdout, buf):
+                eof = True
+                break
+            if times is None:
+                yield buf
+                continue
+            t = times.get()
+            if t is None:
+                raise RuntimeError(f"ffmpeg showinfo reported no time for a frame of {video_path}")
+            yield t, buf
+    finally:
+        if proc.poll() is None:
+            if not eof:
+                # Stopped early: close our end first, since an ffmpeg
+                # blocked writing a full pipe only notices SIGTERM once the
+                # write fails (EPIPE).
+                proc.stdout.close()
+            proc.terminate()
+            try:
+                proc.wait(timeout=2.0)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+        # Drain stderr for diagnostics.
+        if times is not None:
+            drain.join()
+            err = "\n".join(log).strip()
+        else:
+            err = proc.stderr.read().decode("utf-8", errors="replace").strip()
+        # A consumer that stopped early broke the pipe on purpose.
+        if err and eof and proc.returncode not in (0, None):
+            osh.warning("ffmpeg stderr: %s", err)
+
+
+# One frame line of the showinfo filter: "... n:   3 pts:  45056 pts_time:2.933 ...".
+_SHOWINFO_RE = re.compile(rb"\bn:\s*\d+\s+pts:\s*-?\d+\s+pts_time:(-?[\d.]+)")
+
+
+def _drain_showinfo(stream: io.BufferedReader, times: queue.Queue, log: list[str]) -> None:
+    """Read ffmpeg's stderr to EOF, queueing showinfo frame times.
+
+    Parameters
+    ----------
+    stream : io.BufferedReader
+        The process's stderr.
+    times : queue.Queue
+        Receives each frame's ``pts_time`` in seconds, then ``None`` at EOF.
+    log : list[str]
+        Receives every other line, for diagnostics.
+    """
+    for line in stream:
+        m = _SHOWINFO_RE.search(line)
+        if m is not None:
+            times.put(float(m.group(1)))
+        elif b"Parsed_showinfo" not in line:
+            log.append(line.decode("utf-8", errors="replace").rstrip())
+    times.put(None)
+
+
+# ──────────────────────────────────────────────────────────────────────────
+#  Parallel decode — one long sequential range split into keyframe-aligned
+#  segments, decoded in a process pool and re-emitted in order.
+#
+#  A single decoder instance is the ceiling for a full pass over a long
+#  file even with frame threading. Segments that start on a keyframe are
+#  independent (no reference crosses a closed GOP boundary in practice),
+#  so N processes each seek to their segment's keyframe and decode it
+#  alone. The parent keeps exactly ``parallel`` segments in flight and
+#  yields them strictly in order: at most ``parallel + 1`` decoded
+#  segments are alive at once (the bounded reorder buffer).
+#
+#  Frames travel through ``parallel + 1`` reused shared-memory slots, not
+#  through the pool's result pipe: pickling 6 MB 1080p frames through a
+#  pipe, or faulting in fresh pages for every segment, costs more than
+#  decoding them.
+# ──────────────────────────────────────────────────────────────────────────
+
+# Wanted frames per parallel segment (before rounding up to the next
+# keyframe). Larger segments amortize the per-segment seek and pickling;
+# smaller ones bound memory (each in-flight segment is held decoded).
+_PARALLEL_SEGMENT_FRAMES = _env_number("VIDEO_HELPER_PARALLEL_SEGMENT_FRAMES", 32)
+
+
+def _plan_parallel_segments(
+    start_index: int,
+    end_index: int,
+    frame_step: int,
+    keyframe_indices: np.ndarray | None = None,
+    segment_frames: int | None = None,
+) -> list[tuple[int, int]]:
+    """Split a stepped frame range into keyframe-aligned segments.
+
+    Parameters
+    ----------
+    start_index, end_index : int
+        Inclusive frame range.
+    frame_step : int
+        Keep every Nth frame from ``start_index``.
+    keyframe_indices : numpy.ndarray, optional
+        Sorted keyframe frame indices (from a :class:`PacketIndex`, or
+        :func:`_ffprobe_keyframe_indices`). Each segment then ends right
+        before a keyframe, so the next one seeks exactly there and decodes
+        nothing twice. Without it (URLs) segments are cut every
+        ``segment_frames`` wanted frames.
+    segment_frames : int, optional
+        Target wanted frames per segment (default
+        ``VIDEO_HELPER_PARALLEL_SEGMENT_FRAMES``, 32).
+
+    Returns
+    -------
+    list[tuple[int, int]]
+        ``(first, last)`` inclusive pairs, both on the ``frame_step`` grid
+        of ``start_index``; concatenated, they are exactly the range.
+
+    Examples
+    --------
+    >>> _plan_parallel_segments(0, 99, 1, np.array([0, 30, 60, 90]), segment_frames=20)
+    [(0, 29), (30, 59), (60, 89), (90, 99)]
+    """
+    segment_frames = max(1, segment_frames or _PARALLEL_SEGMENT_FRAMES)
+    segments: list[tuple[int, int]] = []
+    first = start_index
+    while first <= end_index:
+        boundary = first + segment_frames * frame_step
+        if keyframe_indices is not None:
+            # Round the cut up to the next keyframe: the following segment
+            # then starts decoding exactly on it.
+            k = int(np.searchsorted(keyframe_indices, boundary))
+            boundary = int(keyframe_indices[k]) if k < len(keyframe_indices) else end_index + 1
+        last = min(end_index, boundary - 1)
+        last = first + ((last - first) // frame_step) * frame_step
+        segments.append((first, last))
+        first = last + frame_step
+    return segments
+
+
+# Keyframe times (seconds, float64) listed by _ffprobe_keyframe_indices,
+# keyed like the probe cache and persisted in the catalog as kind
+# "keyframes", so the packet listing runs once per file, not per call.
+_KEYFRAME_TIMES_CACHE: OrderedDict[tuple[str, int, int], np.ndarray] = OrderedDict()
+_KEYFRAME_TIMES_CACHE_LOCK = threading.Lock()
+
+
+def _ffprobe_keyframe_indices(video_path: str, frame_rate: float) -> np.ndarray | None:
+    """List a local file's keyframe positions from ffprobe's packet list.
+
+    The segment planner's fallback when no packet index is at hand (no
+    PyAV, or ``packet_index=False``): a demux-only pass (no decode) that
+    reads each packet's flags, far cheaper than re-decoding up to a GOP at
+    every blind segment cut. The listed times are cached in-process and in
+    the persistent catalog (when enabled), like the packet index.
+
+    Parameters
+    ----------
+    video_path : str
+        Local path (URLs are not probed: a full demux there is network I/O).
+    frame_rate : float
+        Source frame rate; keyframe times map to ``round(time * frame_rate)``,
+        the numbering the grid-based backends use.
+
+    Returns
+    -------
+    numpy.ndarray or None
+        Sorted, unique keyframe frame indices, or ``None`` for URLs or when
+        ffprobe fails or lists no keyframe.
+    """
+    if _is_url(video_path) or frame_rate <= 0:
+        return None
+    key = _probe_cache_key(video_path)
+    if key is None:
+        return None
+    times: np.ndarray | None = None
+    with _KEYFRAME_TIMES_CACHE_LOCK:
+        if key in _KEYFRAME_TIMES_CACHE:
+            _KEYFRAME_TIMES_CACHE.move_to_end(key)
+            times = _KEYFRAME_TIMES_CACHE[key]
+    if times is None:
+        catalog = get_catalog()
+        raw = catalog.get(video_path, "keyframes") if catalog is not None else None
+        if raw is not None:
+            try:
+                times = np.frombuffer(raw, dtype=np.float64).copy()
+            except ValueError as exc:
+                osh.warning(f"Ignoring unreadable catalog keyframes of {video_path}: {exc}")
+                catalog.invalidate(video_path)
+        if times is None:
+            try:
+                packets = ffmpeg.probe(
+                    video_path, select_streams="v:0", show_entries="packet=pts_time,flags"
+                ).get("packets", [])
+            except ffmpeg.Error:
+                return None
+            times = np.array(
+                [
+                    float(p["pts_time"])
+                    for p in packets
+                    if p.get("flags", "").startswith("K") and p.get("pts_time") not in (None, "N/A")
+                ],
+                dtype=np.float64,
+            )
+            if catalog is not None:
+                catalog.put(video_path, "keyframes", times.tobytes())
+        if _PROBE_CACHE_SIZE > 0:
+            with _KEYFRAME_TIMES_CACHE_LOCK:
+                _KEYFRAME_TIMES_CACHE[key] = times
+                while len(_KEYFRAME_TIMES_CACHE) > _PROBE_CACHE_SIZE:
+                    _KEYFRAME_TIMES_CACHE.popitem(last=False)
+    if not len(times):
+        return None
+    return np.unique(np.round(times * frame_rate).astype(np.int64))
+
+
+# Shared-memory slots attached by this (worker) process, by name. Slots
+# live for one parallel call and are reused across its segments, so each
+# worker maps each slot once instead of faulting in fresh pages per segment.
+_ATTACHED_SLOTS: dict[str, shared_memory.SharedMemory] = {}
+
+
+def _decode_segment(
+    video_path: str,
+    backend: str,
+    first: int,
+    last: int,
+    frame_step: int,
+    frame_rate: float,
+    width: int,
+    height: int,
+    hwaccel: str | None,
+    http_headers: dict | None,
+    use_packet_index: bool,
+    output_width: int | None,
+    output_height: int | None,
+    pad_color_bgr: tuple[int, int, int],
+    color: str,
+    slot: str,
+    slot_bytes: int,
+    decode_threads: int | None = None,
+    thread_type: str | None = None,
+    quality: str = "default",
+) -> tuple[str, list[tuple[int, tuple[int, ...]]], bool]:
+    """Decode one parallel segment in a worker process, into a shared-memory slot.
+
+    Top-level (not a closure) so a process pool can pickle it. The packet
+    index, when used, is looked up in the worker (inherited through fork,
+    or rebuilt once per spawned worker) rather than pickled per task.
+
+    Parameters
+    ----------
+    video_path : str
+        Input path or URL.
+    backend : str
+        ``"pyav"`` or ``"ffmpeg-pipe"``.
+    first, last : int
+        Inclusive segment range, on the ``frame_step`` grid.
+    frame_step : int
+        Keep every Nth frame from ``first``.
+    frame_rate : float
+        Source frame rate.
+    width, height : int
+        Source dimensions (ffmpeg-pipe only).
+    hwaccel : str or None
+        Resolved hwaccel.
+    http_headers : dict or None
+        HTTP headers for URL inputs.
+    use_packet_index : bool
+        Number frames through the packet index (PyAV only).
+    output_width, output_height : int or None
+        In-decoder scale-fit-and-pad target.
+    pad_color_bgr : tuple[int, int, int]
+        Pad color.
+    color : str
+        ``"bgr"`` or ``"gray"``.
+    slot : str
+        Name of the parent's shared-memory slot to write into.
+    slot_bytes : int
+        Slot capacity.
+    decode_threads, thread_type : int or str or None
+        Per-worker decoder threading (see :func:`extract_frames`).
+    quality : str, optional
+        ``"default"`` or ``"preview"`` (see :func:`extract_frames`).
+
+    Returns
+    -------
+    tuple[str, list[tuple[int, tuple[int, ...]]], bool]
+        ``(block_name, [(offset, shape), …], private)``: where each frame
+        sits, in order. ``private`` is True when the frames did not fit the
+        slot (a frame size other than planned) and went to a block of their
+        own, which the reader must unlink.
+    """
+    if backend == "pyav":
+        pkt_index = (
+            video_packet_index(video_path, http_headers=http_headers) if use_packet_index else None
+        )
+        frames = _extract_via_pyav(
+            video_path,
+            first,
+            last,
+            frame_step,
+            None,
+            frame_rate,
+            hwaccel,
+            http_headers=http_headers,
+            packet_index=pkt_index,
+            output_width=output_width,
+            output_height=output_height,
+            pad_color_bgr=pad_color_bgr,
+            color=color,
+            decode_threads=decode_threads,
+            thread_type=thread_type,
+            quality=quality,
+        )
+    else:
+        frames = _extract_via_ffmpeg_pipe(
+            video_path,
+            first,
+            last,
+            frame_step,
+            frame_rate,
+            width,
+            height,
+            hwaccel,
+            http_headers=http_headers,
+            output_width=output_width,
+            output_height=output_height,
+            pad_color_bgr=pad_color_bgr,
+            color=color,
+            decode_threads=decode_threads,
+            thread_type=thread_type,
+            quality=quality,
+        )
+    if slot not in _ATTACHED_SLOTS:
+        _ATTACHED_SLOTS[slot] = shared_memory.SharedMemory(name=slot)
+    buf = _ATTACHED_SLOTS[slot].buf
+    layout: list[tuple[int, tuple[int, ...]]] = []
+    overflow: list[np.ndarray] = []
+    offset = 0
+    for frame in frames:
+        # Written as decoded: the segment is never held twice in memory.
+        if not overflow and offset + frame.nbytes <= slot_bytes:
+            np.ndarray(frame.shape, dtype=np.uint8, buffer=buf, offset=offset)[...] = frame
+            layout.append((offset, frame.shape))
+            offset += frame.nbytes
+        else:
+            overflow.append(frame)
+    if not overflow:
+        return slot, layout, False
+    total = offset + sum(f.nbytes for f in overflow)
+    private = shared_memory.SharedMemory(create=True, size=total)
+    private.buf[:offset] = buf[:offset]
+    for frame in overflow:
+        np.ndarray(frame.shape, dtype=np.uint8, buffer=private.buf, offset=offset)[...] = frame
+        layout.append((offset, frame.shape))
+        offset += frame.nbytes
+    private.close()
+    return private.name, layout, True
+
+
+def _release_segment(fut: Future) -> None:
+    """Done-callback unlinking the private block of a segment nobody will read.
+
+    Parameters
+    ----------
+    fut : concurrent.futures.Future
+        A :func:`_decode_segment` future.
+    """
+    if fut.cancelled() or fut.exception() is not None:
+        return
+    name, _, private = fut.result()
+    if private:
+        block = shared_memory.SharedMemory(name=name)
+        block.close()
+        block.unlink()
+
+
+def _extract_parallel(
+    segments: list[tuple[int, int]],
+    parallel: int,
+    frame_bytes: int,
+    **segment_kwargs: object,
+) -> Iterator[np.ndarray]:
+    """Decode ``segments`` in a process pool and yield their frames in order.
+
+    Parameters
+    ----------
+    segments : list[tuple[int, int]]
+        Output of :func:`_plan_parallel_segments`.
+    parallel : int
+        Worker processes, and segments in flight.
+    frame_bytes : int
+        Expected bytes per output frame, to size the shared-memory slots.
+    **segment_kwargs
+        Remaining :func:`_decode_segment` arguments.
+
+    Yields
+    ------
+    numpy.ndarray
+        Frames in presentation order, identical to a sequential decode.
+    """
+    if not segments:
+        return
+    step = segment_kwargs["frame_step"]
+    slot_bytes = frame_bytes * max(len(range(a, b + 1, step)) for a, b in segments)
+    # One slot per in-flight segment plus the one being read.
+    slots = [
+        shared_memory.SharedMemory(create=True, size=slot_bytes)
+        for _ in range(min(parallel + 1, len(segments)))
+    ]
+    by_name = {block.name: block for block in slots}
+    free = [block.name for block in slots]
+    pool = ProcessPoolExecutor(max_workers=parallel)
+    pending: deque[tuple[str, Future]] = deque()
+    seg_iter = iter(segments)
+
+    def _submit_next() -> None:
+        """Queue the next segment into a free slot, if any."""
+        seg = next(seg_iter, None)
+        if seg is not None:
+            slot = free.pop()
+            fut = pool.submit(
+                _decode_segment,
+                first=seg[0],
+                last=seg[1],
+                slot=slot,
+                slot_bytes=slot_bytes,
+                **segment_kwargs,
+            )
+            pending.append((slot, fut))
+
+    try:
+        for _ in range(parallel):
+            _submit_next()
+        while pending:
+            # The head is the next segment in order; later ones completing
+            # first just wait in `pending` (the reorder buffer).
+            slot, fut = pending.popleft()
+            name, layout, private = fut.result()
+            # Refill before yielding, so a worker moves on to the next
+            # segment while the caller consumes this one.
+            _submit_next()
+            block = shared_memory.SharedMemory(name=name) if private else by_name[name]
+            try:
+                for offset, shape in layout:
+                    # Copy out: the slot is overwritten by a later segment.
+                    yield np.ndarray(shape, dtype=np.uint8, buffer=block.buf, offset=offset).copy()
+            finally:
+                if private:
+                    block.close()
+                    block.unlink()
+            free.append(slot)
     finally:
-        container.close()
+        # An abandoned generator must not wait for segments nobody will read
+        # (their private blocks, if any, are freed when they finish).
+        for _, fut in pending:
+            fut.add_done_callback(_release_segment)
+        pool.shutdown(wait=False, cancel_futures=True)
+        for block in slots:
+            block.close()
+            block.unlink()
 
 
-def _extract_via_ffmpeg_pipe(
-    video_path: str,
-    start_index: int,
-    end_index: int,
-    frame_step: int,
-    frame_rate: float,
-    width: int,
-    height: int,
-    hwaccel: str | None,
-    http_headers: dict | None = None,
-) -> Iterator[np.ndarray]:
-    """ffmpeg subprocess with -ss/-to true seek and raw bgr24 over a pipe.
+# ──────────────────────────────────────────────────────────────────────────
+#  Read-ahead — decode on a producer thread, up to N frames ahead of the
+#  consumer. PyAV and ffmpeg-pipe otherwise decode inside the consumer's
+#  next(), so decode and the caller's model never overlap. libav decoding,
+#  pipe reads and cv2 all release the GIL, so the overlap is real.
+# ──────────────────────────────────────────────────────────────────────────
+
+# Seconds a blocked producer waits on a full queue before re-checking
+# whether the consumer went away.
+_PREFETCH_POLL_S = 0.1
+
+
+def _prefetch(src: Iterator[np.ndarray], depth: int) -> Iterator[np.ndarray]:
+    """Run ``src`` on a producer thread and yield its items through a bounded queue.
 
-    Sequential only (no sparse). Useful when PyAV is unavailable but
-    ffmpeg is. Hwaccel is honored when supported by the local build.
-    HTTP headers (``http_headers``) are passed via ``-headers`` and
-    placed before ``-i`` so they reach the input demuxer.
+    The source is advanced *and closed* on the producer thread only (a
+    generator cannot be closed from another thread while it runs), so
+    backend cleanup — container close, ffmpeg termination — still runs.
+    Closing this generator early stops the producer after at most the frame
+    it is decoding; an exception raised by the source is re-raised here, in
+    the consumer, after the frames decoded before it.
+
+    Parameters
+    ----------
+    src : Iterator[numpy.ndarray]
+        Upstream frames.
+    depth : int
+        Queue capacity: frames decoded ahead of the consumer.
+
+    Yields
+    ------
+    numpy.ndarray
+        The items of ``src``, in order.
     """
-    start_s = start_index / frame_rate
-    end_s = (end_index + 1) / frame_rate
-    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin"]
-    if hwaccel:
-        cmd += ["-hwaccel", hwaccel]
-    headers_str = _join_http_headers(http_headers)
-    if headers_str:
-        cmd += ["-headers", headers_str]
-    cmd += ["-ss", f"{start_s:.6f}", "-to", f"{end_s:.6f}", "-i", video_path]
-    if frame_step > 1:
-        # Sample every Nth frame after the seek.
-        cmd += ["-vf", f"select=not(mod(n\\,{frame_step}))", "-vsync", "vfr"]
-    cmd += ["-f", "rawvideo", "-pix_fmt", "bgr24", "-"]
+    q: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
 
-    frame_size = width * height * 3
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    def _put(item: object) -> bool:
+        """Block until ``item`` is queued; False when the consumer left."""
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=_PREFETCH_POLL_S)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce() -> None:
+        """Producer body: drain ``src`` into the queue, then an end marker."""
+        try:
+            for item in src:
+                if not _put((item, None)):
+                    return
+            _put((done, None))
+        except BaseException as exc:  # re-raised in the consumer
+            _put((done, exc))
+        finally:
+            close = getattr(src, "close", None)
+            if close is not None:
+                close()
+
+    producer = threading.Thread(target=_produce, name="video-helper-prefetch", daemon=True)
+    producer.start()
     try:
         while True:
-            raw = proc.stdout.read(frame_size)
-            if not raw or len(raw) < frame_size:
-                break
-            yield np.frombuffer(raw, dtype=np.uint8).reshape((height, width, 3)).copy()
+            item, exc = q.get()
+            if item is done:
+                if exc is not None:
+                    raise exc
+                return
+            yield item
     finally:
-        if proc.poll() is None:
-            proc.terminate()
+        stop.set()
+        # Unblock a producer waiting on a full queue, then wait for it to
+        # close the source.
+        while producer.is_alive():
             try:
-                proc.wait(timeout=2.0)
-            except subprocess.TimeoutExpired:
-                proc.kill()
-                proc.wait()
-        # Drain stderr for diagnostics.
-        err = proc.stderr.read().decode("utf-8", errors="replace").strip()
-        if err and proc.returncode not in (0, None):
-            osh.warning("ffmpeg stderr: %s", err)
+                q.get_nowait()
+            except queue.Empty:
+                producer.join(_PREFETCH_POLL_S)
 
 
 # ──────────────────────────────────────────────────────────────────────────
@@ -1031,7 +3718,7 @@ def _extract_via_ffmpeg_pipe(
 #  Shapes & colorspaces (the cheat sheet)
 #  ----------------------------------------
 #  Notation: N = batch size, T = time (frames in a video), C = channels
-#  (always 3), H = height, W = width.
+#  (3, or 1 with ``color="gray"``), H = height, W = width.
 #
 #  destination="numpy"  (OpenCV-compatible: BGR uint8, channels last)
 #  ┌──────────┬─────────────┬────────────────────────┐
@@ -1071,6 +3758,10 @@ def _extract_via_ffmpeg_pipe(
 #    library is imported lazily — video-helper itself does NOT take torch
 #    or Pillow as a dependency. Install via the ``[torch]`` / ``[pil]``
 #    extras (or bring your own).
+#  - ``color="gray"`` frames are single-channel: numpy drops the channel
+#    axis (``(H, W)`` / ``(N, H, W)``, the OpenCV gray convention), torch
+#    keeps it with C == 1 (``(1, H, W)`` / ``(N, 1, H, W)`` / ``(1, N, H, W)``),
+#    PIL yields ``mode="L"`` images.
 # ──────────────────────────────────────────────────────────────────────────
 
 
@@ -1137,81 +3828,331 @@ def _resolve_torch_device(device: str) -> torch.device:
     return torch.device(device)
 
 
+def _write_rgb_planes(np_frame: np.ndarray, planes: np.ndarray) -> None:
+    """Write one HWC BGR frame into ``(C, H, W)`` RGB planes, in one pass.
+
+    The BGR→RGB swap and the HWC→CHW transpose are fused: ``cv2.split``
+    de-interleaves the channels straight into the destination planes in
+    reverse order (about 4× faster than a strided numpy copy).
+
+    Parameters
+    ----------
+    np_frame : numpy.ndarray
+        ``(H, W, 3)`` BGR, or gray ``(H, W)`` / ``(H, W, 1)``, uint8.
+    planes : numpy.ndarray
+        Destination ``(C, H, W)`` uint8 view whose planes are C-contiguous
+        (e.g. ``batch[i]`` of an NCHW array, ``clip[:, t]`` of a CTHW one).
+    """
+    if np_frame.ndim == 2 or np_frame.shape[2] == 1:
+        np.copyto(planes[0], np_frame.reshape(planes.shape[1:]))
+        return
+    cv2.split(np_frame, [planes[2], planes[1], planes[0]])
+
+
 def _bgr_hwc_to_torch_chw_rgb(np_frame: np.ndarray, device: torch.device) -> torch.Tensor:
     """Convert one numpy HWC BGR uint8 frame to a torch CHW RGB uint8 tensor.
 
     Parameters
     ----------
     np_frame : numpy.ndarray
-        Single frame ``(H, W, 3)``, BGR uint8 (OpenCV convention).
+        Single frame ``(H, W, 3)``, BGR uint8 (OpenCV convention), or gray
+        ``(H, W, 1)``.
     device : torch.device
         Destination device for the resulting tensor.
 
     Returns
     -------
     torch.Tensor
-        Tensor ``(3, H, W)``, RGB uint8, on ``device``.
+        Tensor ``(3, H, W)`` (``(1, H, W)`` for gray), RGB uint8, on ``device``.
     """
     import torch  # lazy
 
-    # flip(-1): reverse the channel axis (BGR → RGB).
-    # permute(2, 0, 1): HWC → CHW.
-    # contiguous(): force a single copy so downstream ops don't trip on a
-    # non-contiguous tensor; the .to(device) call below would do its own
-    # copy anyway, so this is essentially free.
-    return torch.from_numpy(np_frame).flip(-1).permute(2, 0, 1).contiguous().to(device)
+    h, w = np_frame.shape[:2]
+    chw = np.empty((1 if np_frame.ndim == 2 else np_frame.shape[2], h, w), dtype=np.uint8)
+    _write_rgb_planes(np_frame, chw)
+    # from_numpy shares the buffer; .to() is a no-op on CPU, one copy otherwise.
+    return torch.from_numpy(chw).to(device)
+
 
+def _assemble_batches(
+    np_frames: Iterator[np.ndarray],
+    batch_size: int,
+    order: str,
+    staging: int = 0,
+    alloc: Callable[[tuple[int, ...]], np.ndarray] | None = None,
+) -> Iterator[np.ndarray]:
+    """Write frames straight into preallocated batch arrays as they arrive.
 
-def _bgr_to_torch_image_batch(np_batch_nhwc: np.ndarray, device: torch.device) -> torch.Tensor:
-    """Convert numpy NHWC BGR uint8 batch → torch NCHW RGB uint8 on device.
+    One copy per frame, into its final place: no list of pending frames,
+    no ``np.stack`` (which would also break on ``ring_buffer`` frames,
+    overwritten before the batch is complete), and for torch no second
+    flip/permute/contiguous pass.
 
     Parameters
     ----------
-    np_batch_nhwc : numpy.ndarray
-        Batch ``(N, H, W, 3)``, BGR uint8.
-    device : torch.device
-        Destination device.
+    np_frames : Iterator[numpy.ndarray]
+        Upstream frames, all of one shape.
+    batch_size : int
+        Frames per batch.
+    order : str
+        ``"nhwc"`` (numpy: the frames stacked as-is), ``"nchw"`` (RGB
+        planes per frame) or ``"cthw"`` (RGB planes per channel, time
+        second).
+    staging : int, optional
+        ``0`` (default) allocates a fresh array per batch, owned by the
+        caller. ``k > 0`` cycles over ``k`` arrays instead: a yielded batch
+        is overwritten ``k`` batches later, for callers that copy it out
+        (e.g. to a GPU) before then.
+    alloc : Callable[[tuple[int, ...]], numpy.ndarray] or None, optional
+        Allocator of the ``staging`` arrays (e.g. page-locked memory);
+        uninitialized uint8 numpy arrays by default.
 
-    Returns
-    -------
-    torch.Tensor
-        Tensor ``(N, 3, H, W)``, RGB uint8, on ``device``.
+    Yields
+    ------
+    numpy.ndarray
+        Batches in ``order``. The last one may be shorter (a contiguous
+        copy for ``"cthw"``, a view otherwise).
     """
-    import torch
+    buffers: Iterator[np.ndarray] | None = None
+    out: np.ndarray | None = None
+    n = 0
+    for frame in np_frames:
+        if out is None:
+            h, w = frame.shape[:2]
+            c = 1 if frame.ndim == 2 else frame.shape[2]
+            shape = {
+                "nhwc": (batch_size, *frame.shape),
+                "nchw": (batch_size, c, h, w),
+                "cthw": (c, batch_size, h, w),
+            }[order]
+            if buffers is None and staging:
+                buffers = (
+                    itertools.cycle([alloc(shape) for _ in range(staging)])
+                    if alloc is not None
+                    else _frame_ring(staging, shape)
+                )
+            out = next(buffers) if buffers is not None else np.empty(shape, dtype=np.uint8)
+        if order == "nhwc":
+            out[n] = frame
+        elif order == "nchw":
+            _write_rgb_planes(frame, out[n])
+        else:
+            _write_rgb_planes(frame, out[:, n])
+        n += 1
+        if n == batch_size:
+            yield out
+            out, n = None, 0
+    if n:
+        yield np.ascontiguousarray(out[:, :n]) if order == "cthw" else out[:n]
 
-    return (
-        torch.from_numpy(np_batch_nhwc)
-        .flip(-1)  # NHWC BGR → NHWC RGB
-        .permute(0, 3, 1, 2)  # NHWC → NCHW
-        .contiguous()
-        .to(device)
-    )
 
+@dataclass
+class TransferStats:
+    """
+    Running counters of the host→device transfers of ``destination="torch"``.
+
+    Pass an instance as ``extract_frames(transfer_stats=...)``; it is updated
+    as batches are shipped, so it can be read mid-iteration. Nothing is
+    counted for ``device="cpu"`` (no transfer happens).
+
+    Attributes
+    ----------
+    batches : int
+        Tensors copied to the device.
+    bytes_transferred : int
+        Host bytes copied to the device.
+    stall_seconds : float
+        Time the consumer spent blocked on transfers: the whole copy when
+        synchronous, only the waits for a free staging buffer with
+        ``pin_memory=True``.
+    """
+
+    batches: int = 0
+    bytes_transferred: int = 0
+    stall_seconds: float = 0.0
+
+
+_PREPROCESS_DTYPES = ("float32", "float16", "bfloat16")
+_PREPROCESS_INTERPOLATIONS = ("bilinear", "bicubic", "nearest", "area")
+
+
+@dataclass(frozen=True)
+class Preprocess:
+    """
+    Model-input preprocessing applied on the torch device, once per yield.
+
+    Pass as ``extract_frames(destination="torch", preprocess=...)`` (or a
+    dict of these fields). The uint8 RGB tensor is converted to ``dtype``,
+    optionally resized, then normalized as ``(x / 255 - mean) / std`` in one
+    fused multiply-add — on the device, over the whole batch, with no
+    per-frame host work.
+
+    Attributes
+    ----------
+    dtype : str
+        ``"float32"`` (default), ``"float16"`` or ``"bfloat16"``.
+    mean, std : tuple[float, ...] or None
+        Per-channel statistics in ``[0, 1]`` units (e.g. ImageNet's
+        ``(0.485, 0.456, 0.406)`` / ``(0.229, 0.224, 0.225)``); one value
+        per channel, or a single value for all. ``None`` means 0 / 1: the
+        output is then just scaled to ``[0, 1]``.
+    size : tuple[int, int] or None
+        ``(height, width)`` to resize to (``torch.nn.functional.interpolate``;
+        no aspect preservation — use ``output_width`` / ``output_height``
+        for a letterbox at decode time).
+    interpolation : str
+        ``"bilinear"`` (default), ``"bicubic"``, ``"nearest"`` or
+        ``"area"``; bilinear / bicubic downscales are antialiased.
+    channels_last : bool
+        Return batched ``layout="image"`` tensors in
+        ``torch.channels_last`` memory format (same NCHW shape, NHWC
+        strides), the layout convolution kernels prefer on GPU.
+    """
+
+    dtype: str = "float32"
+    mean: tuple[float, ...] | None = None
+    std: tuple[float, ...] | None = None
+    size: tuple[int, int] | None = None
+    interpolation: str = "bilinear"
+    channels_last: bool = False
 
-def _bgr_to_torch_video_clip(np_clip_thwc: np.ndarray, device: torch.device) -> torch.Tensor:
-    """Convert numpy THWC BGR uint8 clip → torch CTHW RGB uint8 on device.
+    def __post_init__(self) -> None:
+        """Validate the fields (raises ``ValueError``)."""
+        if self.dtype not in _PREPROCESS_DTYPES:
+            raise ValueError(
+                f"Unknown preprocess dtype {self.dtype!r}; expected one of {_PREPROCESS_DTYPES}"
+            )
+        if self.interpolation not in _PREPROCESS_INTERPOLATIONS:
+            raise ValueError(
+                f"Unknown preprocess interpolation {self.interpolation!r}; "
+                f"expected one of {_PREPROCESS_INTERPOLATIONS}"
+            )
+        for name in ("mean", "std"):
+            value = getattr(self, name)
+            if value is not None:
+                value = (value,) if isinstance(value, (int, float)) else tuple(value)
+                if len(value) not in (1, 3):
+                    raise ValueError(f"preprocess {name} needs 1 or 3 values, got {len(value)}")
+                object.__setattr__(self, name, value)
+        if self.std is not None and any(v == 0 for v in self.std):
+            raise ValueError("preprocess std must be non-zero")
+        if self.size is not None:
+            if len(self.size) != 2 or any(int(v) <= 0 for v in self.size):
+                raise ValueError(f"preprocess size must be (height, width) > 0, got {self.size}")
+            object.__setattr__(self, "size", (int(self.size[0]), int(self.size[1])))
+
+
+def _apply_preprocess(tensor: torch.Tensor, spec: Preprocess, layout: str) -> torch.Tensor:
+    """Run a :class:`Preprocess` spec on one uint8 RGB tensor, on its device.
 
     Parameters
     ----------
-    np_clip_thwc : numpy.ndarray
-        Clip ``(T, H, W, 3)``, BGR uint8.
-    device : torch.device
-        Destination device.
+    tensor : torch.Tensor
+        ``(C, H, W)`` frame, ``(N, C, H, W)`` image batch or ``(C, T, H, W)``
+        clip (``layout="video"``), uint8.
+    spec : Preprocess
+        What to apply.
+    layout : str
+        ``"image"`` or ``"video"`` — tells a 4-D batch from a clip.
 
     Returns
     -------
     torch.Tensor
-        Tensor ``(3, T, H, W)`` (CTHW), RGB uint8, on ``device``.
+        Same layout, ``spec.dtype``, resized / normalized as requested.
     """
     import torch
-
-    return (
-        torch.from_numpy(np_clip_thwc)
-        .flip(-1)  # THWC BGR → THWC RGB
-        .permute(3, 0, 1, 2)  # THWC → CTHW
-        .contiguous()
-        .to(device)
+    import torch.nn.functional as F
+
+    x = tensor.to(getattr(torch, spec.dtype))
+    # Everything below works on (N, C, H, W): a frame gains a batch axis, a
+    # CTHW clip is viewed as T images.
+    if x.ndim == 3:
+        x = x.unsqueeze(0)
+    elif layout == "video":
+        x = x.permute(1, 0, 2, 3)
+    if spec.size is not None and tuple(x.shape[-2:]) != spec.size:
+        antialias = spec.interpolation in ("bilinear", "bicubic")
+        x = F.interpolate(
+            x,
+            size=spec.size,
+            mode=spec.interpolation,
+            antialias=antialias,
+            **({"align_corners": False} if antialias else {}),
+        )
+    channels = x.shape[1]
+    if channels == 1 and max(len(spec.mean or ()), len(spec.std or ())) == 3:
+        raise ValueError("preprocess mean/std have 3 values but the frames are gray (C == 1)")
+    mean = torch.tensor(spec.mean or (0.0,), dtype=torch.float32)
+    std = torch.tensor(spec.std or (1.0,), dtype=torch.float32)
+    # (x / 255 - mean) / std == x * scale + shift: one fused pass.
+    scale = (1.0 / (255.0 * std)).expand(channels)
+    shift = (-mean / std).expand(channels)
+    x = torch.addcmul(
+        shift.to(x.device, x.dtype).view(1, -1, 1, 1),
+        x,
+        scale.to(x.device, x.dtype).view(1, -1, 1, 1),
     )
+    if tensor.ndim == 3:
+        return x.squeeze(0)
+    if layout == "video":
+        return x.permute(1, 0, 2, 3).contiguous()
+    if spec.channels_last:
+        return x.contiguous(memory_format=torch.channels_last)
+    return x
+
+
+class _TransferWindow:
+    """Bound the number of asynchronous host→device copies in flight.
+
+    Each submitted copy carries a completion event (anything with a
+    ``synchronize()`` method, e.g. ``torch.cuda.Event``). Once more than
+    ``depth`` are pending, the oldest is waited for — that is when its
+    staging buffer may be refilled.
+
+    Parameters
+    ----------
+    depth : int
+        Copies allowed in flight.
+    stats : TransferStats or None
+        Counters to update.
+    """
+
+    def __init__(self, depth: int, stats: TransferStats | None) -> None:
+        self.depth = depth
+        self.stats = stats if stats is not None else TransferStats()
+        self._pending: deque = deque()
+
+    def submit(self, nbytes: int, event: object | None = None, blocked_s: float = 0.0) -> None:
+        """Account one copy; wait for the oldest ones beyond ``depth``.
+
+        Parameters
+        ----------
+        nbytes : int
+            Bytes copied.
+        event : object or None, optional
+            Completion event of an asynchronous copy; ``None`` for a copy
+            that already completed.
+        blocked_s : float, optional
+            Seconds the caller already spent blocked in a synchronous copy.
+        """
+        self.stats.batches += 1
+        self.stats.bytes_transferred += nbytes
+        self.stats.stall_seconds += blocked_s
+        if event is not None:
+            self._pending.append(event)
+        while len(self._pending) > self.depth:
+            self._wait(self._pending.popleft())
+
+    def drain(self) -> None:
+        """Wait for every pending copy."""
+        while self._pending:
+            self._wait(self._pending.popleft())
+
+    def _wait(self, event: object) -> None:
+        """Block on ``event``, timing the stall."""
+        t0 = time.perf_counter()
+        event.synchronize()
+        self.stats.stall_seconds += time.perf_counter() - t0
 
 
 def _to_destination(
@@ -1220,6 +4161,10 @@ def _to_destination(
     device: str,
     batch_size: int | None,
     layout: str,
+    pin_memory: bool = False,
+    transfers_in_flight: int = 2,
+    transfer_stats: TransferStats | None = None,
+    preprocess: Preprocess | None = None,
 ) -> Iterator[object]:
     """Convert/batch the upstream numpy-frame iterator into the requested destination.
 
@@ -1228,7 +4173,7 @@ def _to_destination(
     Parameters
     ----------
     np_frames : Iterator[numpy.ndarray]
-        Upstream HWC BGR uint8 frames.
+        Upstream HWC BGR uint8 frames, or ``(H, W)`` gray ones.
     destination : str
         One of ``"numpy"``, ``"torch"``, ``"pil"``.
     device : str
@@ -1237,6 +4182,15 @@ def _to_destination(
         Batch size for stacked yields, or ``None`` for one item at a time.
     layout : str
         ``"image"`` (per-frame / NCHW) or ``"video"`` (clip / CTHW) batching.
+    pin_memory : bool, optional
+        Batched torch on CUDA: stage batches in page-locked host memory and
+        copy them with ``non_blocking=True``. A no-op elsewhere.
+    transfers_in_flight : int, optional
+        Asynchronous copies allowed in flight with ``pin_memory``.
+    transfer_stats : TransferStats or None, optional
+        Counters updated per host→device copy.
+    preprocess : Preprocess or None, optional
+        Applied to every torch yield, on the device, after the transfer.
 
     Yields
     ------
@@ -1267,16 +4221,9 @@ def _to_destination(
             # HWC BGR uint8 — pass-through, no copy.
             yield from np_frames
             return
-        # NHWC == THWC for numpy (only the semantic name differs); we stack
-        # along axis 0 regardless of layout.
-        batch: list = []
-        for frame in np_frames:
-            batch.append(frame)
-            if len(batch) == batch_size:
-                yield np.stack(batch, axis=0)
-                batch = []
-        if batch:
-            yield np.stack(batch, axis=0)
+        # NHWC == THWC for numpy (only the semantic name differs); frames
+        # go along axis 0 regardless of layout.
+        yield from _assemble_batches(np_frames, batch_size, "nhwc")
         return
 
     # ------------ destination="pil" -------------------------------------
@@ -1289,6 +4236,9 @@ def _to_destination(
         from PIL import Image  # lazy
 
         for frame in np_frames:
+            if frame.ndim == 2:
+                yield Image.fromarray(frame)  # gray → mode "L"
+                continue
             # Flip BGR → RGB before handing to PIL (which is RGB-native).
             yield Image.fromarray(frame[:, :, ::-1])
         return
@@ -1300,32 +4250,64 @@ def _to_destination(
             "(or bring your own torch)"
         )
 
+    import torch  # lazy
+
     dev = _resolve_torch_device(device)
+    # Gray frames get a unit channel axis; the BGR→RGB flip below is then a
+    # no-op and the permutes yield C == 1.
+    np_frames = (f[:, :, np.newaxis] if f.ndim == 2 else f for f in np_frames)
 
     if batch_size is None:
         # CHW RGB uint8 per yielded frame. layout is irrelevant here
         # (each yield is a single frame, no time / batch axis).
         for frame in np_frames:
-            yield _bgr_hwc_to_torch_chw_rgb(frame, dev)
+            tensor = _bgr_hwc_to_torch_chw_rgb(frame, dev)
+            yield tensor if preprocess is None else _apply_preprocess(tensor, preprocess, layout)
         return
 
-    # Batched: layout chooses the axis convention.
-    batch = []
-    for frame in np_frames:
-        batch.append(frame)
-        if len(batch) == batch_size:
-            stacked = np.stack(batch, axis=0)  # NHWC == THWC, BGR
-            if layout == "image":
-                yield _bgr_to_torch_image_batch(stacked, dev)  # NCHW RGB
-            else:  # "video"
-                yield _bgr_to_torch_video_clip(stacked, dev)  # CTHW RGB
-            batch = []
-    if batch:
-        stacked = np.stack(batch, axis=0)
-        if layout == "image":
-            yield _bgr_to_torch_image_batch(stacked, dev)
-        else:
-            yield _bgr_to_torch_video_clip(stacked, dev)
+    # Batched: layout chooses the axis convention. Frames are written in
+    # their final RGB, channels-first order as they arrive (one copy each).
+    order = "nchw" if layout == "image" else "cthw"
+    if dev.type == "cpu":
+        # The tensor shares the batch array: each batch needs its own.
+        for batch in _assemble_batches(np_frames, batch_size, order):
+            tensor = torch.from_numpy(batch)
+            yield tensor if preprocess is None else _apply_preprocess(tensor, preprocess, layout)
+        return
+
+    # For a device the host array is only staging. Synchronous copies: two
+    # arrays alternate. Pinned (CUDA only — page-locked memory is what makes
+    # non_blocking copies actually asynchronous): one array per copy in
+    # flight plus the one being filled; the window waits for the oldest copy
+    # before its array is refilled, so decode of the next batch overlaps the
+    # transfer of the previous ones.
+    pinned = pin_memory and dev.type == "cuda"
+    window = _TransferWindow(transfers_in_flight if pinned else 0, transfer_stats)
+    batches = _assemble_batches(
+        np_frames,
+        batch_size,
+        order,
+        staging=transfers_in_flight + 1 if pinned else 2,
+        alloc=(lambda shape: torch.empty(shape, dtype=torch.uint8).pin_memory().numpy())
+        if pinned
+        else None,
+    )
+    try:
+        for batch in batches:
+            if pinned:
+                tensor = torch.from_numpy(batch).to(dev, non_blocking=True)
+                event = torch.cuda.Event()
+                event.record()
+                window.submit(batch.nbytes, event)
+            else:
+                t0 = time.perf_counter()
+                tensor = torch.from_numpy(batch).to(dev)
+                window.submit(batch.nbytes, blocked_s=time.perf_counter() - t0)
+            # uint8 crosses the bus; the float conversion happens on the device.
+            yield tensor if preprocess is None else _apply_preprocess(tensor, preprocess, layout)
+    finally:
+        # Staging arrays must outlive the copies reading them.
+        window.drain()
 
 
 def extract_frames(
@@ -1349,6 +4331,19 @@ def extract_frames(
     device: str = "cpu",
     batch_size: int | None = None,
     layout: str = "image",
+    packet_index: bool | None = None,
+    color: str = "bgr",
+    parallel: int | None = None,
+    decode_threads: int | None = None,
+    thread_type: str | None = None,
+    prefetch: int | None = None,
+    ring_buffer: int | None = None,
+    pin_memory: bool = False,
+    transfers_in_flight: int = 2,
+    transfer_stats: TransferStats | None = None,
+    preprocess: Preprocess | dict | None = None,
+    keyframes_only: bool = False,
+    quality: str = "default",
 ) -> Iterator:
     """
     Extract frames from a video, dispatching to the best available backend.
@@ -1364,12 +4359,14 @@ def extract_frames(
     - ``vidgear`` — OpenCV+VidGear with a producer thread. **Fastest path
       for full sequential decode** up to ~720p on macOS (uses
       AVFoundation under the hood) and the **only backend that supports**
-      ``stabilize=True``. Decodes from t=0 with no real seek.
+      ``stabilize=True``. Seeks once to the window start, then decodes
+      every frame up to the end of the window.
     - ``pyav`` — direct ffmpeg libav bindings. **Best default for
       windowed sequential, sparse reads, and any "torch on GPU"
       destination** thanks to keyframe seek + hwaccel support.
     - ``ffmpeg-pipe`` — ffmpeg subprocess fallback. Useful when PyAV
-      isn't installed. Sequential only; honors ``hwaccel``.
+      isn't installed. Sparse reads run one short ``-ss``-seeked process
+      per cluster of nearby indices; honors ``hwaccel``.
 
     Parameters
     ----------
@@ -1385,6 +4382,9 @@ def extract_frames(
         If True, runs VidGear's software stabilizer. Forces ``backend="vidgear"``.
     frame_step : int, optional
         Sampling stride within the range (every Nth frame). Defaults to 1.
+        On PyAV / ffmpeg-pipe a stride > 1 is served by decode-and-drop,
+        per-sample seeks or keyframe-only decode, whichever the keyframe
+        spacing makes cheapest (:func:`_plan_strided_read`).
     frame_interval : float, optional
         Sampling period in seconds. Overrides ``frame_step`` when given.
     frame_indices : list[int], optional
@@ -1422,9 +4422,11 @@ def extract_frames(
           ratio; the other dimension is derived. No padding.
         - **Neither** set (default) → frame keeps its native dimensions.
 
-        The transform runs in numpy via ``cv2.resize`` + ``cv2.copyMakeBorder``
-        post-decode. Same behavior across all backends (vidgear / pyav /
-        ffmpeg-pipe).
+        PyAV and ffmpeg-pipe run the transform inside the decoder
+        (libswscale during the pixel-format conversion, ``scale`` + ``pad``
+        filters for ffmpeg), so full-resolution frames are never copied to
+        Python; VidGear applies ``cv2.resize`` + ``cv2.copyMakeBorder``
+        post-decode. Output shapes are identical across backends.
     pad_color : str, optional
         Padding color when scale-fit-and-pad applies (i.e. both
         ``output_width`` and ``output_height`` are set, and the source's
@@ -1458,7 +4460,9 @@ def extract_frames(
         one frame at a time. The last batch may be smaller. Strongly
         recommended with ``destination="torch"`` + GPU device: one
         host→device transfer per batch instead of one per frame
-        (typical 5-20× win).
+        (typical 5-20× win). Frames are written into a preallocated batch
+        as they arrive, already in the destination's channel order (one
+        copy per frame; no stacking pass).
     layout : str, optional
         Axis convention for **batched** yields (ignored when
         ``batch_size`` is None and for ``destination="pil"``).
@@ -1479,12 +4483,130 @@ def extract_frames(
         ``"torch"``  ``"video"``    N             ``(3, N, H, W)``   CTHW, RGB uint8 (video clip; T == N)
         ``"pil"``    n/a            **forbidden** ``PIL.Image``      mode=``"RGB"``, size=``(W, H)``
         ============ ============== ============= ===========================================
+    packet_index : bool, optional
+        Use the demux packet index (see :func:`video_packet_index`) to seek
+        straight to the keyframe preceding each request and to number
+        frames by presentation order — exact frame indices, times and
+        frame count on VFR sources, same result as without it on CFR ones.
+        ``True`` uses it (built on first use with one demux pass, then
+        cached); it needs PyAV and selects the PyAV backend (``"auto"``),
+        since the other backends number frames on the ``duration × fps``
+        grid. ``None`` (default) / ``False`` number frames on that grid,
+        whatever index may be cached, so a call always returns the same
+        frames.
+    color : str, optional
+        ``"bgr"`` (default) or ``"gray"``. ``"gray"`` yields single-channel
+        luma frames — ``(H, W)`` uint8 for numpy (the OpenCV gray
+        convention), C == 1 for torch, ``mode="L"`` for PIL. Every backend
+        computes it as the BT.601 luma of the decoded BGR frame
+        (``cv2.COLOR_BGR2GRAY``; ffmpeg-pipe converts inside ffmpeg, so a
+        third of the pipe traffic), hence the same levels, within one,
+        whichever backend decodes -- not the source's Y plane, whose
+        weights vary with the source matrix. Feeds
+        :func:`iter_frame_optical_flow` and other luma-only consumers as-is.
+    parallel : int, optional
+        Decode a sequential range with this many worker processes (PyAV or
+        ffmpeg-pipe; ``backend="auto"`` picks PyAV when installed). The
+        range is split into segments that start on keyframes (through the
+        packet index, built on first use unless ``packet_index=False``;
+        otherwise from an ffprobe packet listing for local files),
+        each segment decodes in its own process, and frames come back in
+        exactly the sequential order. At most ``parallel + 1`` decoded
+        segments (about ``VIDEO_HELPER_PARALLEL_SEGMENT_FRAMES`` frames
+        each, rounded up to a GOP) are held at once. Pays off on long,
+        heavy files (1080p+, HEVC); ``None`` / ``1`` decodes in-process.
+        Not available with ``stabilize``, sparse access or VidGear.
+    decode_threads : int, optional
+        Decoder threads for PyAV (codec context ``thread_count``) and
+        ffmpeg-pipe (``-threads``); ``0`` lets libavcodec pick one per core.
+        ``None`` uses ``VIDEO_HELPER_DECODE_THREADS`` when set, else the
+        libavcodec default. Ignored by VidGear. With ``parallel``, applies
+        to each worker.
+    thread_type : str, optional
+        Decoder threading model: ``"slice"`` (libavcodec's default; low
+        latency, scales only on streams encoded with several slices),
+        ``"frame"`` (decodes several frames at once; the bigger win on
+        long sequential reads at 1080p+, at the cost of a few frames of
+        latency per seek) or ``"auto"`` (both). ``None`` uses
+        ``VIDEO_HELPER_THREAD_TYPE`` when set, else libavcodec's default.
+        Early ``break`` out of a frame-threaded read is safe: the decoder
+        is drained before it is closed. The threading axis of
+        ``scripts/benchmark_extract_frames.py`` measures both per
+        resolution.
+    prefetch : int, optional
+        Decode on a background thread, up to this many frames ahead of the
+        consumer, so decoding overlaps with the caller's own work (model
+        inference, I/O). Applies after the scale-and-pad / color stage and
+        before the destination conversion; any backend (VidGear already
+        reads on a thread of its own, so it gains least). Closing the
+        generator early (``break``) stops the producer cleanly; a decode
+        error is raised to the caller at the frame where it happened.
+        ``None`` / ``0`` decodes inline.
+    ring_buffer : int, optional
+        ffmpeg-pipe only (other backends and ``parallel`` ignore it): read
+        frames into a ring of this many preallocated buffers and yield them
+        as views, with no allocation per frame. **Contract**: a yielded
+        frame stays valid until ``ring_buffer`` more frames have been
+        yielded, after which its memory is overwritten — call ``.copy()``
+        on any frame kept longer. ``prefetch`` frames in flight are added
+        to the ring, so the contract holds with read-ahead too. ``None``
+        (default) yields frames the caller owns (each read straight into a
+        fresh array). Batched and torch / PIL destinations copy anyway.
+    pin_memory : bool, optional
+        Batched ``destination="torch"`` on CUDA: stage each batch in
+        page-locked host memory and copy it with ``non_blocking=True``, so
+        the transfer overlaps decoding of the next batch. The yielded
+        tensors are ordered on the current CUDA stream, as usual. A no-op
+        on CPU / MPS, where transfers stay as they are.
+    transfers_in_flight : int, optional
+        With ``pin_memory``: host→device copies allowed in flight before
+        the consumer waits for the oldest (default 2); each holds one
+        pinned staging batch.
+    transfer_stats : TransferStats, optional
+        Filled while iterating with the number of batches and bytes copied
+        to the device and the time spent waiting on those copies — the
+        figures to size ``transfers_in_flight`` and ``batch_size`` with.
+    preprocess : Preprocess or dict, optional
+        ``destination="torch"`` only: turn each yielded uint8 tensor into a
+        model-ready one on the target device — dtype conversion, optional
+        resize, ``mean`` / ``std`` normalization (fused in one pass), and
+        ``channels_last`` memory format for batched image layouts. Runs
+        once per batch, after the uint8 host→device copy (a quarter of the
+        bytes of float32). A dict is read as :class:`Preprocess` fields.
+    keyframes_only : bool, optional
+        Decode and yield only the keyframes (I-frames) of the range — for
+        thumbnails, census passes and coarse scene scans, an order of
+        magnitude cheaper than a full decode. PyAV sets the decoder's
+        ``skip_frame="NONKEY"``, ffmpeg-pipe passes ``-skip_frame nokey``;
+        ``"auto"`` picks PyAV when installed, else ffmpeg-pipe, and VidGear
+        is rejected. Yields ``(time, frame)`` pairs, ``time`` being the
+        frame's true presentation time in seconds (``(times, batch)`` with a
+        float64 array of times when batched). Cannot be combined with a
+        sampling stride, sparse access, ``stabilize`` or ``parallel``.
+    quality : str, optional
+        ``"default"`` (exact decode) or ``"preview"``: decoder shortcuts for
+        consumers that tolerate slightly degraded frames (face census, shot
+        detection, motion scoring). The decoder skips the in-loop deblocking
+        filter and the inverse DCT of non-reference frames, decodes at a
+        half / quarter / eighth of the size (``lowres``, MPEG-2 / MPEG-4
+        Part 2 / MJPEG only) when ``output_width`` / ``output_height`` ask
+        for no more than that, and scales with fast bilinear. Frame count,
+        indices and shapes are those of ``"default"``; the pixels are not.
+        PyAV and ffmpeg-pipe only (``"auto"`` picks them): VidGear ignores
+        it with a warning.
+
+    Notes
+    -----
+    With a decoded-frame cache active (:func:`video_helper.set_frame_cache`),
+    the PyAV backend serves frames it decoded before from memory and decodes
+    only the rest; other backends bypass the cache.
 
     Yields
     ------
     numpy.ndarray
         Successive frames as ``(H, W, 3)`` BGR uint8 arrays — same
-        convention as OpenCV and the previous VidGear-only implementation.
+        convention as OpenCV and the previous VidGear-only implementation
+        (``(H, W)`` gray with ``color="gray"``).
 
     Examples
     --------
@@ -1512,7 +4634,86 @@ def extract_frames(
     frame_rate = d["frame_rate"]
     width = d["width"]
     height = d["height"]
-    total_frames = int(duration * frame_rate)
+
+    if decode_threads is None:
+        decode_threads = _DEFAULT_DECODE_THREADS
+    if thread_type is None:
+        thread_type = _DEFAULT_THREAD_TYPE
+    if decode_threads is not None and decode_threads < 0:
+        raise ValueError(f"decode_threads must be >= 0, got {decode_threads}")
+    if thread_type is not None and thread_type not in _THREAD_TYPES:
+        raise ValueError(
+            f"Unknown thread_type {thread_type!r}; expected one of {sorted(_THREAD_TYPES)}"
+        )
+    if parallel is not None and parallel < 1:
+        raise ValueError(f"parallel must be >= 1, got {parallel}")
+    if prefetch is not None and prefetch < 0:
+        raise ValueError(f"prefetch must be >= 0, got {prefetch}")
+    if ring_buffer is not None and ring_buffer < 1:
+        raise ValueError(f"ring_buffer must be >= 1, got {ring_buffer}")
+    if transfers_in_flight < 1:
+        raise ValueError(f"transfers_in_flight must be >= 1, got {transfers_in_flight}")
+    if isinstance(preprocess, dict):
+        preprocess = Preprocess(**preprocess)
+    if preprocess is not None:
+        if destination != "torch":
+            raise ValueError("preprocess needs destination='torch'")
+        if preprocess.channels_last and (batch_size is None or layout != "image"):
+            raise ValueError("preprocess channels_last needs batch_size with layout='image'")
+    if keyframes_only:
+        if (
+            stabilize
+            or (parallel is not None and parallel > 1)
+            or frame_indices is not None
+            or frame_times is not None
+            or frame_step != 1
+            or frame_interval is not None
+        ):
+            raise ValueError(
+                "keyframes_only yields every keyframe of a range; it cannot be combined with "
+                "frame_step, frame_interval, frame_indices, frame_times, stabilize or parallel"
+            )
+        if backend == "vidgear":
+            raise ValueError("keyframes_only needs backend='pyav' or 'ffmpeg-pipe', not 'vidgear'")
+        if backend == "auto":
+            backend = "pyav" if _have_pyav() else "ffmpeg-pipe"
+    if quality not in _QUALITIES:
+        raise ValueError(f"Unknown quality {quality!r}; expected one of {_QUALITIES}")
+    if quality == "preview" and backend == "auto" and not stabilize:
+        # VidGear has no decoder options: prefer a backend the shortcuts reach.
+        if _have_pyav():
+            backend = "pyav"
+        elif shutil.which("ffmpeg") is not None:
+            backend = "ffmpeg-pipe"
+    use_parallel = parallel is not None and parallel > 1
+    if use_parallel:
+        if stabilize or frame_indices is not None or frame_times is not None:
+            raise ValueError(
+                "parallel applies to sequential ranges; it cannot be combined with "
+                "stabilize, frame_indices or frame_times"
+            )
+        if backend == "vidgear":
+            raise ValueError("parallel needs backend='pyav' or 'ffmpeg-pipe', not 'vidgear'")
+        if backend == "auto":
+            backend = "pyav" if _have_pyav() else "ffmpeg-pipe"
+
+    # Frames are numbered by presentation rank only when the caller asks for
+    # it, and only PyAV numbers them that way: whether an index happens to be
+    # cached must never change which frames a call returns.
+    pkt_index: PacketIndex | None = None
+    if packet_index:
+        if not _have_pyav():
+            raise ImportError(
+                "packet_index=True requires PyAV. Install with: pip install 'video-helper[pyav]'"
+            )
+        if stabilize or backend in ("vidgear", "ffmpeg-pipe"):
+            raise ValueError(
+                "packet_index=True numbers frames by presentation order, which only the "
+                f"pyav backend does; got backend={backend!r}, stabilize={stabilize}"
+            )
+        backend = "pyav"
+        pkt_index = video_packet_index(video_path, build=True, http_headers=http_headers)
+    total_frames = pkt_index.frame_count if pkt_index is not None else int(duration * frame_rate)
 
     indices, s_idx, e_idx, step, sparse = _resolve_indices(
         duration=duration,
@@ -1525,6 +4726,7 @@ def extract_frames(
         frame_interval=frame_interval,
         frame_indices=frame_indices,
         frame_times=frame_times,
+        packet_index=pkt_index,
     )
 
     # "Full sequential" = start at 0, end at (or past) the last frame,
@@ -1545,17 +4747,67 @@ def extract_frames(
             # the batched torch path makes the offloaded decode worth it.
             hwaccel = "auto"
 
+    # A per-machine backend profile (``video-helper calibrate``), when one
+    # exists, knows which backend wins this call shape here. URLs skip it:
+    # their cost is the network's.
+    calibrated = None
+    if (
+        backend == "auto"
+        and not stabilize
+        and not _is_url(video_path)
+        and load_backend_profile() is not None
+    ):
+        pattern = "sparse" if sparse else "full" if full_sequential else "window"
+        codec = video_metadata(video_path).get("video_codec")
+        calibrated = _profile_winner(height, codec, pattern, _resolve_hwaccel(hwaccel))
+        osh.debug("extract_frames: calibrated backend for %s/%s: %s", codec, pattern, calibrated)
+
     chosen = _choose_backend(
         backend=backend,
         stabilize=stabilize,
         sparse=sparse,
         full_sequential=full_sequential,
+        calibrated=calibrated,
     )
     resolved_hwaccel = _resolve_hwaccel(hwaccel) if chosen in ("pyav", "ffmpeg-pipe") else None
 
+    # Keyframe distance for the seek planners: exact from a packet index,
+    # else estimated from the first packets (local files, PyAV only).
+    seeks_planned = chosen in ("pyav", "ffmpeg-pipe") and not use_parallel
+    gop = (
+        _estimate_gop(video_path)
+        if seeks_planned and pkt_index is None and (sparse or step > 1)
+        else None
+    )
+    # Strided ranges (frame_step > 1) pick decode-and-drop, keyframe-only
+    # decode or per-sample seeks by estimated cost (see _plan_strided_read).
+    strided = "decode"
+    if seeks_planned and not sparse and step > 1:
+        strided, costs = _plan_strided_read(
+            s_idx,
+            min(e_idx, total_frames - 1),
+            step,
+            pkt_index.keyframe_indices if pkt_index is not None else None,
+            gop,
+            seek_cost=_SEEK_COST_FRAMES
+            + (_PIPE_SPAWN_COST_FRAMES if chosen == "ffmpeg-pipe" else 0.0),
+            keyframe_decode=chosen == "pyav",
+        )
+        osh.debug(
+            "extract_frames: strided read (step=%d, gop=%s) -> %s, estimated costs %s",
+            step,
+            "exact" if pkt_index is not None else gop,
+            strided,
+            costs,
+        )
+        if strided == "seek":
+            indices = list(range(s_idx, min(e_idx, total_frames - 1) + 1, step))
+            sparse = True
+
     osh.debug(
         "extract_frames: backend=%s hwaccel=%s sparse=%s full_seq=%s range=[%s,%s] step=%s "
-        "destination=%s device=%s batch_size=%s",
+        "destination=%s device=%s batch_size=%s packet_index=%s color=%s parallel=%s "
+        "decode_threads=%s thread_type=%s prefetch=%s quality=%s",
         chosen,
         resolved_hwaccel,
         sparse,
@@ -1566,9 +4818,76 @@ def extract_frames(
         destination,
         device,
         batch_size,
+        pkt_index is not None,
+        color,
+        parallel,
+        decode_threads,
+        thread_type,
+        prefetch,
+        quality,
     )
 
-    if chosen == "vidgear":
+    # Optional resize + pad — validate early so we fail fast. PyAV and
+    # ffmpeg-pipe run it inside the decoder; VidGear gets the cv2 pass below.
+    resize = output_width is not None or output_height is not None
+    if output_width is not None and output_width <= 0:
+        raise ValueError(f"output_width must be > 0, got {output_width}")
+    if output_height is not None and output_height <= 0:
+        raise ValueError(f"output_height must be > 0, got {output_height}")
+    if color not in _COLORS:
+        raise ValueError(f"Unknown color {color!r}; expected 'bgr' or 'gray'")
+    pad_bgr = _parse_pad_color(pad_color) if resize else (0, 0, 0)
+    if color == "gray":
+        pad_bgr = _gray_pad_color(pad_bgr)
+
+    if use_parallel:
+        if chosen == "pyav" and not _have_pyav():
+            raise ImportError(
+                "backend='pyav' requires PyAV. Install with: pip install 'video-helper[pyav]'"
+            )
+        if chosen == "ffmpeg-pipe" and shutil.which("ffmpeg") is None:
+            raise RuntimeError("backend='ffmpeg-pipe' requires ffmpeg on PATH")
+        # Keyframe boundaries only place the segment cuts (a misplaced cut
+        # costs decode, never frames), so a packet index serves them even
+        # when it does not number the frames.
+        seg_index = pkt_index
+        if seg_index is None and packet_index is not False and _have_pyav():
+            seg_index = video_packet_index(
+                video_path, build=not _is_url(video_path), http_headers=http_headers
+            )
+        keyframes = seg_index.keyframe_indices if seg_index is not None else None
+        if keyframes is None:
+            keyframes = _ffprobe_keyframe_indices(video_path, frame_rate)
+        segments = _plan_parallel_segments(s_idx, e_idx, step, keyframes)
+        osh.debug("extract_frames: %d segments over %d processes", len(segments), parallel)
+        out_w, out_h = width, height
+        if resize:
+            new_w, new_h, top, bottom, left, right = _output_geometry(
+                width, height, output_width, output_height
+            )
+            out_w, out_h = new_w + left + right, new_h + top + bottom
+        np_iter = _extract_parallel(
+            segments,
+            parallel,
+            frame_bytes=out_w * out_h * (1 if color == "gray" else 3),
+            video_path=video_path,
+            backend=chosen,
+            frame_step=step,
+            frame_rate=frame_rate,
+            width=width,
+            height=height,
+            hwaccel=resolved_hwaccel,
+            http_headers=http_headers,
+            use_packet_index=pkt_index is not None and not _is_url(video_path),
+            output_width=output_width,
+            output_height=output_height,
+            pad_color_bgr=pad_bgr,
+            color=color,
+            decode_threads=decode_threads,
+            thread_type=thread_type,
+            quality=quality,
+        )
+    elif chosen == "vidgear":
         if http_headers:
             osh.warning(
                 "vidgear backend ignores http_headers — OpenCV doesn't surface "
@@ -1576,29 +4895,90 @@ def extract_frames(
                 "age-gated content from youtube-helper) will likely 403. Use "
                 "backend='pyav' or 'ffmpeg-pipe' for those."
             )
-        np_iter = _extract_via_vidgear(video_path, s_idx, e_idx, step, stabilize)
-    elif chosen == "pyav":
-        if not _have_pyav():
-            raise ImportError(
-                "backend='pyav' requires PyAV. Install with: pip install 'video-helper[pyav]'"
+        if quality == "preview":
+            osh.warning(
+                "vidgear backend ignores quality='preview' — OpenCV exposes no decoder "
+                "options. Use backend='pyav' or 'ffmpeg-pipe' for the faster decode."
             )
-        np_iter = _extract_via_pyav(
+        np_iter = _extract_via_vidgear(
             video_path,
             s_idx,
             e_idx,
             step,
-            indices,
-            frame_rate,
-            resolved_hwaccel,
-            http_headers=http_headers,
+            stabilize,
+            sparse_indices=indices,
+            color=color,
+            frame_rate=frame_rate,
+        )
+    elif chosen == "pyav":
+        if not _have_pyav():
+            raise ImportError(
+                "backend='pyav' requires PyAV. Install with: pip install 'video-helper[pyav]'"
+            )
+        pyav_kwargs = {
+            "http_headers": http_headers,
+            "packet_index": pkt_index,
+            "output_width": output_width,
+            "output_height": output_height,
+            "pad_color_bgr": pad_bgr,
+            "color": color,
+            "decode_threads": decode_threads,
+            "thread_type": thread_type,
+            "assumed_gop": gop,
+            "keyframes_only": keyframes_only or strided == "keyframes",
+            "quality": quality,
+        }
+        frame_cache = get_frame_cache()
+        file_key = (
+            _probe_cache_key(video_path)
+            # Keyframes-only reads carry timestamps the cache does not keep.
+            if frame_cache is not None and not _is_url(video_path) and not keyframes_only
+            else None
         )
+        if file_key is not None:
+            # Decoded frames are cached under (file, transform, index): the
+            # request becomes a sorted index list, hits come from memory and
+            # only the misses go through the sparse seek planner. The range is
+            # clamped to the known frame count — the uncached path finds the
+            # end of the stream by decoding into it.
+            wanted = indices if sparse else range(s_idx, min(e_idx, total_frames - 1) + 1, step)
+            prefix = (
+                file_key,
+                ("pyav", resolved_hwaccel, output_width, output_height, pad_bgr, color, quality),
+                pkt_index is not None,
+            )
+
+            def _decode_misses(misses: list[int]) -> Iterator[tuple[int, np.ndarray]]:
+                return _extract_via_pyav(
+                    video_path,
+                    s_idx,
+                    e_idx,
+                    step,
+                    misses,
+                    frame_rate,
+                    resolved_hwaccel,
+                    with_indices=True,
+                    **pyav_kwargs,
+                )
+
+            np_iter = (
+                frame for _, frame in _cached_frames(frame_cache, prefix, wanted, _decode_misses)
+            )
+        else:
+            np_iter = _extract_via_pyav(
+                video_path,
+                s_idx,
+                e_idx,
+                step,
+                indices,
+                frame_rate,
+                resolved_hwaccel,
+                with_times=keyframes_only,
+                **pyav_kwargs,
+            )
     elif chosen == "ffmpeg-pipe":
         if shutil.which("ffmpeg") is None:
             raise RuntimeError("backend='ffmpeg-pipe' requires ffmpeg on PATH")
-        if sparse:
-            raise ValueError(
-                "backend='ffmpeg-pipe' does not support sparse access; use backend='pyav' instead."
-            )
         np_iter = _extract_via_ffmpeg_pipe(
             video_path,
             s_idx,
@@ -1609,17 +4989,26 @@ def extract_frames(
             height,
             resolved_hwaccel,
             http_headers=http_headers,
+            sparse_indices=indices,
+            output_width=output_width,
+            output_height=output_height,
+            pad_color_bgr=pad_bgr,
+            color=color,
+            decode_threads=decode_threads,
+            thread_type=thread_type,
+            # Frames queued by prefetch (plus the one being read) must not
+            # count against the caller's "valid for N frames" window.
+            ring_buffer=ring_buffer + (prefetch or 0) + (1 if prefetch else 0)
+            if ring_buffer
+            else None,
+            assumed_gop=gop,
+            keyframes_only=keyframes_only,
+            quality=quality,
         )
     else:
         raise AssertionError(f"unreachable backend {chosen!r}")
 
-    # Optional resize + pad pass — validate early so we fail fast.
-    if output_width is not None or output_height is not None:
-        if output_width is not None and output_width <= 0:
-            raise ValueError(f"output_width must be > 0, got {output_width}")
-        if output_height is not None and output_height <= 0:
-            raise ValueError(f"output_height must be > 0, got {output_height}")
-        pad_bgr = _parse_pad_color(pad_color)
+    if resize and chosen == "vidgear":
 
         def _resize_pad_iter(src: Iterator[np.ndarray]) -> Iterator[np.ndarray]:
             """Apply the scale-fit-and-pad transform to every upstream frame.
@@ -1627,7 +5016,7 @@ def extract_frames(
             Parameters
             ----------
             src : Iterator[numpy.ndarray]
-                Upstream BGR uint8 frames.
+                Upstream BGR (or gray) uint8 frames.
 
             Yields
             ------
@@ -1642,10 +5031,350 @@ def extract_frames(
 
         np_iter = _resize_pad_iter(np_iter)
 
+    if prefetch:
+        np_iter = _prefetch(np_iter, prefetch)
+
+    # Keyframes-only items are (time, frame) pairs: the frames go through the
+    # destination stage alone and their times queue up on the side. Batching
+    # never reads ahead, so at each yield the queue holds exactly the times
+    # of the frames in that yield.
+    frame_times_queue: deque[float] | None = None
+    if keyframes_only:
+        frame_times_queue = deque()
+
+        def _split_times(src: Iterator[tuple[float, np.ndarray]]) -> Iterator[np.ndarray]:
+            """Queue each pair's time and pass its frame on."""
+            for t, frame in src:
+                frame_times_queue.append(t)
+                yield frame
+
+        np_iter = _split_times(np_iter)
+
     # Final stage: convert/batch into the requested destination form.
     # The fast-path destination="numpy" + batch_size=None is a no-op
     # pass-through (no extra copy, no stacking).
-    yield from _to_destination(np_iter, destination, device, batch_size, layout)
+    out_iter = _to_destination(
+        np_iter,
+        destination,
+        device,
+        batch_size,
+        layout,
+        pin_memory=pin_memory,
+        transfers_in_flight=transfers_in_flight,
+        transfer_stats=transfer_stats,
+        preprocess=preprocess,
+    )
+    if frame_times_queue is None:
+        yield from out_iter
+        return
+    for item in out_iter:
+        times = np.array(frame_times_queue, dtype=np.float64)
+        frame_times_queue.clear()
+        yield (float(times[0]), item) if batch_size is None else (times, item)
+
+
+# extract_frames options that make no sense across a process boundary: the
+# frames come back as numpy arrays copied out of shared memory, one file per
+# worker (no nested pools), and must outlive the worker's buffers.
+_MANY_REJECTED_OPTIONS: tuple[str, ...] = (
+    "destination",
+    "device",
+    "batch_size",
+    "layout",
+    "pin_memory",
+    "transfers_in_flight",
+    "transfer_stats",
+    "preprocess",
+    "parallel",
+    "ring_buffer",
+)
+
+_ON_ERROR: tuple[str, ...] = ("raise", "warn", "ignore")
+
+
+def _frame_numbers(video_path: str, options: dict) -> tuple[Sequence[int], Callable[[float], int]]:
+    """Resolve the frame indices an :func:`extract_frames` call yields, in order.
+
+    Parameters
+    ----------
+    video_path : str
+        Input path or URL.
+    options : dict
+        The call's :func:`extract_frames` keyword arguments.
+
+    Returns
+    -------
+    tuple[Sequence[int], Callable[[float], int]]
+        The index of each output frame (a stream that ends early yields a
+        prefix of them), and the time-to-index mapping that numbers
+        ``keyframes_only`` frames — both in the call's numbering (the
+        packet index with ``packet_index=True``, else the ``duration ×
+        fps`` grid).
+    """
+    http_headers = options.get("http_headers")
+    d = video_dimensions(video_path, http_headers=http_headers)
+    pkt = (
+        video_packet_index(video_path, build=True, http_headers=http_headers)
+        if options.get("packet_index")
+        else None
+    )
+    indices, s_idx, e_idx, step, _ = _resolve_indices(
+        duration=d["duration"],
+        frame_rate=d["frame_rate"],
+        start_index=options.get("start_index"),
+        end_index=options.get("end_index"),
+        start_instant=options.get("start_instant"),
+        end_instant=options.get("end_instant"),
+        frame_step=options.get("frame_step", 1),
+        frame_interval=options.get("frame_interval"),
+        frame_indices=options.get("frame_indices"),
+        frame_times=options.get("frame_times"),
+        packet_index=pkt,
+    )
+    if pkt is not None:
+        total, index_at = pkt.frame_count, pkt.nearest_index
+    else:
+        total = int(d["duration"] * d["frame_rate"])
+
+        def index_at(seconds: float) -> int:
+            return int(round(seconds * d["frame_rate"]))
+
+    numbers = indices if indices is not None else range(s_idx, min(e_idx, total - 1) + 1, step)
+    return numbers, index_at
+
+
+def _extract_file(
+    video_path: str,
+    options: dict,
+    sink: Callable[[str, int, object], object] | None,
+) -> tuple[str | None, list[tuple[int, int, tuple[int, ...]]], int, list[float] | None]:
+    """Extract one file for :func:`extract_frames_many` in a worker process.
+
+    Top-level (not a closure) so a process pool can pickle it. Without a
+    sink the frames go to one shared-memory block of their own, which the
+    reader unlinks; with one they never leave the worker.
+
+    Parameters
+    ----------
+    video_path : str
+        Input path or URL.
+    options : dict
+        :func:`extract_frames` keyword arguments.
+    sink : Callable or None
+        ``sink(video_path, frame_index, item)`` called here for every
+        :func:`extract_frames` item.
+
+    Returns
+    -------
+    tuple[str | None, list[tuple[int, int, tuple[int, ...]]], int, list[float] | None]
+        ``(block_name, [(frame_index, offset, shape), …], frame_count, times)``;
+        ``block_name`` is ``None`` when nothing was written (a sink, or no
+        frames). ``times`` are the frame times of a ``keyframes_only`` read
+        (they travel with the layout, the frames through the block), else
+        ``None``.
+    """
+    items = extract_frames(video_path, **options)
+    numbers, index_at = _frame_numbers(video_path, options)
+    keyframes_only = bool(options.get("keyframes_only"))
+    if sink is not None:
+        count = 0
+        for k, item in enumerate(items):
+            sink(video_path, index_at(item[0]) if keyframes_only else numbers[k], item)
+            count += 1
+        return None, [], count, None
+    times: list[float] | None = None
+    if keyframes_only:
+        pairs = list(items)
+        times = [t for t, _ in pairs]
+        kept = [frame for _, frame in pairs]
+        numbers = [index_at(t) for t in times]
+    else:
+        kept = list(items)
+    if not kept:
+        return None, [], 0, times
+    block = shared_memory.SharedMemory(create=True, size=sum(f.nbytes for f in kept))
+    layout: list[tuple[int, int, tuple[int, ...]]] = []
+    offset = 0
+    for k, frame in enumerate(kept):
+        np.ndarray(frame.shape, dtype=np.uint8, buffer=block.buf, offset=offset)[...] = frame
+        layout.append((numbers[k], offset, frame.shape))
+        offset += frame.nbytes
+    if os.name == "posix":
+        # The reader unlinks the block; this worker's resource tracker must
+        # not also claim it (it would try to unlink it again at shutdown).
+        resource_tracker.unregister(block._name, "shared_memory")
+    block.close()
+    return block.name, layout, len(kept), times
+
+
+def _release_file(fut: Future) -> None:
+    """Done-callback unlinking the block of a file nobody will read.
+
+    Parameters
+    ----------
+    fut : concurrent.futures.Future
+        An :func:`_extract_file` future.
+    """
+    if fut.cancelled() or fut.exception() is not None:
+        return
+    name, _, _, _ = fut.result()
+    if name is not None:
+        block = shared_memory.SharedMemory(name=name)
+        block.close()
+        block.unlink()
+
+
+def extract_frames_many(
+    paths: Iterable[str],
+    workers: int = 4,
+    *,
+    ordered: bool = True,
+    on_error: str = "warn",
+    failures: dict[str, str] | None = None,
+    max_in_flight: int | None = None,
+    sink: Callable[[str, int, object], object] | None = None,
+    **options: object,
+) -> Iterator[tuple]:
+    """
+    Run :func:`extract_frames` over many files in a process pool.
+
+    Built for thumbnail and dataset jobs over thousands of short clips: each
+    file is extracted whole by one worker process (decode, resize and color
+    conversion all run there) and its frames come back through one
+    shared-memory block. ``paths`` is consumed lazily and at most
+    ``max_in_flight`` files are queued, running, or finished but not yet
+    read at any time — the bound on both pending work and memory held in
+    finished files. Each file's frames are held in memory at once, so this
+    suits short clips and sampled frames; for one long file use
+    ``extract_frames(..., parallel=N)``.
+
+    Parameters
+    ----------
+    paths : iterable of str
+        Local paths and/or URLs. May be a lazy generator.
+    workers : int, optional
+        Worker processes (default 4).
+    ordered : bool, optional
+        Yield files in input order (default) — deterministic output, at the
+        cost of a slow file holding back finished ones behind it — or, with
+        ``False``, in completion order. A file's frames are always in order.
+    on_error : str, optional
+        What a file that fails does: ``"warn"`` (default) logs a warning and
+        moves on, ``"ignore"`` moves on silently, ``"raise"`` cancels the
+        remaining files and re-raises the error.
+    failures : dict[str, str], optional
+        Filled with ``path -> "<ExceptionType>: <message>"`` for every file
+        that failed (with ``"warn"`` / ``"ignore"``).
+    max_in_flight : int, optional
+        Files in flight (default ``2 × workers``).
+    sink : Callable, optional
+        A picklable (top-level) ``sink(path, frame_idx, frame)`` called
+        *inside the worker* for every frame — e.g. writing thumbnails to disk — so frames
+        never cross processes (``frame`` is the ``(time, frame)`` pair with
+        ``keyframes_only=True``). The generator then yields one record per
+        file.
+    **options
+        :func:`extract_frames` keyword arguments, the same for every file
+        (range, sampling, backend, ``output_width`` / ``output_height``,
+        ``color``, ``keyframes_only``, …). Destination, batching and
+        ``parallel`` options are rejected: frames come back as numpy arrays,
+        one file per worker.
+
+    Yields
+    ------
+    tuple
+        ``(path, frame_idx, frame)``: ``frame`` is a frame of ``path``'s
+        :func:`extract_frames` output, a ``(H, W, 3)`` BGR (``(H, W)`` gray)
+        uint8 array — or, with ``keyframes_only=True``, its ``(time, frame)``
+        pair, as :func:`extract_frames` yields it — and ``frame_idx`` its
+        index in the video (``frame_interval=1.0`` at 30 fps gives 0, 30,
+        60, …), numbered as :func:`extract_frames` numbers frames. With
+        ``sink``, ``(path, frame_count)`` once per finished file instead.
+
+    Raises
+    ------
+    ValueError
+        On ``workers`` / ``max_in_flight`` < 1, an unknown ``on_error``, or a
+        rejected option.
+
+    Examples
+    --------
+    >>> clips = glob.glob("dataset/**/*.mp4", recursive=True)
+    >>> failed = {}
+    >>> for path, frame_idx, frame in extract_frames_many(
+    ...     clips, workers=8, failures=failed, frame_interval=1.0, output_width=224, output_height=224
+    ... ):
+    ...     store(path, frame_idx, frame)
+    """
+    if workers < 1:
+        raise ValueError(f"workers must be >= 1, got {workers}")
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+    if max_in_flight < 1:
+        raise ValueError(f"max_in_flight must be >= 1, got {max_in_flight}")
+    if on_error not in _ON_ERROR:
+        raise ValueError(f"Unknown on_error {on_error!r}; expected one of {list(_ON_ERROR)}")
+    rejected = sorted(set(options) & set(_MANY_REJECTED_OPTIONS))
+    if rejected:
+        raise ValueError(
+            f"extract_frames_many yields numpy frames; unsupported option(s) {rejected}"
+        )
+
+    path_iter = iter(paths)
+    pool = ProcessPoolExecutor(max_workers=workers)
+    # Submission order; with ordered=True only the head may be read, later
+    # files finishing first wait here (the reorder buffer).
+    pending: deque[tuple[str, Future]] = deque()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < max_in_flight:
+                path = next(path_iter, None)
+                if path is None:
+                    exhausted = True
+                    break
+                pending.append((path, pool.submit(_extract_file, path, options, sink)))
+            if not pending:
+                return
+            if ordered:
+                path, fut = pending.popleft()
+            else:
+                done, _ = wait([f for _, f in pending], return_when=FIRST_COMPLETED)
+                k = next(k for k, (_, f) in enumerate(pending) if f in done)
+                path, fut = pending[k]
+                del pending[k]
+            try:
+                name, layout, count, times = fut.result()
+            except Exception as exc:
+                if on_error == "raise":
+                    raise
+                if failures is not None:
+                    failures[path] = f"{type(exc).__name__}: {exc}"
+                if on_error == "warn":
+                    osh.warning(f"extract_frames_many: {path} failed ({type(exc).__name__}: {exc})")
+                continue
+            if sink is not None:
+                yield path, count
+                continue
+            if name is None:
+                continue
+            block = shared_memory.SharedMemory(name=name)
+            try:
+                for k, (frame_idx, offset, shape) in enumerate(layout):
+                    # Copy out: the block is unlinked as soon as this file is read.
+                    frame = np.ndarray(
+                        shape, dtype=np.uint8, buffer=block.buf, offset=offset
+                    ).copy()
+                    yield path, frame_idx, frame if times is None else (times[k], frame)
+            finally:
+                block.close()
+                block.unlink()
+    finally:
+        # An abandoned generator (or a raise) must not wait for files nobody
+        # will read; their blocks are freed when they finish.
+        for _, fut in pending:
+            fut.add_done_callback(_release_file)
+        pool.shutdown(wait=False, cancel_futures=True)
 
 
 def dump_frames(frames_list: list[np.ndarray], output_movie: str, fps: int = 30) -> None:
@@ -0,0 +1,681 @@
+"""
+video_helper.reader
+===================
+
+Persistent random-access frame reader: one open PyAV container per file,
+reused across any number of reads.
+
+Module summary
+--------------
+:func:`video_helper.extract_frames` is one-shot by design: every call
+validates the file, probes it, opens a container, seeks, decodes and closes
+again. That is the right shape for "give me these frames", and the wrong
+one for a caller that comes back to the same file dozens of times (one read
+per analysis window, per training sample, per UI scrub).
+
+:class:`VideoReader` pays the validation, the probe, the packet index and
+the container open once, then serves indexed reads — ``reader[i]``,
+``reader[i:j:k]``, :meth:`VideoReader.get_batch`, time-based access —
+from the same decoder. Each read goes through the sparse seek planner of
+the PyAV backend, and the decoder's current position is part of the plan:
+a read just ahead of the previous one decodes forward from where the
+decoder already is instead of seeking back to a keyframe. Frames are owned
+``(H, W, 3)`` BGR uint8 arrays (``(H, W)`` with ``color="gray"``), the
+:func:`~video_helper.extract_frames` numpy contract.
+
+A reader holds a decoder and is **not** thread-safe: use one per thread
+(or per worker process).
+
+Usage Example
+-------------
+>>> from video_helper import VideoReader
+>>> with VideoReader("clip.mp4") as reader:
+...     n = len(reader)                      # exact frame count
+...     first = reader[0]                    # (H, W, 3) BGR uint8
+...     tenth = reader[::10]                 # (N, H, W, 3)
+...     batch = reader.get_batch([500, 5, 7])
+...     at_12s = reader.get_frame_at(12.0)
+...     for frame in reader.frames(start_instant=20, end_instant=25, frame_interval=0.5):
+...         ...
+
+Author
+------
+Warith Harchaoui, Ph.D. — https://linkedin.com/in/warith-harchaoui/
+"""
+
+from __future__ import annotations
+
+import operator
+from collections.abc import Iterator, Sequence
+from typing import TYPE_CHECKING
+
+import numpy as np
+import os_helper as osh
+
+from . import main as _main
+from .frame_cache import _cached_frames, get_frame_cache
+
+if TYPE_CHECKING:  # pragma: no cover — types only, never executed at runtime
+    import av
+
+
+class VideoReader:
+    """
+    Random-access reader over one video, keeping the container open.
+
+    Parameters
+    ----------
+    video_path : str
+        Local path or URL.
+    hwaccel : str, optional
+        Hardware decode, as in :func:`~video_helper.extract_frames`.
+    http_headers : dict, optional
+        HTTP headers for URL inputs.
+    packet_index : bool, optional
+        Frame numbering, as in :func:`~video_helper.extract_frames`:
+        ``True`` numbers frames by presentation order through the demux
+        packet index (exact on VFR sources); ``None`` (default) and
+        ``False`` number them on the ``duration × fps`` grid, so the reader
+        returns the frames ``extract_frames`` returns for the same
+        arguments. ``None`` still uses the index for seek planning (exact
+        keyframe positions): built for local files — a one-off demux pass,
+        amortized over the reader's life — and for URLs only when cached.
+        ``False`` never uses it.
+    output_width, output_height : int, optional
+        Scale-fit-and-pad target, applied by libswscale during conversion.
+    pad_color : str, optional
+        Pad color for ``output_width`` / ``output_height``.
+    color : str, optional
+        ``"bgr"`` (default) or ``"gray"``.
+    decode_threads : int, optional
+        Decoder ``thread_count``.
+    thread_type : str, optional
+        ``"slice"``, ``"frame"`` or ``"auto"``.
+
+    Attributes
+    ----------
+    video_path : str
+        The input.
+    frame_rate : float
+        Probed frame rate.
+    duration : float
+        Probed duration in seconds.
+    packet_index : PacketIndex or None
+        The packet index numbering the frames (``packet_index=True`` only).
+    seeks : int
+        Container seeks performed so far.
+    frames_decoded : int
+        Frames decoded so far (wanted or not).
+
+    Raises
+    ------
+    ImportError
+        When PyAV is not installed.
+    ValueError
+        On an invalid option (same messages as ``extract_frames``).
+    """
+
+    def __init__(
+        self,
+        video_path: str,
+        *,
+        hwaccel: str | None = None,
+        http_headers: dict | None = None,
+        packet_index: bool | None = None,
+        output_width: int | None = None,
+        output_height: int | None = None,
+        pad_color: str = "black",
+        color: str = "bgr",
+        decode_threads: int | None = None,
+        thread_type: str | None = None,
+    ) -> None:
+        if not _main._have_pyav():
+            raise ImportError(
+                "VideoReader requires PyAV. Install with: pip install 'video-helper[pyav]'"
+            )
+        assert _main.is_valid_video_file(video_path), f"Video file not okay:\n\t{video_path}"
+        if color not in _main._COLORS:
+            raise ValueError(f"Unknown color {color!r}; expected 'bgr' or 'gray'")
+        if output_width is not None and output_width <= 0:
+            raise ValueError(f"output_width must be > 0, got {output_width}")
+        if output_height is not None and output_height <= 0:
+            raise ValueError(f"output_height must be > 0, got {output_height}")
+        if thread_type is not None and thread_type not in _main._THREAD_TYPES:
+            raise ValueError(
+                f"Unknown thread_type {thread_type!r}; expected one of {sorted(_main._THREAD_TYPES)}"
+            )
+
+        d = _main.video_dimensions(video_path, http_headers=http_headers)
+        self.video_path = video_path
+        self.frame_rate: float = d["frame_rate"]
+        self.duration: float = d["duration"]
+        # Numbering follows extract_frames (by the index only on request);
+        # keyframe positions for the seek planner come from any index at hand,
+        # in that numbering (a misplaced keyframe costs decode, never frames).
+        self.packet_index: _main.PacketIndex | None = None
+        seek_index: _main.PacketIndex | None = None
+        if packet_index is not False:
+            build = bool(packet_index) or not _main._is_url(video_path)
+            seek_index = _main.video_packet_index(
+                video_path, build=build, http_headers=http_headers
+            )
+        if packet_index:
+            self.packet_index = seek_index
+        self._keyframes: np.ndarray | None = None
+        if self.packet_index is not None:
+            self._keyframes = self.packet_index.keyframe_indices
+        elif seek_index is not None:
+            keyframe_times = seek_index.keyframe_pts * float(seek_index.time_base)
+            self._keyframes = np.unique(np.round(keyframe_times * self.frame_rate).astype(np.int64))
+        self._frame_count = (
+            self.packet_index.frame_count
+            if self.packet_index is not None
+            else int(self.duration * self.frame_rate)
+        )
+
+        resize = output_width is not None or output_height is not None
+        pad_bgr = _main._parse_pad_color(pad_color) if resize else (0, 0, 0)
+        if color == "gray":
+            pad_bgr = _main._gray_pad_color(pad_bgr)
+        self._pix_fmt = "gray" if color == "gray" else "bgr24"
+        self._output = (output_width, output_height, pad_bgr)
+        out_w, out_h = d["width"], d["height"]
+        if resize:
+            new_w, new_h, top, bottom, left, right = _main._output_geometry(
+                out_w, out_h, output_width, output_height
+            )
+            out_w, out_h = new_w + left + right, new_h + top + bottom
+        self._frame_shape = (out_h, out_w) if color == "gray" else (out_h, out_w, 3)
+
+        resolved_hwaccel = _main._resolve_hwaccel(hwaccel)
+        # Decoded-frame cache key prefix, identical to extract_frames' for the
+        # same file and options (the reader always decodes at default quality),
+        # so both share entries.
+        file_key = None if _main._is_url(video_path) else _main._probe_cache_key(video_path)
+        self._cache_prefix = (
+            None
+            if file_key is None
+            else (
+                file_key,
+                ("pyav", resolved_hwaccel, output_width, output_height, pad_bgr, color, "default"),
+                self.packet_index is not None,
+            )
+        )
+
+        self._container = _main._open_pyav_container(video_path, resolved_hwaccel, http_headers)
+        self._stream = self._container.streams.video[0]
+        self._frame_threaded = _main._configure_pyav_threads(
+            self._stream, decode_threads, thread_type
+        )
+        # Decoder state carried across reads: the live decode generator and
+        # the index of the frame it yields next (None = unknown: not started,
+        # just seeked, or exhausted).
+        self._frames: Iterator[av.VideoFrame] | None = None
+        self._next: int | None = None
+        # Last frame handed out, so re-reading it needs no backward seek.
+        self._last: tuple[int, np.ndarray] | None = None
+        self._closed = False
+        self.seeks = 0
+        self.frames_decoded = 0
+
+    # ── container protocol ───────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        """Return the number of frames (exact with a packet index)."""
+        return self._frame_count
+
+    def __enter__(self) -> VideoReader:
+        """Return ``self``; the container is already open."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Close the reader."""
+        self.close()
+
+    def __getitem__(self, key: int | slice) -> np.ndarray:
+        """
+        Return frame ``key`` or, for a slice, the stacked frames it selects.
+
+        Parameters
+        ----------
+        key : int or slice
+            Frame index (negative counts from the end) or slice
+            (``reader[i:j:k]``, Python semantics).
+
+        Returns
+        -------
+        numpy.ndarray
+            One frame, or ``(N, …)`` for a slice.
+
+        Raises
+        ------
+        IndexError
+            When an integer index is out of range.
+        RuntimeError
+            When the frame is missing from the decoded stream.
+        """
+        if isinstance(key, slice):
+            return self.get_batch(range(*key.indices(len(self))))
+        return self.get_batch([operator.index(key)])[0]
+
+    @property
+    def closed(self) -> bool:
+        """Whether :meth:`close` was called."""
+        return self._closed
+
+    @property
+    def frame_shape(self) -> tuple[int, ...]:
+        """Shape of every frame this reader returns (after resize / color)."""
+        return self._frame_shape
+
+    def close(self) -> None:
+        """Release the decoder and the container (idempotent)."""
+        if self._closed:
+            return
+        self._closed = True
+        self._frames = None
+        if self._frame_threaded:
+            _main._drain_pyav_decoder(self._stream)
+        self._container.close()
+
+    # ── reads ────────────────────────────────────────────────────────────
+
+    def get_batch(self, indices: Sequence[int]) -> np.ndarray:
+        """
+        Return the frames at ``indices``, stacked, in the requested order.
+
+        Indices may repeat and come in any order; each distinct frame is
+        decoded once, in file order, through the seek planner.
+
+        Parameters
+        ----------
+        indices : Sequence[int]
+            Frame indices (negative counts from the end).
+
+        Returns
+        -------
+        numpy.ndarray
+            ``(N, H, W, 3)`` BGR (``(N, H, W)`` gray) uint8.
+
+        Raises
+        ------
+        IndexError
+            When an index is out of range.
+        RuntimeError
+            When a frame of the index is missing from the decoded stream.
+        """
+        wanted = [self._normalize(operator.index(i)) for i in indices]
+        out = np.empty((len(wanted), *self._frame_shape), dtype=np.uint8)
+        slots: dict[int, list[int]] = {}
+        for k, index in enumerate(wanted):
+            slots.setdefault(index, []).append(k)
+        for index, frame in self._read(sorted(slots)):
+            out[slots.pop(index)] = frame
+        if slots:
+            raise RuntimeError(
+                f"frames {sorted(slots)} could not be decoded from {self.video_path}"
+            )
+        return out
+
+    def index_at(self, seconds: float) -> int:
+        """
+        Return the index of the frame nearest to ``seconds``.
+
+        Same mapping as ``extract_frames(frame_times=...)``.
+
+        Parameters
+        ----------
+        seconds : float
+            Presentation time.
+
+        Returns
+        -------
+        int
+            Frame index, clamped to ``[0, len(self))``.
+        """
+        if self.packet_index is not None:
+            return self.packet_index.nearest_index(seconds)
+        return min(max(0, int(round(seconds * self.frame_rate))), len(self) - 1)
+
+    def get_frame_at(self, seconds: float) -> np.ndarray:
+        """
+        Return the frame nearest to ``seconds``.
+
+        Parameters
+        ----------
+        seconds : float
+            Presentation time.
+
+        Returns
+        -------
+        numpy.ndarray
+            One frame.
+        """
+        return self[self.index_at(seconds)]
+
+    def get_batch_at(self, times: Sequence[float]) -> np.ndarray:
+        """
+        Return the frames nearest to each of ``times``, stacked in order.
+
+        Parameters
+        ----------
+        times : Sequence[float]
+            Presentation times.
+
+        Returns
+        -------
+        numpy.ndarray
+            ``(N, …)`` frames.
+        """
+        return self.get_batch([self.index_at(t) for t in times])
+
+    def frames(
+        self,
+        start_index: int | None = None,
+        end_index: int | None = None,
+        start_instant: float | None = None,
+        end_instant: float | None = None,
+        frame_step: int = 1,
+        frame_interval: float | None = None,
+    ) -> Iterator[np.ndarray]:
+        """
+        Yield a sequential range, with the range arguments of ``extract_frames``.
+
+        Frames stream one at a time (nothing is stacked), and the range is
+        resolved exactly as ``extract_frames`` resolves it, so a reader can
+        replace repeated ``extract_frames`` calls on one file frame for
+        frame.
+
+        Parameters
+        ----------
+        start_index, end_index : int, optional
+            Inclusive index bounds.
+        start_instant, end_instant : float, optional
+            Time bounds in seconds (override the index bounds).
+        frame_step : int, optional
+            Keep every Nth frame.
+        frame_interval : float, optional
+            Keep one frame every this many seconds (overrides ``frame_step``).
+
+        Yields
+        ------
+        numpy.ndarray
+            Frames in order.
+        """
+        wanted = self._range_indices(
+            start_index, end_index, start_instant, end_instant, frame_step, frame_interval
+        )
+        for _, frame in self._read(list(wanted)):
+            self._last = None  # the caller owns this array now and may write to it
+            yield frame
+
+    def frame_ranges(
+        self,
+        ranges: Sequence[tuple[float, float]],
+        frame_step: int = 1,
+        frame_interval: float | None = None,
+    ) -> Iterator[tuple[int, np.ndarray]]:
+        """
+        Yield the frames of several time ranges in one pass over the file.
+
+        Each range is resolved like ``frames(start_instant=t0,
+        end_instant=t1, ...)``; the union of their frames is then read in
+        file order through one seek plan, so ranges close to each other are
+        decoded through without a seek, and a frame shared by overlapping
+        ranges is decoded once.
+
+        Parameters
+        ----------
+        ranges : Sequence[tuple[float, float]]
+            ``(start, end)`` pairs in seconds, in any order; they may overlap.
+        frame_step : int, optional
+            Keep every Nth frame of each range.
+        frame_interval : float, optional
+            Keep one frame every this many seconds of each range (overrides
+            ``frame_step``).
+
+        Yields
+        ------
+        tuple[int, numpy.ndarray]
+            ``(range_id, frame)``, ``range_id`` being the position of the range
+            in ``ranges``. Frames come in file order; a frame in several ranges
+            is yielded once per range, in ``range_id`` order.
+
+        Raises
+        ------
+        ValueError
+            When a range ends before it starts.
+        """
+        members: dict[int, list[int]] = {}
+        for range_id, (t0, t1) in enumerate(ranges):
+            if t1 < t0:
+                raise ValueError(f"range {range_id} ends before it starts: ({t0}, {t1})")
+            for index in self._range_indices(None, None, t0, t1, frame_step, frame_interval):
+                members.setdefault(index, []).append(range_id)
+        osh.debug("VideoReader: %d range(s) -> %d frames", len(ranges), len(members))
+        for index, frame in self._read(sorted(members)):
+            self._last = None
+            *shared, last = members[index]
+            for range_id in shared:
+                yield range_id, frame.copy()
+            yield last, frame
+
+    # ── decoder plumbing ─────────────────────────────────────────────────
+
+    def _range_indices(
+        self,
+        start_index: int | None,
+        end_index: int | None,
+        start_instant: float | None,
+        end_instant: float | None,
+        frame_step: int,
+        frame_interval: float | None,
+    ) -> range:
+        """Resolve ``extract_frames`` range arguments to this file's frame indices."""
+        _, s_idx, e_idx, step, _ = _main._resolve_indices(
+            duration=self.duration,
+            frame_rate=self.frame_rate,
+            start_index=start_index,
+            end_index=end_index,
+            start_instant=start_instant,
+            end_instant=end_instant,
+            frame_step=frame_step,
+            frame_interval=frame_interval,
+            frame_indices=None,
+            frame_times=None,
+            packet_index=self.packet_index,
+        )
+        return range(s_idx, min(e_idx, len(self) - 1) + 1, step)
+
+    def _normalize(self, index: int) -> int:
+        """Resolve a negative index and bounds-check it."""
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError(f"frame index out of range for {n} frames")
+        return index
+
+    def _lead_in(self, index: int) -> int:
+        """Frames a seek to ``index`` decodes before reaching it."""
+        keyframes = self._keyframes
+        if keyframes is not None and len(keyframes):
+            k = int(np.searchsorted(keyframes, index, side="right")) - 1
+            return index - int(keyframes[max(0, k)])
+        return min(index, _main._ASSUMED_GOP)
+
+    def _continues_to(self, index: int) -> bool:
+        """Whether decoding on from the current position beats a seek to ``index``."""
+        if self._frames is None or self._next is None:
+            return False
+        gap = index - self._next
+        return 0 <= gap <= _main._SEEK_COST_FRAMES + self._lead_in(index)
+
+    def _seek(self, index: int) -> None:
+        """Seek so that decoding forward reaches ``index`` first-hand."""
+        if self.packet_index is not None:
+            self._container.seek(
+                self.packet_index.keyframe_pts_before(index),
+                stream=self._stream,
+                any_frame=False,
+                backward=True,
+            )
+        else:
+            offset_us = max(0, int(index / self.frame_rate * 1_000_000))
+            self._container.seek(offset_us, any_frame=False, backward=True)
+        self._frames = self._container.decode(self._stream)
+        self._next = None
+        self.seeks += 1
+
+    def _index_of(self, frame: av.VideoFrame) -> int:
+        """Map a decoded frame to its index (``-1`` without a usable PTS)."""
+        if self.packet_index is not None:
+            return self.packet_index.index_of_pts(frame.pts)
+        if frame.pts is None:
+            return -1
+        return int(round(float(frame.pts * self._stream.time_base) * self.frame_rate))
+
+    def _read(self, wanted: list[int]) -> Iterator[tuple[int, np.ndarray]]:
+        """Serve sorted, distinct ``wanted`` indices; yield ``(index, frame)``.
+
+        Goes through the decoded-frame cache when one is active
+        (:func:`video_helper.set_frame_cache`): hits never touch the decoder,
+        and only the misses are decoded.
+        """
+        if self._closed:
+            raise ValueError("I/O operation on a closed VideoReader")
+        cache = get_frame_cache()
+        if cache is None or self._cache_prefix is None:
+            yield from self._decode(wanted)
+        else:
+            yield from _cached_frames(cache, self._cache_prefix, wanted, self._decode)
+
+    def _decode(self, wanted: list[int]) -> Iterator[tuple[int, np.ndarray]]:
+        """Decode sorted, distinct ``wanted`` indices; yield ``(index, frame)``.
+
+        Clusters come from the PyAV backend's planner
+        (:func:`video_helper.main._plan_sparse_seeks`); before each one the
+        reader either keeps decoding from where the decoder already is or
+        seeks, whichever decodes fewer frames.
+        """
+        if not wanted:
+            return
+        clusters = _main._plan_sparse_seeks(wanted, self._keyframes)
+        osh.debug("VideoReader: %d frames in %d cluster(s)", len(wanted), len(clusters))
+        width, height, pad_bgr = self._output
+        for cluster in clusters:
+            if self._last is not None and cluster[0] == self._last[0]:
+                yield self._last[0], self._last[1].copy()
+                cluster = cluster[1:]
+                if not cluster:
+                    continue
+            if not self._continues_to(cluster[0]):
+                self._seek(cluster[0])
+            pending = set(cluster)
+            while pending:
+                frame = next(self._frames, None)
+                if frame is None:
+                    # End of stream: the decoder is flushed, the next read seeks.
+                    self._frames = self._next = None
+                    break
+                self.frames_decoded += 1
+                index = self._index_of(frame)
+                if index < 0:
+                    continue
+                self._next = index + 1
+                if index in pending:
+                    array = _main._pyav_frame_to_array(frame, self._pix_fmt, width, height, pad_bgr)
+                    self._last = (index, array)
+                    pending.discard(index)
+                    yield index, array
+                elif index > cluster[-1]:
+                    break
+
+
+def extract_frame_ranges(
+    video_path: str,
+    ranges: Sequence[tuple[float, float]],
+    frame_step: int = 1,
+    frame_interval: float | None = None,
+    *,
+    hwaccel: str | None = None,
+    http_headers: dict | None = None,
+    packet_index: bool | None = None,
+    output_width: int | None = None,
+    output_height: int | None = None,
+    pad_color: str = "black",
+    color: str = "bgr",
+    decode_threads: int | None = None,
+    thread_type: str | None = None,
+) -> Iterator[tuple[int, np.ndarray]]:
+    """
+    Extract several time ranges of one video, paying the setup once.
+
+    With PyAV, one :class:`VideoReader` validates, probes and opens the file
+    once and reads the union of the ranges in one seek plan (see
+    :meth:`VideoReader.frame_ranges`): close ranges are decoded through, far
+    ones get one keyframe seek each, overlaps are decoded once. Without
+    PyAV, each range is one ``extract_frames`` call, in order of start time.
+
+    Parameters
+    ----------
+    video_path : str
+        Local path or URL.
+    ranges : Sequence[tuple[float, float]]
+        ``(start, end)`` pairs in seconds (inclusive, as
+        ``start_instant`` / ``end_instant``), in any order; they may overlap.
+    frame_step : int, optional
+        Keep every Nth frame of each range.
+    frame_interval : float, optional
+        Keep one frame every this many seconds of each range (overrides
+        ``frame_step``).
+    hwaccel, http_headers, packet_index, output_width, output_height, pad_color, color, decode_threads, thread_type
+        As in :func:`~video_helper.extract_frames`.
+
+    Yields
+    ------
+    tuple[int, numpy.ndarray]
+        ``(range_id, frame)`` with ``range_id`` the position of the range in
+        ``ranges``. The frames of one range always come in order; with PyAV
+        the whole stream is in file order.
+
+    Raises
+    ------
+    ValueError
+        When a range ends before it starts.
+
+    Examples
+    --------
+    >>> chapters = [(0.0, 2.0), (125.0, 127.5), (60.0, 61.0)]
+    >>> for range_id, frame in extract_frame_ranges("talk.mp4", chapters, frame_interval=0.5):
+    ...     thumbs[range_id].append(frame)
+    """
+    for range_id, (t0, t1) in enumerate(ranges):
+        if t1 < t0:
+            raise ValueError(f"range {range_id} ends before it starts: ({t0}, {t1})")
+    options = {
+        "hwaccel": hwaccel,
+        "http_headers": http_headers,
+        "packet_index": packet_index,
+        "output_width": output_width,
+        "output_height": output_height,
+        "pad_color": pad_color,
+        "color": color,
+        "decode_threads": decode_threads,
+        "thread_type": thread_type,
+    }
+    if _main._have_pyav():
+        with VideoReader(video_path, **options) as reader:
+            yield from reader.frame_ranges(ranges, frame_step, frame_interval)
+        return
+    for range_id in sorted(range(len(ranges)), key=lambda k: ranges[k][0]):
+        t0, t1 = ranges[range_id]
+        for frame in _main.extract_frames(
+            video_path,
+            start_instant=t0,
+            end_instant=t1,
+            frame_step=frame_step,
+            frame_interval=frame_interval,
+            **options,
+        ):
+            yield range_id, frame